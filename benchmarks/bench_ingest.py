@@ -0,0 +1,152 @@
+"""
+Load benchmark for the ingestion service (src/ingest_service.py).
+
+    python benchmarks/bench_ingest.py --connections 32 --records 50 --duration 10
+    python benchmarks/bench_ingest.py --connections 64 --output ingest.json
+
+The service runs in its own spawned process, flushing into a temporary raw directory;
+keep-alive client connections POST AggregatedDataBlocks back to back for the duration.
+Reports sustained accepted blocks/sec and records/sec, acknowledgement latency
+percentiles, throttled (503) responses and the rows the service flushed to disk.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+ENDPOINT = '/setu/api/v1/ingest/biometric_updates'
+
+def _serve(raw_path, params, ready, stop, results):
+    from src.ingest_service import IngestService
+
+    async def main():
+        service = IngestService(raw_path=raw_path, **params)
+        host, port = await service.start('127.0.0.1', 0)
+        ready.put(port)
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        start = time.perf_counter()
+        await service.stop()
+        results.put({**service.stats, 'final_flush_s': time.perf_counter() - start})
+
+    asyncio.run(main())
+
+def make_block(records, seed):
+    rng = random.Random(seed)
+    return {'records': [{
+        'date': f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2025",
+        'state': 'Karnataka',
+        'district': 'Bengaluru Urban',
+        'pincode': rng.randint(110001, 855999),
+        'bio_age_5_17': rng.randint(0, 50),
+        'bio_age_18_above': rng.randint(0, 80),
+    } for _ in range(records)]}
+
+async def _client(port, body, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = (f"POST {ENDPOINT} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            status = int(status_line.split()[1])
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 503:
+                # Honour Retry-After loosely: back off briefly instead of hammering
+                await asyncio.sleep(0.05)
+    finally:
+        writer.close()
+
+async def _load(port, connections, records, duration):
+    latencies, statuses = [], {}
+    bodies = [json.dumps(make_block(records, seed)).encode() for seed in range(connections)]
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, body, deadline, latencies, statuses) for body in bodies))
+    return time.perf_counter() - start, latencies, statuses
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)] if values else float('nan')
+
+def run_benchmark(connections=32, records=50, duration=10.0, batch_rows=50_000, flush_interval=1.0,
+                  max_queue_blocks=1000):
+    """
+    Runs one load test and returns its result record.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    ready, results, stop = ctx.Queue(), ctx.Queue(), ctx.Event()
+    params = {'batch_rows': batch_rows, 'flush_interval': flush_interval, 'max_queue_blocks': max_queue_blocks}
+
+    with tempfile.TemporaryDirectory() as raw_path:
+        proc = ctx.Process(target=_serve, args=(raw_path, params, ready, stop, results))
+        proc.start()
+        port = ready.get(timeout=30)
+        elapsed, latencies, statuses = asyncio.run(_load(port, connections, records, duration))
+        stop.set()
+        server = results.get(timeout=120)
+        proc.join()
+
+    accepted = statuses.get(202, 0)
+    return {
+        'connections': connections,
+        'records_per_block': records,
+        'seconds': elapsed,
+        'accepted_blocks': accepted,
+        'blocks_per_s': accepted / elapsed,
+        'records_per_s': accepted * records / elapsed,
+        'p50_ms': 1000 * _percentile(latencies, 50),
+        'p99_ms': 1000 * _percentile(latencies, 99),
+        'max_ms': 1000 * max(latencies, default=float('nan')),
+        'statuses': statuses,
+        'server': server,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Project Setu ingestion service.")
+    parser.add_argument('--connections', type=int, nargs='+', default=[32],
+                        help="Concurrent keep-alive client connections (several values run several cases).")
+    parser.add_argument('--records', type=int, default=50, help="Records per AggregatedDataBlock.")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per case.")
+    parser.add_argument('--batch-rows', type=int, default=50_000, help="Service micro-batch size in rows.")
+    parser.add_argument('--flush-interval', type=float, default=1.0, help="Service flush interval in seconds.")
+    parser.add_argument('--max-queue-blocks', type=int, default=1000, help="Service queue bound in blocks.")
+    parser.add_argument('--output', help="Write results JSON to this path.")
+    args = parser.parse_args()
+
+    results = []
+    for connections in args.connections:
+        r = run_benchmark(connections, args.records, args.duration, args.batch_rows, args.flush_interval,
+                          args.max_queue_blocks)
+        results.append(r)
+        print(f"{connections:>4} conns x {args.records} records  {r['blocks_per_s']:>9,.0f} blocks/s  "
+              f"{r['records_per_s']:>11,.0f} records/s  p50 {r['p50_ms']:6.2f} ms  p99 {r['p99_ms']:6.2f} ms  "
+              f"503s {r['statuses'].get(503, 0):>5}  flushed {r['server']['flushed_records']:,} rows "
+              f"in {r['server']['files']} files")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Scaling benchmarks for the src pipeline stages.
+
+    python benchmarks/bench_pipeline.py run --sizes 10k 100k 1M --save baseline
+    python benchmarks/bench_pipeline.py run --sizes 10k 100k 1M --output current.json
+    python benchmarks/bench_pipeline.py compare benchmarks/baselines/baseline.json current.json
+
+Each (stage, size) case runs in a fresh spawned process, and its memory is sampled only
+while the stage runs: peak_rss_mb is the peak RSS inside the timed region (input building
+and earlier cases excluded) and stage_rss_mb that peak minus the RSS the region started at.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+STAGES = [
+    'load_data',
+    'aggregate_time_series',
+    'aggregate_by_pincode',
+    'aggregate_out_of_core',
+    'add_geography_from_pincode',
+    'rates_and_risk',
+    'calculate_pincode_ihs',
+    'fit_holt_winters',
+    'generate_processed_data',
+]
+
+# History long enough for fit_holt_winters' 52-week seasonality (two full seasons)
+HISTORY_MONTHS = 30
+
+def parse_size(text):
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+def _n_pincodes(rows):
+    # Roughly the real extracts' rows-per-pincode ratio, capped at India's ~19k pincodes
+    return min(max(rows // 100, 50), 19000)
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _rss_mb():
+    # Current RSS from /proc; the lifetime peak where /proc is unavailable
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_mb()
+
+# Seconds between RSS samples while a stage runs
+RSS_SAMPLE_INTERVAL = 0.005
+
+def _timed_with_rss(func):
+    """
+    Runs func, returning (seconds, RSS at start, peak RSS while it ran) in MB. A sampler
+    thread polls the current RSS; when the process's lifetime peak (ru_maxrss) rose during
+    the call, that new peak belongs to the call and replaces the sampled one, so short
+    spikes between samples are not missed.
+    """
+    start_rss, start_peak = _rss_mb(), _peak_rss_mb()
+    samples = [start_rss]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_SAMPLE_INTERVAL):
+            samples.append(_rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        func()
+    finally:
+        seconds = time.perf_counter() - start
+        done.set()
+        sampler.join()
+    samples.append(_rss_mb())
+    end_peak = _peak_rss_mb()
+    peak = end_peak if end_peak > start_peak else max(samples)
+    return seconds, start_rss, peak
+
+def _frames(rows):
+    from src import synthetic
+    return synthetic.generate_synthetic_frames(rows_per_category=rows, n_pincodes=_n_pincodes(rows),
+                                               months=HISTORY_MONTHS)
+
+def _write_raw(rows, raw_dir):
+    from src import synthetic
+    synthetic.generate_synthetic_raw(raw_dir, rows, n_pincodes=_n_pincodes(rows), months=HISTORY_MONTHS,
+                                     workers=1)
+
+def _prepare(stage, rows, workdir):
+    """
+    Builds the stage's input (untimed). Returns (callable running the stage, input row count).
+    """
+    from src import data_processing, risk_profiling, ihs_scoring
+
+    if stage in ('load_data', 'aggregate_out_of_core', 'generate_processed_data'):
+        raw_dir = os.path.join(workdir, 'raw')
+        _write_raw(rows, raw_dir)
+        if stage == 'load_data':
+            return (lambda: data_processing.load_data(raw_dir)), 3 * rows
+        if stage == 'aggregate_out_of_core':
+            from src import out_of_core
+            # A small fixed budget, so larger sizes exercise multiple spill partitions
+            return (lambda: out_of_core.aggregate_out_of_core(raw_dir, memory_budget_mb=256,
+                                                              spill_dir=workdir)), 3 * rows
+
+        from scripts.generate_data import generate_processed_data
+        config = {
+            'raw_path': raw_dir,
+            'output_path': os.path.join(workdir, 'processed'),
+            'cache_dir': os.path.join(workdir, 'cache'),
+        }
+        return (lambda: generate_processed_data(config=config, force=True)), 3 * rows
+
+    df_bio, df_demo, df_enrol = _frames(rows)
+    if stage == 'aggregate_time_series':
+        return (lambda: data_processing.aggregate_time_series(df_bio.copy(), df_demo.copy())), 2 * rows
+    if stage == 'aggregate_by_pincode':
+        return (lambda: data_processing.aggregate_by_pincode(df_bio, df_demo, df_enrol)), 3 * rows
+
+    df_risk = data_processing.aggregate_by_pincode(df_bio, df_demo, df_enrol)
+    if stage == 'add_geography_from_pincode':
+        return (lambda: data_processing.add_geography_from_pincode(df_risk.copy())), len(df_risk)
+    if stage == 'rates_and_risk':
+        return (lambda: risk_profiling.categorize_risk(risk_profiling.calculate_update_rates(df_risk))), len(df_risk)
+    if stage == 'calculate_pincode_ihs':
+        df_rates = risk_profiling.calculate_update_rates(df_risk)
+        return (lambda: ihs_scoring.calculate_pincode_ihs(df_rates.copy())), len(df_rates)
+    if stage == 'fit_holt_winters':
+        from src import forecasting
+        weekly = data_processing.aggregate_time_series(df_bio, df_demo)['total_bio']
+        return (lambda: forecasting.fit_holt_winters(weekly)), len(weekly)
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+def _run_case(stage, rows, repeat, queue):
+    import contextlib
+    import io
+
+    with tempfile.TemporaryDirectory() as workdir:
+        func, input_rows = _prepare(stage, rows, workdir)
+        runs = []
+        for _ in range(repeat):
+            with contextlib.redirect_stdout(io.StringIO()):
+                runs.append(_timed_with_rss(func))
+
+    seconds = min(r[0] for r in runs)
+    queue.put({
+        'stage': stage,
+        'rows': rows,
+        'input_rows': input_rows,
+        'seconds': seconds,
+        'peak_rss_mb': max(r[2] for r in runs),
+        'stage_rss_mb': max(r[2] - r[1] for r in runs),
+        'setup_rss_mb': runs[0][1],
+        'rows_per_s': input_rows / seconds if seconds > 0 else None,
+    })
+
+def run_case(stage, rows, repeat=1):
+    """
+    Runs one benchmark case in a fresh spawned process and returns its result record.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(stage, rows, repeat, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        return {'stage': stage, 'rows': rows, 'error': f'exit code {proc.exitcode}'}
+    return queue.get()
+
+def _metadata():
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+def cmd_run(args):
+    sizes = [parse_size(s) for s in args.sizes] if args.sizes else DEFAULT_SIZES
+    stages = args.stages or STAGES
+
+    results = []
+    for rows in sizes:
+        for stage in stages:
+            result = run_case(stage, rows, repeat=args.repeat)
+            results.append(result)
+            if 'error' in result:
+                print(f"{stage:<28} {rows:>11,} rows  FAILED ({result['error']})")
+            else:
+                print(f"{stage:<28} {rows:>11,} rows  {result['seconds']:9.3f}s  "
+                      f"{result['peak_rss_mb']:8.0f} MB peak  {result['stage_rss_mb']:+8.0f} MB in stage  "
+                      f"{result['rows_per_s']:>13,.0f} rows/s")
+
+    report = {'meta': _metadata(), 'results': results}
+    paths = []
+    if args.output:
+        paths.append(args.output)
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        paths.append(os.path.join(BASELINE_DIR, f'{args.save}.json'))
+    for path in paths:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {path}")
+
+def compare_reports(baseline, current, time_threshold=0.2, memory_threshold=0.2):
+    """
+    Matches cases by (stage, rows) and returns a list of comparison records;
+    'regression' is True when time or peak RSS grew by more than the threshold.
+    """
+    base = {(r['stage'], r['rows']): r for r in baseline['results'] if 'error' not in r}
+    rows = []
+    for r in current['results']:
+        key = (r['stage'], r['rows'])
+        if key not in base or 'error' in r:
+            continue
+        b = base[key]
+        time_ratio = r['seconds'] / b['seconds'] if b['seconds'] else float('inf')
+        rss_ratio = r['peak_rss_mb'] / b['peak_rss_mb'] if b['peak_rss_mb'] else float('inf')
+        rows.append({
+            'stage': r['stage'],
+            'rows': r['rows'],
+            'time_ratio': time_ratio,
+            'rss_ratio': rss_ratio,
+            'regression': time_ratio > 1 + time_threshold or rss_ratio > 1 + memory_threshold,
+        })
+    return rows
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    comparison = compare_reports(baseline, current, args.time_threshold, args.memory_threshold)
+    for c in comparison:
+        flag = 'REGRESSION' if c['regression'] else 'ok'
+        print(f"{c['stage']:<28} {c['rows']:>11,} rows  time x{c['time_ratio']:.2f}  "
+              f"rss x{c['rss_ratio']:.2f}  {flag}")
+
+    regressions = [c for c in comparison if c['regression']]
+    print(f"\n{len(regressions)} regression(s) in {len(comparison)} matched case(s).")
+    return 1 if regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the src pipeline stages at several data sizes.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="Run benchmark cases.")
+    run.add_argument('--sizes', nargs='+', help="Raw rows per category, e.g. 10k 100k 1M 10M.")
+    run.add_argument('--stages', nargs='+', choices=STAGES, help="Subset of stages to run.")
+    run.add_argument('--repeat', type=int, default=1, help="Timed repetitions per case (best is kept).")
+    run.add_argument('--output', help="Write results JSON to this path.")
+    run.add_argument('--save', help="Save results as benchmarks/baselines/<name>.json.")
+
+    compare = sub.add_parser('compare', help="Compare results against a baseline.")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--time-threshold', type=float, default=0.2,
+                         help="Allowed relative slowdown before flagging (default 0.2 = 20%%).")
+    compare.add_argument('--memory-threshold', type=float, default=0.2,
+                         help="Allowed relative peak RSS growth before flagging.")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        cmd_run(args)
+    else:
+        sys.exit(cmd_compare(args))
+
+if __name__ == "__main__":
+    main()
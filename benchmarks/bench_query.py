@@ -0,0 +1,177 @@
+"""
+Load benchmark for the read-only query API (src/query_service.py).
+
+    python benchmarks/bench_query.py --connections 16 64 --duration 10
+    python benchmarks/bench_query.py --mix pincode=1 --revalidate 0.5 --output query.json
+
+Serves the pipeline outputs (run scripts/generate_data.py first, or pass --metrics and
+--forecast) from a spawned process. Keep-alive client connections send a weighted mix
+of pincode, batch, district, top-K and forecast requests back to back for the duration,
+a share of them revalidating with If-None-Match. Reports sustained requests/sec, latency
+percentiles, response statuses and the server's response-cache hit rate.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from urllib.parse import quote
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from benchmarks.bench_ingest import _percentile
+
+DEFAULT_MIX = {'pincode': 70, 'batch': 5, 'district': 10, 'top': 10, 'forecast': 5}
+BATCH_SIZE = 100
+
+def _serve(params, ready, stop, results):
+    from src.query_service import QueryService
+
+    async def main():
+        service = QueryService(**params)
+        host, port = await service.start('127.0.0.1', 0)
+        ready.put((port, service.index.keys.tolist(), service.index.labels.get('district', []),
+                   service.index.labels.get('state', []), service.index.nbytes))
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        await service.stop()
+        results.put(service.stats)
+
+    asyncio.run(main())
+
+def make_request(kind, rng, pincodes, districts, states):
+    prefix = '/setu/api/v1/query/'
+    if kind == 'pincode':
+        return 'GET', f"{prefix}pincode/{rng.choice(pincodes)}", b''
+    if kind == 'batch':
+        return 'POST', f"{prefix}pincode/batch", json.dumps({'pincodes': rng.sample(pincodes, BATCH_SIZE)}).encode()
+    if kind == 'district':
+        return 'GET', f"{prefix}district/{quote(rng.choice(districts))}", b''
+    if kind == 'top':
+        by = rng.choice(['total_update_load', 'ihs_score', 'mbu_rate'])
+        scope = f"&state={quote(rng.choice(states))}" if states and rng.random() < 0.5 else ''
+        return 'GET', f"{prefix}top?by={by}&k={rng.choice([10, 50])}{scope}", b''
+    return 'GET', f"{prefix}forecast/{quote(rng.choice(districts))}?horizon={rng.randint(1, 6)}", b''
+
+async def _client(port, seed, mix, targets, revalidate, deadline, latencies, statuses):
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    etags = {}
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while time.perf_counter() < deadline:
+            method, target, body = make_request(rng.choices(kinds, weights)[0], rng, *targets)
+            head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+            if target in etags and rng.random() < revalidate:
+                head += f"If-None-Match: {etags[target]}\r\n"
+            start = time.perf_counter()
+            writer.write((head + '\r\n').encode() + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            length, etag = 0, None
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+                elif name.lower() == 'etag':
+                    etag = value.strip()
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            status = int(status_line.split()[1])
+            statuses[status] = statuses.get(status, 0) + 1
+            if etag and method == 'GET':
+                etags[target] = etag
+    finally:
+        writer.close()
+
+async def _load(port, connections, mix, targets, revalidate, duration):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, seed, mix, targets, revalidate, deadline, latencies, statuses)
+                           for seed in range(connections)))
+    return time.perf_counter() - start, latencies, statuses
+
+def run_benchmark(connections=16, duration=10.0, mix=None, revalidate=0.2, metrics_path=None, forecast_path=None,
+                  cache_entries=10_000):
+    """
+    Runs one load test and returns its result record.
+    """
+    mix = mix or DEFAULT_MIX
+    ctx = multiprocessing.get_context('spawn')
+    ready, results, stop = ctx.Queue(), ctx.Queue(), ctx.Event()
+    params = {'metrics_path': metrics_path, 'forecast_path': forecast_path, 'cache_entries': cache_entries}
+    proc = ctx.Process(target=_serve, args=(params, ready, stop, results))
+    proc.start()
+    port, pincodes, districts, states, index_bytes = ready.get(timeout=120)
+    elapsed, latencies, statuses = asyncio.run(_load(port, connections, mix, (pincodes, districts, states),
+                                                     revalidate, duration))
+    stop.set()
+    server = results.get(timeout=60)
+    proc.join()
+
+    return {
+        'connections': connections,
+        'mix': mix,
+        'revalidate': revalidate,
+        'pincodes': len(pincodes),
+        'index_mb': index_bytes / 1e6,
+        'seconds': elapsed,
+        'requests': len(latencies),
+        'requests_per_s': len(latencies) / elapsed,
+        'p50_ms': 1000 * _percentile(latencies, 50),
+        'p99_ms': 1000 * _percentile(latencies, 99),
+        'max_ms': 1000 * max(latencies, default=float('nan')),
+        'statuses': statuses,
+        'cache_hit_rate': server['cache_hits'] / max(server['requests'], 1),
+        'server': server,
+    }
+
+def _parse_mix(items):
+    mix = {}
+    for item in items:
+        kind, _, weight = item.partition('=')
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r} (one of {sorted(DEFAULT_MIX)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Project Setu read-only query API.")
+    parser.add_argument('--connections', type=int, nargs='+', default=[16],
+                        help="Concurrent keep-alive client connections (several values run several cases).")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per case.")
+    parser.add_argument('--mix', nargs='+', help="Request mix as kind=weight, e.g. pincode=7 top=1 "
+                                                 f"(kinds: {', '.join(DEFAULT_MIX)}).")
+    parser.add_argument('--revalidate', type=float, default=0.2,
+                        help="Share of repeated GETs sent with If-None-Match.")
+    parser.add_argument('--cache-entries', type=int, default=10_000, help="Server response cache size.")
+    parser.add_argument('--metrics', help="Pincode metrics CSV or partitioned directory.")
+    parser.add_argument('--forecast', help="Forecast CSV.")
+    parser.add_argument('--output', help="Write results JSON to this path.")
+    args = parser.parse_args()
+    mix = _parse_mix(args.mix) if args.mix else DEFAULT_MIX
+
+    results = []
+    for connections in args.connections:
+        r = run_benchmark(connections, args.duration, mix, args.revalidate, args.metrics, args.forecast,
+                          args.cache_entries)
+        results.append(r)
+        print(f"{connections:>4} conns  {r['requests_per_s']:>9,.0f} req/s  p50 {r['p50_ms']:6.2f} ms  "
+              f"p99 {r['p99_ms']:6.2f} ms  cache hits {100 * r['cache_hit_rate']:5.1f}%  "
+              f"304s {r['statuses'].get(304, 0):>6,}  statuses {r['statuses']}  "
+              f"({r['pincodes']:,} pincodes, index {r['index_mb']:.1f} MB)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
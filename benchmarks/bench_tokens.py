@@ -0,0 +1,120 @@
+"""
+Memory and throughput benchmark for the event token verifier (src/token_verifier.py).
+
+    python benchmarks/bench_tokens.py --sizes 1M 10M
+    python benchmarks/bench_tokens.py --sizes 1M --hit-rate 0.1 --output tokens.json
+
+For each token count: bulk-load time, memory per million tokens (sorted digests + Bloom
+filter, against a Python set of hex strings for the smaller sizes), the Bloom filter's
+measured false-positive rate, rotation time, and verifications/sec for single lookups and
+batches, from digests and from hex token strings.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from benchmarks.bench_pipeline import parse_size
+from src.token_verifier import TokenVerifier, to_digests
+
+BATCH_SIZES = [1_000, 100_000]
+
+# Above this many tokens the Python-set comparison is skipped (it needs ~100 bytes/token)
+SET_BASELINE_LIMIT = 2_000_000
+
+def _python_set_bytes(hex_tokens):
+    return sys.getsizeof(set(hex_tokens)) + sum(sys.getsizeof(t) for t in hex_tokens)
+
+def _queries(rng, members, n, hit_rate):
+    hits = rng.choice(members, int(n * hit_rate))
+    misses = rng.integers(0, 2 ** 64, n - len(hits), dtype=np.uint64, endpoint=False)
+    queries = np.concatenate([hits, misses])
+    rng.shuffle(queries)
+    return queries
+
+def _rate(func, n_items, min_seconds=0.5):
+    # Repeats func until min_seconds have passed; returns items per second
+    calls, start = 0, time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls * n_items / elapsed
+
+def bench_size(n_tokens, hit_rate=0.5, fp_rate=0.01, queries=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    tokens = rng.integers(0, 2 ** 64, n_tokens, dtype=np.uint64, endpoint=False)
+
+    verifier = TokenVerifier(fp_rate=fp_rate)
+    start = time.perf_counter()
+    verifier.load(tokens, label='current')
+    load_s = time.perf_counter() - start
+    generation = verifier.generations[0]
+
+    misses = rng.integers(0, 2 ** 64, 1_000_000, dtype=np.uint64, endpoint=False)
+    query = _queries(rng, tokens, queries, hit_rate)
+    hex_query = [format(int(d), '016x') for d in query[:100_000]]
+
+    result = {
+        'tokens': n_tokens,
+        'load_s': load_s,
+        'bytes_per_token': generation.nbytes / n_tokens,
+        'mib_per_million': generation.nbytes / n_tokens * 1e6 / 2 ** 20,
+        'bloom_mib_per_million': generation.bloom.nbytes / n_tokens * 1e6 / 2 ** 20,
+        'bloom_fp_rate': generation.bloom_pass_rate(misses),
+        'hit_rate': hit_rate,
+        'verify_per_s': {},
+    }
+    single = [int(d) for d in query[:1000]]
+    result['verify_one_per_s'] = _rate(lambda: [verifier.verify_one(d) for d in single], len(single))
+    for batch in BATCH_SIZES:
+        chunk = query[:batch]
+        result['verify_per_s'][str(batch)] = _rate(lambda: verifier.verify(chunk), batch)
+    result['verify_hex_per_s'] = _rate(lambda: verifier.verify(hex_query), len(hex_query))
+    result['parse_hex_per_s'] = _rate(lambda: to_digests(hex_query), len(hex_query))
+
+    start = time.perf_counter()
+    verifier.rotate(rng.integers(0, 2 ** 64, n_tokens, dtype=np.uint64, endpoint=False), label='next')
+    result['rotate_s'] = time.perf_counter() - start
+    result['verify_two_generations_per_s'] = _rate(lambda: verifier.verify(query), len(query))
+
+    if n_tokens <= SET_BASELINE_LIMIT:
+        result['python_set_mib_per_million'] = (_python_set_bytes([format(int(d), '016x') for d in tokens])
+                                                / n_tokens * 1e6 / 2 ** 20)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the zero-linkage event token verifier.")
+    parser.add_argument('--sizes', nargs='+', default=['1M', '10M'], help="Token counts, e.g. 1M 10M 100M.")
+    parser.add_argument('--hit-rate', type=float, default=0.5, help="Share of queries that are stored tokens.")
+    parser.add_argument('--fp-rate', type=float, default=0.01, help="Bloom filter target false-positive rate.")
+    parser.add_argument('--output', help="Write results JSON to this path.")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        r = bench_size(parse_size(size), hit_rate=args.hit_rate, fp_rate=args.fp_rate)
+        results.append(r)
+        baseline = (f"  (python set: {r['python_set_mib_per_million']:.1f} MiB/M)"
+                    if 'python_set_mib_per_million' in r else '')
+        print(f"{r['tokens']:>13,} tokens  load {r['load_s']:6.2f}s  rotate {r['rotate_s']:6.2f}s  "
+              f"{r['mib_per_million']:5.2f} MiB/M (bloom {r['bloom_mib_per_million']:.2f}){baseline}  "
+              f"bloom fp {100 * r['bloom_fp_rate']:.2f}%")
+        rates = '  '.join(f"batch {b}: {v:,.0f}/s" for b, v in r['verify_per_s'].items())
+        print(f"{'':>21}single: {r['verify_one_per_s']:,.0f}/s  {rates}  hex tokens: {r['verify_hex_per_s']:,.0f}/s  "
+              f"two generations: {r['verify_two_generations_per_s']:,.0f}/s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,55 @@
 import streamlit as st
-import pandas as pd
-import json
 import os
 import sys
-import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from datetime import datetime
 
 # Import Components
+# Only the lightweight Guidance page is imported up front; the data views (and the
+# pandas/plotly/statsmodels stack behind them) load on first use in show_dashboard().
 from dashboard.components.guidance_view import show_guidance
-from dashboard.components.kpi_metrics import render_kpi_metrics
-from dashboard.components.pincode_heatmap_view import render_pincode_heatmap
-from dashboard.components.ihs_distribution_view import render_ihs_distribution
-from dashboard.components.strategy_panel import render_strategy_panel
-from dashboard.components.demand_forecast_view import render_demand_forecast
-from dashboard.components.context_signal_panel import render_context_signals
 
 # Page Config (Must be first)
 st.set_page_config(page_title="Project Setu Dashboard", page_icon="assets/favicon.png", layout="wide")
 
-# --- Data Loading ---
-@st.cache_data
-def load_data():
-    file_path = 'data/processed/ihs_features_population.csv'
-    # Fallback to json if csv not found (legacy support or if user kept json)
-    if not os.path.exists(file_path):
-        file_path = 'dashboard_metrics.json' # Legacy
-        if not os.path.exists(file_path):
-            return None
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        df = pd.DataFrame(data)
-    else:
-        df = pd.read_csv(file_path)
-    
-    if 'pincode' in df.columns:
-        df['pincode'] = df['pincode'].astype(str)
+def show_dashboard():
+    from dashboard.data_store import (load_data, load_demand_data, load_series_store, load_forecast_data,
+                                      load_what_if_engine, load_window_index, load_window_metrics,
+                                      available_states, filter_view, memory_report)
+    from src.window_index import apply_window
+
+    # --- Filters ---
+    st.sidebar.header("Filters")
     
-    # Ensure columns exist (for legacy/synthetic data compat)
-    if 'total_update_load' not in df.columns and 'mbu_rate' in df.columns:
-        # Approximate load if missing
-        df['total_update_load'] = df['bio_age_5_17'] + df['demo_age_5_17']
-        
-    return df
-
-@st.cache_data
-def load_demand_data():
-    file_path = 'data/processed/biometric_mbu_aggregated.csv'
-    if not os.path.exists(file_path):
-        file_path = 'monthly_demand.json' # Legacy
-        if not os.path.exists(file_path):
-            return None
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        df = pd.DataFrame(data)
-    else:
-        df = pd.read_csv(file_path)
-
-    if 'pincode' in df.columns:
-        df['pincode'] = df['pincode'].astype(str)
-    if 'month' in df.columns:
-        # Convert month string (YYYY-MM) to proper date for plotting if needed
-        # Or if it's already datetime string
-        try:
-            df['month'] = pd.to_datetime(df['month'])
-        except:
-            pass
-            
-    return df
+    # State Filter (drives which partitions are loaded)
+    all_states = ['All'] + available_states()
+    selected_state = st.sidebar.selectbox("Select State", all_states)
 
-def show_dashboard():
-    df = load_data()
-    df_demand = load_demand_data()
+    df = load_data(selected_state)
+    df_demand = load_demand_data(selected_state)
+    series_store = load_series_store(selected_state)
 
     if df is None:
         st.error("Data file not found. Please run 'scripts/generate_data.py' first.")
         return
 
-    # --- Filters ---
-    st.sidebar.header("Filters")
-    
-    # State Filter
-    if 'state' in df.columns:
-        all_states = ['All'] + sorted(df['state'].unique().tolist())
-    else:
-        all_states = ['All']
-    
-    selected_state = st.sidebar.selectbox("Select State", all_states)
+    # Date Range Filter (window totals from month prefix sums; full range keeps the stored metrics)
+    window_index = load_window_index()
+    df_window = None
+    if window_index is not None and len(window_index.periods) > 1:
+        months = [p.strftime('%Y-%m') for p in window_index.periods]
+        start_month, end_month = st.sidebar.select_slider("Date Range", options=months,
+                                                          value=(months[0], months[-1]))
+        if (start_month, end_month) != (months[0], months[-1]):
+            df_window = load_window_metrics(start_month, end_month)
+            if df_window is not None:
+                df = apply_window(df, df_window)
     
     # District Filter
     if 'district' in df.columns:
         if selected_state != 'All':
-            filtered_df_state = df[df['state'] == selected_state]
+            filtered_df_state = filter_view(df, state=selected_state)
             all_districts = ['All'] + sorted(filtered_df_state['district'].unique().tolist())
         else:
             all_districts = ['All'] + sorted(df['district'].unique().tolist())
@@ -108,14 +65,14 @@ def show_dashboard():
     else:
         selected_risk = 'All'
     
-    # Apply Filters
-    filtered_df = df.copy()
-    if selected_state != 'All' and 'state' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['state'] == selected_state]
-    if selected_district != 'All' and 'district' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['district'] == selected_district]
-    if selected_risk != 'All' and 'risk_category' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['risk_category'] == selected_risk]
+    # Apply Filters (one combined mask over the shared, read-only data)
+    filtered_df = filter_view(df, state=selected_state, district=selected_district, risk_category=selected_risk)
+
+    with st.sidebar.expander("Memory Report"):
+        report = memory_report([load_data(selected_state), df_demand, series_store, window_index, df_window],
+                               [df, filtered_df])
+        st.caption(f"Shared data (all sessions): {report['shared_mb']:.1f} MB")
+        st.caption(f"This session's views: {report['session_mb']:.1f} MB ({report['session_pct']:.1f}% of shared)")
     
     # --- Main Dashboard Content ---
     st.title("Project Setu: Aadhaar Data Dashboard")
@@ -123,15 +80,22 @@ def show_dashboard():
     # Sub-navigation
     view_selection = st.radio(
         "Select Dashboard View:", 
-        ["Risk Profiling & Analytics", "Strategies & Details", "MBU Demand Forecasting"], 
+        ["Risk Profiling & Analytics", "Strategies & Details", "MBU Demand Forecasting", "Van Allocation",
+         "What-If Analysis"], 
         horizontal=True
     )
     
     st.markdown("---")
 
     if view_selection == "Risk Profiling & Analytics":
+        from dashboard.components.kpi_metrics import render_kpi_metrics
+        from dashboard.components.pincode_heatmap_view import render_pincode_heatmap
+        from dashboard.components.ihs_distribution_view import render_ihs_distribution
+        from dashboard.components.surge_alerts import render_surge_alerts
+
         st.markdown("### Pincode Risk Profiling & Identity Health Score (IHS) Analytics")
         render_kpi_metrics(filtered_df)
+        render_surge_alerts(filtered_df)
         st.markdown("---")
         
         c1, c2 = st.columns(2)
@@ -141,21 +105,35 @@ def show_dashboard():
             render_ihs_distribution(filtered_df)
 
     elif view_selection == "Strategies & Details":
+        from dashboard.components.strategy_panel import render_strategy_panel
         render_strategy_panel(filtered_df)
 
     elif view_selection == "MBU Demand Forecasting":
-        render_demand_forecast(df_demand, selected_state, selected_district)
+        from dashboard.components.demand_forecast_view import render_demand_forecast
+        from dashboard.components.context_signal_panel import render_context_signals
+        render_demand_forecast(series_store, selected_state, selected_district)
         render_context_signals()
 
+    elif view_selection == "Van Allocation":
+        from dashboard.components.allocation_view import render_allocation
+        render_allocation(series_store, filtered_df, load_forecast_data())
+
+    elif view_selection == "What-If Analysis":
+        from dashboard.components.what_if_view import render_what_if
+        render_what_if(load_what_if_engine(), selected_state, selected_district)
+
 # --- Main App Entry Point ---
 def main():
     st.sidebar.title("Navigation")
-    page = st.sidebar.radio("Go to", ["Dashboard", "Guidance"])
+    page = st.sidebar.radio("Go to", ["Dashboard", "Guidance", "Operations"])
     
     if page == "Dashboard":
         show_dashboard()
     elif page == "Guidance":
         show_guidance()
+    elif page == "Operations":
+        from dashboard.components.operations_panel import render_operations_panel
+        render_operations_panel()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+import streamlit as st
+import pandas as pd
+
+def render_allocation(store, filtered_df, df_forecast):
+    """
+    Plans mobile van camps for the filtered pincodes over the forecast horizon with the
+    greedy allocator in src/allocation.py, and shows the schedule and unmet demand.
+    """
+    import plotly.express as px
+    from src.allocation import plan_allocation, district_totals
+
+    st.subheader("Mobile Van & Camp Allocation")
+
+    if store is None or len(store.pincodes) == 0 or filtered_df.empty:
+        st.warning("Demand data not found. Please run 'scripts/generate_data.py' first.")
+        return
+
+    level = None
+    if df_forecast is not None and not df_forecast.empty:
+        level = next((c for c in ['district', 'pincode', 'state'] if c in df_forecast.columns), None)
+    max_horizon = df_forecast['month'].nunique() if level else 12
+
+    c1, c2, c3, c4 = st.columns(4)
+    vans = c1.number_input("Vans per District", min_value=0, max_value=50, value=2)
+    camp_days = c2.slider("Camp Days per Van / Month", 5, 26, 20)
+    daily_capacity = c3.number_input("MBUs per Camp Day", min_value=10, max_value=1000, value=150, step=10)
+    horizon = c4.slider("Horizon (Months)", 1, max_horizon, min(6, max_horizon))
+
+    carry_over = True
+    result = plan_allocation(
+        store, filtered_df, df_forecast=df_forecast if level else None, level=level or 'district',
+        horizon=horizon, vans_per_district=vans, camp_days=camp_days, daily_capacity=daily_capacity,
+        carry_over=carry_over)
+    stats = result['stats']
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Pincodes Eligible for Camps", f"{stats['pincodes']:,}")
+    m2.metric("Forecast MBU Demand", f"{stats['demand']:,.0f}")
+    m3.metric("Unmet Demand", f"{stats['unmet']:,.0f}", delta=f"{stats['unmet_pct']:.1f}%", delta_color="inverse")
+    m4.metric("Camp Capacity Used", f"{stats['capacity_utilization_pct']:.1f}%")
+    st.caption(f"Solved in {stats['solve_s'] * 1000:.0f} ms. Demand source: "
+               f"{'pipeline forecast (' + level + ' level)' if level else 'recent monthly mean per pincode'}.")
+
+    df_summary = result['summary']
+    if df_summary.empty:
+        st.info("No pincodes in the intervention bands for the current filters.")
+        return
+
+    unmet = district_totals(df_summary, carry_over)
+    unmet = unmet.sort_values('unmet', ascending=False).head(20)
+    fig = px.bar(unmet, x='district', y=['served', 'unmet'], title="Served vs Unmet MBU Demand (Top 20 Districts by Unmet)",
+                 color_discrete_map={'served': '#2ca02c', 'unmet': '#d62728'})
+    st.plotly_chart(fig, use_container_width=True)
+
+    df_schedule = result['schedule']
+    st.markdown("#### Camp Schedule")
+    st.dataframe(df_schedule, use_container_width=True, hide_index=True)
+    st.download_button("Download Schedule (CSV)", df_schedule.to_csv(index=False), file_name="van_schedule.csv",
+                       mime="text/csv")
@@ -1,12 +1,19 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
 
-def render_demand_forecast(df_demand, selected_state, selected_district):
+def render_demand_forecast(store, selected_state, selected_district):
+    """
+    Renders the forecast for one district or pincode of a SeriesStore (already limited to
+    the selected state); the history is a row slice of the store rather than a groupby.
+    """
+    # Imported lazily: plotly and statsmodels dominate dashboard cold-start time
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
     st.subheader("MBU Demand Forecasting (Holt-Winters)")
     
-    if df_demand is None or df_demand.empty:
+    if store is None or len(store.pincodes) == 0:
         st.warning("Forecasting data not found. Please ensure 'monthly_demand.json' exists.")
         return
 
@@ -15,33 +22,31 @@ def render_demand_forecast(df_demand, selected_state, selected_district):
         forecast_level = st.radio("Forecast Level", ["District", "Pincode"])
         target_entity = None
         if forecast_level == "District":
-            if selected_state == 'All':
-                dist_opts = df_demand['district'].unique().tolist()
-            else:
-                dist_opts = df_demand[df_demand['state'] == selected_state]['district'].unique().tolist()
+            dist_opts = store.labels('district').tolist()
             target_entity = st.selectbox("Select District", sorted(dist_opts))
         else:
             if selected_district != 'All':
-                pin_opts = df_demand[df_demand['district'] == selected_district]['pincode'].unique().tolist()
-            elif selected_state != 'All':
-                pin_opts = df_demand[df_demand['state'] == selected_state]['pincode'].unique().tolist()
+                pin_opts = store.pincodes_in('district', selected_district).tolist()
             else:
-                pin_opts = df_demand['pincode'].unique().tolist()
+                pin_opts = store.pincodes.tolist()
                 
             target_entity = st.selectbox("Select Pincode", sorted(pin_opts))
         
         forecast_months = st.slider("Forecast Horizon (Months)", 1, 12, 6)
+        show_interval = st.checkbox("Show P10–P90 Interval", value=True,
+                                    help="80% prediction interval from a residual bootstrap of the fitted model.")
+
+        # Enrolment cohorts are only present in stores written by the pipeline
+        has_cohorts = 'enrol_age_0_5' in store.matrices or 'enrol_age_5_17' in store.matrices
+        if has_cohorts:
+            blend_weight = st.slider("Cohort Projection Weight", 0.0, 1.0, 0.5, 0.1,
+                                     help="Share of the enrolment cohort projection in the blended forecast.")
         
     with fc2:
         if target_entity:
             try:
-                if forecast_level == "District":
-                    ts_data = df_demand[df_demand['district'] == target_entity].groupby('month')['mbu_demand'].sum().reset_index()
-                else:
-                    ts_data = df_demand[df_demand['pincode'] == target_entity].groupby('month')['mbu_demand'].sum().reset_index()
-                
-                ts_data = ts_data.sort_values('month')
-                ts_data.set_index('month', inplace=True)
+                level = 'district' if forecast_level == "District" else 'pincode'
+                ts_data = store.series('mbu_demand', target_entity, level=level).rename_axis('month').to_frame()
                 
                 if len(ts_data) < 4:
                     st.warning(f"Not enough data points to forecast for {target_entity} (at least 4 months required).")
@@ -54,6 +59,24 @@ def render_demand_forecast(df_demand, selected_state, selected_district):
                     last_date = ts_data.index[-1]
                     forecast_dates = [last_date + pd.DateOffset(months=i) for i in range(1, forecast_months + 1)]
                     forecast_df = pd.DataFrame({'month': forecast_dates, 'mbu_demand': forecast_values.values, 'Type': 'Forecast'})
+                    interval_df = None
+                    if show_interval:
+                        from src.forecasting import holt_state, simulate_intervals
+                        p10, p50, p90 = simulate_intervals([holt_state(model)], forecast_months)[:, 0]
+                        interval_df = pd.DataFrame({'month': forecast_dates, 'p10': p10, 'p50': p50, 'p90': p90})
+
+                    if has_cohorts:
+                        # Whole-store projection, shared across sessions; horizons start after
+                        # each entity's last month of demand, like forecast_dates
+                        from dashboard.data_store import load_cohort_forecast
+                        df_cohort = load_cohort_forecast(selected_state, level, forecast_months)
+                        cohort_values = df_cohort[df_cohort[level] == str(target_entity)]['cohort_forecast'].to_numpy()
+                        if len(cohort_values) == forecast_months:
+                            cohort_df = forecast_df.assign(mbu_demand=cohort_values, Type='Cohort Projection')
+                            blended_df = forecast_df.assign(
+                                mbu_demand=blend_weight * cohort_values + (1 - blend_weight) * forecast_values.values,
+                                Type='Blended')
+                            forecast_df = pd.concat([forecast_df, cohort_df, blended_df], ignore_index=True)
                     
                     history_df = ts_data.reset_index()
                     history_df['Type'] = 'Historical'
@@ -63,10 +86,24 @@ def render_demand_forecast(df_demand, selected_state, selected_district):
                     fig_forecast = px.line(combined_df, x='month', y='mbu_demand', color='Type', 
                                            title=f"MBU Demand Forecast for {target_entity}",
                                            markers=True,
-                                           color_discrete_map={'Historical': 'grey', 'Forecast': '#2ca02c'})
+                                           color_discrete_map={'Historical': 'grey', 'Forecast': '#2ca02c',
+                                                               'Cohort Projection': '#ff7f0e', 'Blended': '#1f77b4'})
+                    if interval_df is not None:
+                        # Band from the last observed month so it joins the history line
+                        last = float(series.iloc[-1])
+                        months = [last_date] + forecast_dates
+                        fig_forecast.add_trace(go.Scatter(x=months, y=[last] + interval_df['p90'].tolist(), mode='lines',
+                                                          line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                        fig_forecast.add_trace(go.Scatter(x=months, y=[last] + interval_df['p10'].tolist(), mode='lines',
+                                                          line=dict(width=0), fill='tonexty',
+                                                          fillcolor='rgba(44, 160, 44, 0.2)', name='P10–P90 Interval'))
                     st.plotly_chart(fig_forecast, use_container_width=True)
                     
                     with st.expander("View Forecast Data"):
+                        if interval_df is not None:
+                            # The interval belongs to the statistical forecast rows only
+                            forecast_df = forecast_df.merge(interval_df, on='month', how='left')
+                            forecast_df.loc[forecast_df['Type'] != 'Forecast', ['p10', 'p50', 'p90']] = None
                         st.dataframe(forecast_df)
             except Exception as e:
                 st.error(f"Forecasting Error: {e}")
@@ -1,7 +1,8 @@
 import streamlit as st
-import plotly.express as px
 
 def render_ihs_distribution(filtered_df):
+    import plotly.express as px
+
     st.subheader("Identity Health Score (IHS) Distribution")
     if not filtered_df.empty:
         color_map = {
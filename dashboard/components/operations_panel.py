@@ -0,0 +1,57 @@
+import streamlit as st
+import pandas as pd
+import os
+
+# Trace folders written by scripts/generate_data.py and dashboard/scripts/process_data.py
+TRACE_DIRS = [
+    'data/traces',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'traces'),
+]
+
+def render_operations_panel():
+    # Imported lazily like the other plotly views
+    import plotly.express as px
+    from src.instrumentation import load_traces
+
+    st.title("Operations: Pipeline Runs")
+
+    traces = [t for trace_dir in TRACE_DIRS for t in load_traces(trace_dir)]
+    if not traces:
+        st.info("No run traces found yet. Run 'scripts/generate_data.py' or 'dashboard/scripts/process_data.py' first.")
+        return
+    traces.sort(key=lambda t: t['started_at'], reverse=True)
+
+    labels = [f"{t['started_at']}  {t['name']}  ({t['status']})" for t in traces]
+    choice = st.selectbox("Run", range(len(traces)), format_func=lambda i: labels[i])
+    trace = traces[choice]
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Wall Time", f"{trace['wall_s']:.2f}s")
+    c2.metric("CPU Time", f"{trace['cpu_s']:.2f}s")
+    c3.metric("Process Peak RSS", f"{trace['peak_rss_mb']:.0f} MB")
+
+    spans = pd.DataFrame(trace['spans'])
+    if spans.empty:
+        st.warning("This run recorded no spans.")
+        return
+    spans = spans.sort_values('start_offset_s')
+    spans['cached'] = spans['attrs'].apply(lambda a: a.get('cached'))
+    spans['span'] = spans['depth'].apply(lambda d: ' ' * d) + spans['name']
+
+    # Stage spans are the top level; nested spans are the instrumented src functions
+    stages = spans[spans['depth'] == 0]
+    fig = px.bar(stages, x='wall_s', y='name', color='cached', orientation='h',
+                 title="Wall Time per Stage", labels={'wall_s': 'Seconds', 'name': 'Stage'})
+    fig.update_yaxes(categoryorder='array', categoryarray=stages['name'].tolist()[::-1])
+    st.plotly_chart(fig, use_container_width=True)
+
+    # peak_rss_delta_mb: the span's peak RSS over its start RSS (traces before it lack the column)
+    columns = ['span', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'rows_dropped',
+               'rss_start_mb', 'rss_end_mb', 'peak_rss_delta_mb', 'cached']
+    st.dataframe(spans[[c for c in columns if c in spans.columns]], use_container_width=True, hide_index=True)
+
+    profiles = spans['profile'].dropna().tolist()
+    if profiles:
+        st.caption("cProfile dumps (open with `python -m pstats` or snakeviz):")
+        for path in profiles:
+            st.code(path, language=None)
@@ -1,7 +1,8 @@
 import streamlit as st
-import plotly.express as px
 
 def render_strategy_panel(filtered_df):
+    import plotly.express as px
+
     c3, c4 = st.columns([1, 2])
     with c3:
         st.subheader("Recommended Strategies")
@@ -21,7 +22,7 @@ def render_strategy_panel(filtered_df):
             
     with c4:
         st.subheader("Pincode Details")
-        cols = ['pincode', 'district', 'state', 'total_update_load', 'ihs_score', 'risk_category', 'strategy']
+        cols = ['pincode', 'district', 'state', 'total_update_load', 'neighbour_load', 'ihs_score', 'risk_category', 'strategy']
         # Filter for existing columns
         cols = [c for c in cols if c in filtered_df.columns]
         st.dataframe(filtered_df[cols], 
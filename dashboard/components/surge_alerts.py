@@ -0,0 +1,21 @@
+import streamlit as st
+
+def render_surge_alerts(filtered_df):
+    """
+    Lists pincodes whose daily update volume surged recently (src/surge_detection.py).
+    """
+    if 'surge_flag' not in filtered_df.columns:
+        return
+
+    surging = filtered_df[filtered_df['surge_flag'].astype(bool)]
+    if surging.empty:
+        st.success("No update surges detected in the most recent week.")
+        return
+
+    st.warning(f"{len(surging):,} pincodes show an update surge in the most recent week.")
+    with st.expander("View Surging Pincodes"):
+        cols = ['pincode', 'district', 'state', 'surge_days', 'surge_score', 'last_surge_date', 'total_update_load', 'strategy']
+        cols = [c for c in cols if c in surging.columns]
+        sort_col = 'surge_score' if 'surge_score' in surging.columns else 'surge_days'
+        st.dataframe(surging.sort_values(sort_col, ascending=False)[cols],
+                     use_container_width=True, hide_index=True)
@@ -0,0 +1,96 @@
+import streamlit as st
+
+RATE_ESTIMATOR_LABELS = {
+    None: "Raw rate",
+    'poisson_gamma': "Shrunk to district (Poisson-gamma)",
+    'beta_binomial': "Shrunk to district (beta-binomial)",
+}
+
+def render_what_if(engine, selected_state, selected_district):
+    """
+    What-if analysis: rescores every pincode under slider-chosen IHS weights, strategy cut
+    points, risk quantiles and rate estimator (src/what_if.py) and compares the result with
+    the baseline run.
+    """
+    import plotly.express as px
+
+    st.subheader("What-If Analysis: IHS Weights & Risk Thresholds")
+
+    if engine is None:
+        st.warning("What-if analysis needs mbu_rate and demo_rate in the processed metrics. "
+                   "Please re-run 'scripts/generate_data.py'.")
+        return
+
+    base = engine.baseline
+    weights = base['ihs_weights']
+    baseline_note = ("the settings of the last pipeline run" if engine.baseline_recorded else
+                     "settings inferred from the strategy labels (re-run the pipeline to record the exact ones)")
+    st.caption("Scores are recomputed from the cached update rates; only the steps affected by a changed "
+               f"setting are rerun. Baseline: {baseline_note}.")
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        st.markdown("**IHS Weights**")
+        mbu_weight = st.slider("Biometric (MBU) Rate Weight", 0, 500, int(weights['mbu_weight']), step=10)
+        mbu_cap = st.slider("Biometric Bonus Cap", 0, 400, int(weights['mbu_cap']), step=10)
+        demo_weight = st.slider("Demographic Rate Weight", 0, 500, int(weights['demo_weight']), step=10)
+        demo_cap = st.slider("Demographic Bonus Cap", 0, 400, int(weights['demo_cap']), step=10)
+    with c2:
+        st.markdown("**Strategy Cut Points**")
+        low, high = base['strategy_cut_points']
+        cut_points = st.slider("Intervention / Awareness / Maintain boundaries", 500, 1200,
+                               (int(low), int(high)), step=5)
+    with c3:
+        st.markdown("**Risk Thresholds**")
+        if base['risk_method'] == 'load_threshold':
+            high_load_quantile = st.slider("High Risk Load Quantile", 0.50, 0.99, float(base['high_load_quantile']),
+                                           step=0.01)
+            risk_params = {'high_load_quantile': high_load_quantile}
+        else:
+            low_q, high_q = base['risk_quantiles']
+            quantiles = st.slider("Low / High Load Rate Quantiles", 0.0, 1.0, (float(low_q), float(high_q)), step=0.01)
+            risk_params = {'risk_quantiles': quantiles}
+
+        estimators = engine.rate_estimators
+        if len(estimators) > 1:
+            estimator = st.selectbox("Rate Estimator", estimators, index=estimators.index(base['rate_shrinkage']),
+                                     format_func=lambda m: RATE_ESTIMATOR_LABELS.get(m, m),
+                                     help="Empirical-Bayes shrinkage pulls rates from small enrolment counts "
+                                          "toward their district/state rate.")
+            risk_params['rate_shrinkage'] = estimator
+
+    scenario = {
+        'ihs_weights': {**weights, 'mbu_weight': mbu_weight, 'mbu_cap': mbu_cap,
+                        'demo_weight': demo_weight, 'demo_cap': demo_cap},
+        'strategy_cut_points': cut_points,
+        **risk_params,
+    }
+    mask = engine.mask(selected_state, selected_district)
+    comparison = engine.compare(scenario, mask)
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Pincodes in View", f"{comparison['pincodes']:,}")
+    m2.metric("Pincodes Changing Strategy", f"{comparison['changed']:,}")
+    m3.metric("Rescoring Time", f"{comparison['elapsed_ms']:.0f} ms")
+    recomputed = ', '.join(comparison['recomputed']) or 'none (cached)'
+    st.caption(f"Recomputed: {recomputed}.")
+
+    counts = comparison['strategy_counts']
+    c1, c2 = st.columns(2)
+    with c1:
+        long = counts.melt(id_vars='strategy', value_vars=['baseline', 'scenario'], var_name='run', value_name='pincodes')
+        fig = px.bar(long, x='strategy', y='pincodes', color='run', barmode='group',
+                     title="Strategy Counts: Baseline vs Scenario")
+        st.plotly_chart(fig, use_container_width=True)
+    with c2:
+        st.markdown("#### Strategy Change")
+        st.dataframe(counts, use_container_width=True, hide_index=True)
+        st.markdown("#### Risk Category Change")
+        st.dataframe(comparison['risk_counts'], use_container_width=True, hide_index=True)
+
+    with st.expander("Strategy Transitions (Baseline → Scenario)"):
+        st.dataframe(comparison['transitions'], use_container_width=True)
+
+    if comparison['changed']:
+        st.markdown("#### Pincodes Changing Strategy")
+        st.dataframe(engine.changed_pincodes(comparison, mask), use_container_width=True, hide_index=True)
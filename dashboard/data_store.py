@@ -0,0 +1,313 @@
+import os
+import json
+import pandas as pd
+import streamlit as st
+
+from src import partitioning
+
+# Sources are tried in order: state-partitioned datasets (src/partitioning.py) first,
+# then the monolithic CSV, then the legacy JSON written by dashboard/scripts/process_data.py
+METRICS_SOURCES = [
+    'data/processed/ihs_features_population',
+    'dashboard_metrics',
+    'data/processed/ihs_features_population.csv',
+    'dashboard_metrics.json',
+]
+DEMAND_SOURCES = [
+    'data/processed/biometric_mbu_aggregated',
+    'monthly_demand',
+    'data/processed/biometric_mbu_aggregated.csv',
+    'monthly_demand.json',
+]
+# District (or pincode) forecasts written by the pipeline's forecast stage
+FORECAST_SOURCES = [
+    'data/processed/demand_forecast.csv',
+    'demand_forecast.json',
+]
+# Sparse pincode x month store written by the pipeline (src/series_store.py)
+SERIES_SOURCES = [
+    'data/processed/series_store.npz',
+    'series_store.npz',
+]
+
+# Low-cardinality text columns are stored as categoricals in the shared copy
+CATEGORICAL_COLUMNS = ['state', 'district', 'risk_category', 'strategy']
+
+def data_version(*paths):
+    """
+    Returns a version key built from the size and modification time of each file.
+    The shared cache is keyed on it, so regenerating the data invalidates the handle.
+    """
+    version = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+def _resolve_source(sources):
+    """
+    Returns the first available source path, or None.
+    """
+    for path in sources:
+        if os.path.isdir(path):
+            if partitioning.read_manifest(path) is not None:
+                return path
+        elif os.path.exists(path):
+            return path
+    return None
+
+def _source_version(path):
+    if path is None:
+        return ()
+    if os.path.isdir(path):
+        return data_version(os.path.join(path, partitioning.MANIFEST_FILE))
+    return data_version(path)
+
+def _read_table(path, state):
+    """
+    Reads a source; partitioned sources only read the partitions of the selected state.
+    """
+    if path is None:
+        return None
+    if os.path.isdir(path):
+        return partitioning.load_partitions(path, state=state)
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return pd.DataFrame(data)
+    return pd.read_csv(path)
+
+def _partition_key(path, state):
+    # Single-file sources are always loaded whole and filtered with filter_view(),
+    # so they are cached once rather than once per state
+    return state if path is not None and os.path.isdir(path) else 'All'
+
+def _compact(df):
+    """
+    Converts repeated text columns to categoricals so the single shared copy stays small.
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+def _prepare_metrics(df):
+    if 'pincode' in df.columns:
+        df['pincode'] = df['pincode'].astype(str)
+
+    # Ensure columns exist (for legacy/synthetic data compat)
+    if 'total_update_load' not in df.columns and 'mbu_rate' in df.columns:
+        # Approximate load if missing
+        df['total_update_load'] = df['bio_age_5_17'] + df['demo_age_5_17']
+
+    return _compact(df)
+
+def _prepare_demand(df):
+    if 'pincode' in df.columns:
+        df['pincode'] = df['pincode'].astype(str)
+    if 'month' in df.columns:
+        # Convert month string (YYYY-MM) to proper date for plotting
+        try:
+            df['month'] = pd.to_datetime(df['month'])
+        except (ValueError, TypeError):
+            pass
+
+    return _compact(df)
+
+@st.cache_resource(max_entries=64)
+def _load_shared_metrics(path, version, state):
+    df = _read_table(path, state)
+    return None if df is None else _prepare_metrics(df)
+
+@st.cache_resource(max_entries=64)
+def _load_shared_demand(path, version, state):
+    df = _read_table(path, state)
+    return None if df is None else _prepare_demand(df)
+
+@st.cache_resource(max_entries=64)
+def _load_shared_series(path, version, state):
+    from src.series_store import SeriesStore
+    if path is not None:
+        return SeriesStore.load(path).subset('state', state)
+    # No store on disk (older outputs): build one from the demand table instead
+    df = load_demand_data(state)
+    if df is None or df.empty:
+        return None
+    return SeriesStore.from_long(df, measures=['mbu_demand'])
+
+def load_data(state='All'):
+    """
+    Returns the process-wide pincode metrics DataFrame for a state ('All' for India).
+    The same object is handed to every session and must be treated as read-only;
+    derive views with filter_view() instead of modifying it.
+    """
+    path = _resolve_source(METRICS_SOURCES)
+    return _load_shared_metrics(path, _source_version(path), _partition_key(path, state))
+
+def load_demand_data(state='All'):
+    """
+    Returns the process-wide monthly demand DataFrame for a state (read-only, shared across sessions).
+    """
+    path = _resolve_source(DEMAND_SOURCES)
+    return _load_shared_demand(path, _source_version(path), _partition_key(path, state))
+
+@st.cache_resource(max_entries=4)
+def _load_shared_forecast(path, version):
+    df = _read_table(path, 'All')
+    return None if df is None else _compact(df)
+
+def load_forecast_data():
+    """
+    Returns the process-wide forecast table (entity, month, forecast[, cohort/blended]) or None.
+    """
+    path = _resolve_source(FORECAST_SOURCES)
+    return _load_shared_forecast(path, _source_version(path))
+
+def load_series_store(state='All'):
+    """
+    Returns the process-wide SeriesStore (pincode x month matrices with district/state
+    roll-ups) for a state, or None when no demand data exists. Read-only, shared across sessions.
+    """
+    path = _resolve_source(SERIES_SOURCES)
+    demand_path = _resolve_source(DEMAND_SOURCES)
+    version = _source_version(path) if path else _source_version(demand_path)
+    return _load_shared_series(path, version, state)
+
+@st.cache_resource(max_entries=64)
+def _load_shared_cohort_forecast(path, version, state, level, horizon):
+    from src.cohort_projection import cohort_forecast
+    store = _load_shared_series(path, version, state)
+    return None if store is None else cohort_forecast(store, level=level, horizon=horizon)
+
+def load_cohort_forecast(state='All', level='district', horizon=6):
+    """
+    Returns the process-wide cohort projection (level, month, cohort_forecast) of every
+    district or pincode of a state's SeriesStore for a horizon, or None without a store.
+    """
+    path = _resolve_source(SERIES_SOURCES)
+    version = _source_version(path) if path else _source_version(_resolve_source(DEMAND_SOURCES))
+    return _load_shared_cohort_forecast(path, version, state, level, horizon)
+
+def _run_config(path):
+    from src.pipeline import read_run_config
+    return None if path is None else read_run_config(path)
+
+def _run_config_version(path):
+    # Version of a metrics source including its run-config sidecar, which is written last
+    if path is None:
+        return ()
+    from src.pipeline import run_config_path
+    return _source_version(path) + data_version(run_config_path(path))
+
+@st.cache_resource(max_entries=4)
+def _load_shared_what_if(path, version):
+    from src.what_if import WhatIfEngine
+    df = _load_shared_metrics(path, _source_version(path), 'All')
+    if df is None or not {'mbu_rate', 'demo_rate'}.issubset(df.columns):
+        return None
+    return WhatIfEngine(df, run_config=_run_config(path))
+
+def load_what_if_engine():
+    """
+    Returns the process-wide WhatIfEngine over all pincodes (risk quantiles are national, as
+    in the pipeline), or None when the metrics lack the cached rate columns. Views select
+    their state/district with engine.mask().
+    """
+    path = _resolve_source(METRICS_SOURCES)
+    return _load_shared_what_if(path, _run_config_version(path))
+
+@st.cache_resource(max_entries=4)
+def _load_shared_window_index(path, version):
+    from src.window_index import WindowIndex
+    store = _load_shared_series(path, version, 'All')
+    return None if store is None or len(store.periods) == 0 else WindowIndex(store)
+
+def load_window_index():
+    """
+    Returns the process-wide WindowIndex (month prefix sums of the national SeriesStore)
+    or None when no demand data exists.
+    """
+    path = _resolve_source(SERIES_SOURCES)
+    version = _source_version(path) if path else _source_version(_resolve_source(DEMAND_SOURCES))
+    return _load_shared_window_index(path, version)
+
+@st.cache_resource(max_entries=32)
+def _load_shared_window_metrics(series_path, series_version, metrics_path, metrics_version, start, end):
+    from src.what_if import source_config
+    from src.window_index import window_metrics
+    index = _load_shared_window_index(series_path, series_version)
+    df = _load_shared_metrics(metrics_path, _source_version(metrics_path), 'All')
+    if index is None or df is None:
+        return None
+    # The settings the metrics were exported with, so the full range reproduces them
+    return window_metrics(index, start, end, source_config(df, _run_config(metrics_path)))
+
+def load_window_metrics(start, end):
+    """
+    Returns the process-wide per-pincode metrics (update loads, mbu_rate, national risk
+    bands) for the months start..end (YYYY-MM strings), indexed by pincode, or None.
+    """
+    series_path = _resolve_source(SERIES_SOURCES)
+    series_version = (_source_version(series_path) if series_path
+                      else _source_version(_resolve_source(DEMAND_SOURCES)))
+    metrics_path = _resolve_source(METRICS_SOURCES)
+    return _load_shared_window_metrics(series_path, series_version, metrics_path,
+                                       _run_config_version(metrics_path), start, end)
+
+def available_states():
+    """
+    Returns the sorted list of states with metrics. Partitioned sources answer from the
+    manifest alone, without reading any partition.
+    """
+    path = _resolve_source(METRICS_SOURCES)
+    if path is not None and os.path.isdir(path):
+        return partitioning.partition_values(partitioning.read_manifest(path), 'state')
+
+    df = load_data()
+    if df is None or 'state' not in df.columns:
+        return []
+    return sorted(df['state'].unique().tolist())
+
+def filter_view(df, **filters):
+    """
+    Returns the rows of a shared DataFrame matching all column == value filters.
+    Filters set to 'All' or None are ignored. When no row is filtered out the shared
+    object itself is returned, so an unfiltered session holds no extra copy.
+    """
+    mask = None
+    for col, value in filters.items():
+        if value in (None, 'All') or col not in df.columns:
+            continue
+        col_mask = (df[col] == value).to_numpy()
+        mask = col_mask if mask is None else mask & col_mask
+
+    if mask is None or mask.all():
+        return df
+    return df[mask]
+
+def frame_bytes(df):
+    """
+    Returns the deep memory footprint of a DataFrame (or of an object with nbytes,
+    such as a SeriesStore) in bytes (0 for None).
+    """
+    if df is None:
+        return 0
+    if hasattr(df, 'nbytes'):
+        return int(df.nbytes)
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+def memory_report(shared_frames, session_frames):
+    """
+    Summarises memory held by the shared data handle versus one session's derived views.
+    Views that are the shared object itself are not counted as session overhead.
+    """
+    shared_ids = {id(df) for df in shared_frames if df is not None}
+    shared_bytes = sum(frame_bytes(df) for df in shared_frames)
+    session_bytes = sum(frame_bytes(df) for df in session_frames if id(df) not in shared_ids)
+
+    return {
+        'shared_mb': shared_bytes / 1e6,
+        'session_mb': session_bytes / 1e6,
+        'session_pct': 100.0 * session_bytes / shared_bytes if shared_bytes else 0.0,
+    }
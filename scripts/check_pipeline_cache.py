@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import pipeline
+
+def check_export_reuse(workdir):
+    """
+    Regression check for the export cache: runs config A, then B (other IHS weights) into
+    the same output_path, then A again. The third run must re-export A's metrics rather
+    than reuse its cached export entry over B's files; a fourth run of A, with nothing
+    changed, must reuse it.
+    """
+    base = {
+        'raw_path': os.path.join(workdir, 'raw'),
+        'output_path': os.path.join(workdir, 'processed'),
+        'cache_dir': os.path.join(workdir, 'cache'),
+        'trace_dir': os.path.join(workdir, 'traces'),
+        'forecast_level': None,
+    }
+    config_a = dict(base)
+    config_b = {**base, 'ihs_weights': {**pipeline.DEFAULT_CONFIG['ihs_weights'], 'base': 300}}
+    metrics_path = os.path.join(base['output_path'], f"{pipeline.DEFAULT_CONFIG['metrics_name']}.csv")
+
+    means = []
+    statuses = []
+    for config in (config_a, config_b, config_a, config_a):
+        _, report = pipeline.run_pipeline(config)
+        statuses.append(dict((name, status) for name, status, _ in report).get('export'))
+        means.append(float(pd.read_csv(metrics_path)['ihs_score'].mean()))
+
+    print(f"export status per run: {statuses}; mean ihs_score per run: {[round(m, 1) for m in means]}")
+    if statuses[2] != 'ran' or abs(means[2] - means[0]) > 1e-9:
+        raise SystemExit("FAIL: the A -> B -> A run reused a stale export")
+    if statuses[3] != 'cached':
+        raise SystemExit("FAIL: an unchanged export was not reused")
+    print("OK: the export was redone after another config overwrote its files, and reused otherwise")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that cached pipeline exports are not reused over "
+                                                 "files written by another config.")
+    parser.add_argument('--workdir', help="Working directory (default: a temporary one).")
+    args = parser.parse_args()
+
+    if args.workdir:
+        check_export_reuse(args.workdir)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            check_export_reuse(workdir)
+
+if __name__ == "__main__":
+    main()
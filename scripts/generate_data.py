@@ -1,84 +1,21 @@
 import os
 import sys
 import pandas as pd
-import numpy as np
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src import data_processing, risk_profiling, ihs_scoring
+def generate_processed_data(config=None, force=False):
+    """
+    Runs the stage-cached pipeline (src/pipeline.py) over data/raw and writes data/processed.
+    Only stages whose inputs or parameters changed since the last run are recomputed.
+    """
+    # Pipeline modules are imported on first use so signal generation stays light
+    from src import pipeline
 
-def generate_processed_data():
-    base_path = 'data/raw'
-    processed_path = 'data/processed'
-    
-    print("Loading raw data...")
-    df_bio, df_demo, df_enrol = data_processing.load_data(base_path)
-    
-    if df_bio.empty and df_demo.empty and df_enrol.empty:
-        print("No raw data found. Generating synthetic data for demonstration.")
-        # Generate synthetic data if raw files are missing/empty
-        pincodes = [110001, 110002, 110003, 110004, 110005, 560001, 560002, 400001]
-        dates = pd.date_range(start='2024-01-01', periods=12, freq='M')
-        
-        # Synthetic IHS/Risk Data
-        df_risk = pd.DataFrame({
-            'pincode': pincodes,
-            'bio_age_5_17': np.random.randint(100, 5000, size=len(pincodes)),
-            'demo_age_5_17': np.random.randint(50, 1000, size=len(pincodes)),
-            'age_5_17': np.random.randint(500, 10000, size=len(pincodes))
-        })
-        
-        # Synthetic Time Series
-        df_monthly = pd.DataFrame()
-        for pc in pincodes:
-            temp = pd.DataFrame({'date': dates, 'pincode': pc})
-            temp['total_updates'] = np.random.randint(50, 200, size=len(dates))
-            temp['mbu_demand'] = np.random.randint(20, 100, size=len(dates))
-            df_monthly = pd.concat([df_monthly, temp])
-            
-    else:
-        print("Aggregating data...")
-        # 1. Pincode Level Aggregation (Risk & IHS)
-        df_risk = data_processing.aggregate_by_pincode(df_bio, df_demo, df_enrol)
-        
-        # 2. Time Series Aggregation (Forecasting)
-        # Note: data_processing.aggregate_time_series aggregates by date globally
-        # For forecasting model we might need per-pincode time series if desired.
-        # But let's use global weekly for now or adjust based on requirement.
-        # The notebook 01 aggregated by month and pincode.
-        # Let's verify data_processing.
-        pass
-        
-    print("Calculating metrics...")
-    # Calculate Rates & Risk
-    df_risk = risk_profiling.calculate_update_rates(df_risk)
-    df_risk = risk_profiling.categorize_risk(df_risk)
-    
-    # Calculate IHS
-    df_risk = ihs_scoring.calculate_pincode_ihs(df_risk)
-    
-    # Add geographic columns (state/district) from pincode
-    df_risk = data_processing.add_geography_from_pincode(df_risk)
-    
-    # Save Processed
-    print(f"Saving to {processed_path}...")
-    df_risk.to_csv(os.path.join(processed_path, 'ihs_features_population.csv'), index=False)
-    
-    # For time series, if synthetic was created, save it. 
-    # If raw existed, we should aggregate it properly for the dashboard.
-    # We will generate a pincode-monthly time-series from raw if available.
-    if not df_bio.empty:
-        df_bio['month'] = pd.to_datetime(df_bio['date'], dayfirst=True, errors='coerce').dt.to_period('M').astype(str)
-        if 'bio_age_5_17' in df_bio.columns:
-            df_monthly = df_bio.groupby(['month', 'pincode'])['bio_age_5_17'].sum().reset_index()
-            df_monthly.rename(columns={'bio_age_5_17': 'mbu_demand'}, inplace=True)
-            # Add geography from pincode
-            df_monthly = data_processing.add_geography_from_pincode(df_monthly)
-            df_monthly.to_csv(os.path.join(processed_path, 'biometric_mbu_aggregated.csv'), index=False)
-    elif 'df_monthly' in locals():
-         df_monthly.to_csv(os.path.join(processed_path, 'biometric_mbu_aggregated.csv'), index=False)
-         
+    print("Running processing pipeline...")
+    _, report = pipeline.run_pipeline(config, force=force)
+    pipeline.print_report(report)
     print("Processed data generated.")
 
 def generate_simulated_signals():
@@ -114,5 +51,8 @@ def generate_simulated_signals():
     print("Simulated signals generated.")
 
 if __name__ == "__main__":
-    generate_processed_data()
+    force = '--force' in sys.argv[1:]
+    # --out-of-core streams the raw extracts through pincode spill partitions (histories larger than RAM)
+    config = {'out_of_core': True} if '--out-of-core' in sys.argv[1:] else None
+    generate_processed_data(config=config, force=force)
     generate_simulated_signals()
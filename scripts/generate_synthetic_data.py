@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import synthetic
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate seeded synthetic api_data_aadhar_* shards for load testing.")
+    parser.add_argument('--output', default='data/synthetic/raw',
+                        help="Output directory (gets biometric/, demographic/ and enrollment/ subfolders).")
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help="Rows per category (biometric and demographic).")
+    parser.add_argument('--enrolment-ratio', type=float, default=0.1,
+                        help="Enrolment rows as a fraction of --rows (production has far fewer).")
+    parser.add_argument('--pincodes', type=int, default=19000, help="Number of distinct pincodes.")
+    parser.add_argument('--start', default='2024-01-01', help="First date of the history.")
+    parser.add_argument('--months', type=int, default=12, help="Length of the history in months.")
+    parser.add_argument('--shard-rows', type=int, default=1_000_000, help="Rows per output file.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--prefix-source', default=None,
+                        help="Raw data directory to copy the 3-digit pincode prefix distribution from.")
+    args = parser.parse_args()
+
+    prefix_weights = None
+    if args.prefix_source:
+        prefix_weights = synthetic.prefix_weights_from_raw(args.prefix_source)
+        if prefix_weights is None:
+            print(f"No extracts found in {args.prefix_source}; using built-in prefix weights.")
+
+    rows = {
+        'biometric': args.rows,
+        'demographic': args.rows,
+        'enrollment': max(1, int(args.rows * args.enrolment_ratio)),
+    }
+
+    print(f"Generating {sum(rows.values()):,} rows across {args.pincodes:,} pincodes into {args.output}...")
+    start = time.perf_counter()
+    paths = synthetic.generate_synthetic_raw(
+        args.output, rows, n_pincodes=args.pincodes, start=args.start, months=args.months,
+        shard_rows=args.shard_rows, workers=args.workers, seed=args.seed, prefix_weights=prefix_weights)
+    elapsed = time.perf_counter() - start
+
+    print(f"Wrote {len(paths)} shards in {elapsed:.1f}s ({sum(rows.values()) / elapsed:,.0f} rows/s).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Entry point name -> code executed in a fresh interpreter.
+# run_path() uses a non-'__main__' run name, so only start-up work (imports and
+# module-level code) is measured, not the pipeline or dashboard itself.
+ENTRY_POINTS = {
+    'dashboard': "import runpy; runpy.run_path('dashboard/app.py')",
+    'generate_data': "import runpy; runpy.run_path('scripts/generate_data.py')",
+    'process_data': "import runpy; runpy.run_path('dashboard/scripts/process_data.py')",
+}
+
+def parse_importtime(stderr):
+    """
+    Parses `python -X importtime` output into a list of
+    {'module', 'self_us', 'cumulative_us', 'depth'} records.
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        self_us, cumulative_us, name = fields
+        # Nested imports are indented by two extra spaces per level
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        records.append({
+            'module': name.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': depth,
+        })
+    return records
+
+def profile_entry_point(name, code, top=15):
+    """
+    Runs one entry point under `-X importtime` in a fresh interpreter and returns its report.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    wall_s = time.perf_counter() - start
+
+    records = parse_importtime(proc.stderr)
+    top_level = [r for r in records if r['depth'] == 0]
+    import_us = sum(r['cumulative_us'] for r in top_level)
+
+    return {
+        'entry_point': name,
+        'returncode': proc.returncode,
+        'wall_s': round(wall_s, 3),
+        'import_s': round(import_us / 1e6, 3),
+        'modules_imported': len(records),
+        'top_cumulative': sorted(top_level, key=lambda r: r['cumulative_us'], reverse=True)[:top],
+        'top_self': sorted(records, key=lambda r: r['self_us'], reverse=True)[:top],
+    }
+
+def print_report(report):
+    print(f"\n== {report['entry_point']} ==")
+    if report['returncode'] != 0:
+        print(f"  (exited with code {report['returncode']})")
+    print(f"  Start-up wall time: {report['wall_s']:.3f} s")
+    print(f"  Import time:        {report['import_s']:.3f} s across {report['modules_imported']} modules")
+    print("  Top-level imports by cumulative time:")
+    for r in report['top_cumulative']:
+        print(f"    {r['cumulative_us'] / 1000:9.1f} ms  {r['module']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile start-up and import time of the Project Setu entry points.")
+    parser.add_argument('entry_points', nargs='*',
+                        help=f"Entry points to profile: {', '.join(ENTRY_POINTS)} (default: all).")
+    parser.add_argument('--top', type=int, default=15, help="Number of modules to list per entry point.")
+    parser.add_argument('--output', help="Optional path to write the full JSON report.")
+    args = parser.parse_args()
+
+    names = args.entry_points or list(ENTRY_POINTS)
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"Unknown entry point(s): {', '.join(unknown)}")
+
+    reports = [profile_entry_point(name, ENTRY_POINTS[name], top=args.top) for name in names]
+    for report in reports:
+        print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nSaved report to {args.output}")
+
+if __name__ == "__main__":
+    main()
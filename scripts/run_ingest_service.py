@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import ingest_service
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Project Setu ingestion API (POST /setu/api/v1/ingest/...).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8040)
+    parser.add_argument('--raw-path', default='data/raw', help="Raw extract directory batches are compacted into.")
+    parser.add_argument('--batch-rows', type=int, default=ingest_service.DEFAULT_BATCH_ROWS,
+                        help="Rows per flushed batch.")
+    parser.add_argument('--flush-interval', type=float, default=ingest_service.DEFAULT_FLUSH_INTERVAL_S,
+                        help="Seconds after a batch's first block at which it is flushed regardless of size.")
+    parser.add_argument('--max-queue-blocks', type=int, default=ingest_service.DEFAULT_MAX_QUEUE_BLOCKS,
+                        help="Queued blocks beyond which new requests are throttled (503).")
+    parser.add_argument('--compact-interval', type=float, default=ingest_service.DEFAULT_COMPACT_INTERVAL_S,
+                        help="Seconds between folding flushed batches into the day's raw extract.")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(ingest_service.serve(
+            args.host, args.port, raw_path=args.raw_path, batch_rows=args.batch_rows,
+            flush_interval=args.flush_interval, max_queue_blocks=args.max_queue_blocks,
+            compact_interval=args.compact_interval,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
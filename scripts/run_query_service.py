@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import query_service
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Project Setu read-only query API (GET /setu/api/v1/query/...).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8041)
+    parser.add_argument('--metrics', help="Pincode metrics CSV or partitioned directory (default: pipeline output).")
+    parser.add_argument('--forecast', help="Forecast CSV (default: pipeline output).")
+    parser.add_argument('--cache-entries', type=int, default=query_service.DEFAULT_CACHE_ENTRIES,
+                        help="Encoded responses kept in the LRU response cache.")
+    parser.add_argument('--reload-interval', type=float, default=query_service.DEFAULT_RELOAD_INTERVAL_S,
+                        help="Seconds between checks for regenerated outputs.")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(query_service.serve(
+            args.host, args.port, metrics_path=args.metrics, forecast_path=args.forecast,
+            cache_entries=args.cache_entries, reload_interval=args.reload_interval,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
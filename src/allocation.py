@@ -0,0 +1,193 @@
+import heapq
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import traced
+
+# Planning defaults: vans available per district each month, camp days a van works per
+# month, and MBUs one camp (one van at one pincode for a day) can process
+DEFAULT_VANS_PER_DISTRICT = 2
+DEFAULT_CAMP_DAYS = 20
+DEFAULT_DAILY_CAPACITY = 150
+
+# Priority multiplier per strategy band, from the lowest IHS band (intervention) upwards;
+# the healthiest band is served by digital nudges, not vans
+DEFAULT_BAND_PRIORITY = (3.0, 1.0, 0.0)
+
+def strategy_bands(df_ihs, labels=None):
+    """
+    Maps each strategy label to its band index (0 = lowest IHS scores) from the configured
+    label order (assign_ihs_strategy's labels; by default those of the config that produced
+    df_ihs), never from the labels present in df_ihs, so a filtered view missing a band
+    still ranks the others correctly.
+    """
+    if labels is None:
+        from src.what_if import source_config
+        labels = source_config(df_ihs)['strategy_labels']
+    return {label: band for band, label in enumerate(labels)}
+
+def pincode_demand(store, horizon=6, df_forecast=None, level='district', value_col=None, share_months=3):
+    """
+    Returns (pincodes, months, demand matrix pincodes x horizon) of forecast MBU demand.
+
+    With a district/state forecast table (e.g. demand_forecast from the pipeline) each entity's
+    forecast is split across its pincodes by their share of mbu_demand over the last
+    share_months. Without one, every pincode's recent monthly mean is carried forward.
+    """
+    recent = store.matrices['mbu_demand'][:, -share_months:].toarray().sum(axis=1)
+    history_end = store.periods[-1] if len(store.periods) else pd.Timestamp.today().normalize().replace(day=1)
+    months = pd.date_range(history_end, periods=horizon + 1, freq='MS')[1:].to_period('M').astype(str)
+
+    if df_forecast is None or df_forecast.empty:
+        return store.pincodes, months, np.repeat((recent / share_months)[:, None], horizon, axis=1)
+
+    if value_col is None:
+        value_col = 'blended_forecast' if 'blended_forecast' in df_forecast.columns else 'forecast'
+    table = df_forecast.assign(**{level: df_forecast[level].astype(str)}).pivot_table(
+        index=level, columns='month', values=value_col, aggfunc='sum')
+    table = table.reindex(columns=months).fillna(0).clip(lower=0)
+
+    if level == 'pincode':
+        return store.pincodes, months, table.reindex(store.pincodes).fillna(0).to_numpy()
+
+    labels, member = store.membership(level)
+    entity_totals = member @ recent
+    codes = member.T.tocsr().indices
+    shares = np.divide(recent, entity_totals[codes], out=np.zeros(len(recent)), where=entity_totals[codes] > 0)
+    entity_forecast = table.reindex(labels).fillna(0).to_numpy()
+    return store.pincodes, months, shares[:, None] * entity_forecast[codes]
+
+@traced()
+def allocate_vans(demand, districts, priority, months, vans_per_district=DEFAULT_VANS_PER_DISTRICT,
+                  camp_days=DEFAULT_CAMP_DAYS, daily_capacity=DEFAULT_DAILY_CAPACITY, carry_over=True):
+    """
+    Greedy van/camp schedule over the forecast horizon.
+
+    Each month a district has vans x camp_days camps; each goes to the pincode with the
+    highest priority x outstanding demand (a max-heap per district) and serves up to
+    daily_capacity MBUs there. Unserved demand carries over to the next month when carry_over=True.
+    vans_per_district is an int or a {district: vans} dict (missing districts get none).
+    Pincodes with priority 0 are never visited.
+
+    Returns {'schedule': one row per van visit, 'summary': per district and month,
+    'stats': solve time, demand, served and unmet totals}.
+    """
+    start = time.perf_counter()
+    demand = np.asarray(demand, dtype=float)
+    districts = np.asarray(districts).astype(str)
+    priority = np.asarray(priority, dtype=float)
+    eligible = priority > 0
+
+    schedule = []
+    summary = []
+    district_labels, codes = np.unique(districts, return_inverse=True)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(district_labels) + 1))
+
+    for d, district in enumerate(district_labels):
+        members = order[bounds[d]:bounds[d + 1]]
+        members = members[eligible[members]]
+        vans = vans_per_district.get(district, 0) if isinstance(vans_per_district, dict) else vans_per_district
+        outstanding = np.zeros(len(members))
+
+        for t, month in enumerate(months):
+            month_demand = demand[members, t]
+            outstanding = outstanding + month_demand if carry_over else month_demand.copy()
+            due = outstanding.sum()
+
+            heap = [(-priority[p] * outstanding[i], i) for i, p in enumerate(members) if outstanding[i] > 0]
+            heapq.heapify(heap)
+            visits = {}
+            for _ in range(vans * camp_days):
+                if not heap:
+                    break
+                _, i = heapq.heappop(heap)
+                served = min(outstanding[i], daily_capacity)
+                outstanding[i] -= served
+                days, total = visits.get(i, (0, 0.0))
+                visits[i] = (days + 1, total + served)
+                if outstanding[i] > 0:
+                    heapq.heappush(heap, (-priority[members[i]] * outstanding[i], i))
+
+            for i, (days, served) in visits.items():
+                schedule.append((month, district, members[i], days, served))
+            served_total = sum(served for _, served in visits.values())
+            summary.append((month, district, float(month_demand.sum()), float(due), served_total,
+                            float(due - served_total), sum(d for d, _ in visits.values()), vans * camp_days))
+
+    df_schedule = pd.DataFrame(schedule, columns=['month', 'district', 'index', 'camp_days', 'served'])
+    df_summary = pd.DataFrame(summary, columns=['month', 'district', 'new_demand', 'due', 'served',
+                                                'unmet', 'camp_days_used', 'camp_days_available'])
+
+    # Demand at pincodes never visited (priority 0) is reported separately from unmet van demand
+    total_demand = float(demand[eligible].sum())
+    served = float(df_summary['served'].sum()) if not df_summary.empty else 0.0
+    days_available = float(df_summary['camp_days_available'].sum()) if not df_summary.empty else 0.0
+    stats = {
+        'solve_s': time.perf_counter() - start,
+        'pincodes': int(eligible.sum()),
+        'months': len(months),
+        'demand': total_demand,
+        'served': served,
+        'unmet': total_demand - served,
+        'unmet_pct': 100.0 * (total_demand - served) / total_demand if total_demand else 0.0,
+        'not_eligible_demand': float(demand[~eligible].sum()),
+        'capacity_utilization_pct': 100.0 * served / (days_available * daily_capacity) if days_available else 0.0,
+    }
+    return {'schedule': df_schedule, 'summary': df_summary, 'stats': stats}
+
+def plan_allocation(store, df_ihs, df_forecast=None, level='district', horizon=6,
+                    vans_per_district=DEFAULT_VANS_PER_DISTRICT, camp_days=DEFAULT_CAMP_DAYS,
+                    daily_capacity=DEFAULT_DAILY_CAPACITY, band_priority=DEFAULT_BAND_PRIORITY, carry_over=True,
+                    strategy_labels=None):
+    """
+    Builds pincode demand from the series store (and forecast table, if given), prioritises
+    pincodes by their IHS strategy band (strategy_labels gives the band order; see
+    strategy_bands) and runs allocate_vans. The schedule gains pincode, state, strategy and
+    ihs_score columns. Without a strategy column (no enrolment data to score IHS), every
+    pincode in df_ihs gets priority 1 and vans follow outstanding demand alone.
+    """
+    pincodes, months, demand = pincode_demand(store, horizon, df_forecast, level=level)
+
+    df_ihs = df_ihs.assign(pincode=df_ihs['pincode'].astype(str)).drop_duplicates('pincode').set_index('pincode')
+    if 'strategy' in df_ihs.columns:
+        bands = strategy_bands(df_ihs, strategy_labels)
+        band = df_ihs['strategy'].astype(object).map(bands).reindex(pincodes)
+        band_priority = np.asarray(band_priority, dtype=float)
+        priority = np.where(band.notna(),
+                            band_priority[band.fillna(0).astype(int).clip(0, len(band_priority) - 1)], 0.0)
+    else:
+        priority = np.isin(pincodes, df_ihs.index).astype(float)
+
+    districts = store.geography.get('district', np.full(len(pincodes), 'Unknown'))
+    result = allocate_vans(demand, districts, priority, months, vans_per_district=vans_per_district,
+                           camp_days=camp_days, daily_capacity=daily_capacity, carry_over=carry_over)
+
+    df_schedule = result['schedule']
+    # int64 so an empty schedule (no pincode in a van band) still indexes
+    df_schedule.insert(2, 'pincode', pincodes[df_schedule.pop('index').to_numpy(dtype=np.int64)])
+    if 'state' in store.geography:
+        state_of = dict(zip(store.pincodes, store.geography['state']))
+        df_schedule.insert(1, 'state', df_schedule['pincode'].map(state_of))
+    info = df_ihs.reindex(df_schedule['pincode'])
+    for col in ('strategy', 'ihs_score'):
+        if col in info.columns:
+            df_schedule[col] = info[col].to_numpy()
+    return result
+
+def district_totals(df_summary, carry_over=True):
+    """
+    Served and unmet MBU demand per district over the horizon from an allocation summary.
+    With carry_over, each month's unmet includes the backlog of earlier months, so a
+    district's unmet demand is its last month's value rather than the sum over months
+    (which would count the same backlog once per month); the totals then match
+    stats['unmet'].
+    """
+    served = df_summary.groupby('district')['served'].sum()
+    if carry_over:
+        unmet = df_summary.sort_values('month').groupby('district')['unmet'].last()
+    else:
+        unmet = df_summary.groupby('district')['unmet'].sum()
+    return pd.DataFrame({'served': served, 'unmet': unmet}).reset_index()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.series_store import SeriesStore
+from src.instrumentation import traced
+
+# How each enrolment cohort reaches a mandatory biometric update (MBU) age, assuming ages
+# are spread evenly within the band: (store measure, months over which the cohort's
+# crossings are spread, share of the cohort crossing in each of those months).
+#   0-5 band: every child reaches 5 within the next 60 months, 1/60 of them per month.
+#   5-17 band (156 months of ages): the 10 years of ages below 15 reach 15 within the
+#   next 120 months, 1/156 of the band per month.
+COHORT_KERNELS = [
+    ('enrol_age_0_5', 60, 1 / 60),
+    ('enrol_age_5_17', 120, 1 / 156),
+]
+
+# Months at the end of the history used to calibrate take-up (due -> observed MBU)
+CALIBRATION_MONTHS = 6
+
+def box_convolve(x, width, weight, horizon=0):
+    """
+    Convolves every row of x (series x months) with a box kernel over lags 1..width,
+    extended horizon months past the end: out[:, t] = weight * sum(x[:, t-width:t]).
+    Computed from a running sum, so the cost is O(rows x months) for any width.
+    """
+    n, months = x.shape
+    padded = np.zeros((n, months + horizon))
+    padded[:, :months] = x
+    # totals[:, j] = sum of the first j months
+    totals = np.zeros((n, months + horizon + 1))
+    np.cumsum(padded, axis=1, out=totals[:, 1:])
+    t = np.arange(months + horizon)
+    return weight * (totals[:, t] - totals[:, np.maximum(t - width, 0)])
+
+@traced()
+def project_mbu_due(store, horizon=6, kernels=COHORT_KERNELS):
+    """
+    Ages the enrolment cohorts of a SeriesStore forward month by month, for every pincode
+    at once, and returns a SeriesStore with an 'mbu_due' measure: the expected number of
+    children becoming due for an MBU in each month of the history plus horizon months.
+    """
+    periods = store.periods
+    if len(periods):
+        periods = pd.date_range(periods[0], periods=len(periods) + horizon, freq='MS')
+    due = np.zeros((len(store.pincodes), len(periods)))
+    for measure, width, weight in kernels:
+        if measure in store.matrices:
+            due += box_convolve(store.matrices[measure].toarray(), width, weight, horizon)
+    return SeriesStore(store.pincodes, periods, {'mbu_due': sparse.csr_matrix(due)}, store.geography)
+
+def calibrate_take_up(store, due_store, months=CALIBRATION_MONTHS):
+    """
+    Ratio of observed MBU demand to projected MBUs due over the last months of the history,
+    i.e. the share of due children that actually update in the month they become due.
+    """
+    n_history = len(store.periods)
+    if 'mbu_demand' not in store.matrices or n_history == 0:
+        return 1.0
+    window = slice(max(n_history - months, 0), n_history)
+    due = due_store.matrices['mbu_due'][:, window].sum()
+    observed = store.matrices['mbu_demand'][:, window].sum()
+    return float(observed / due) if due > 0 else 1.0
+
+def last_active_month(store, level='district', measure='mbu_demand'):
+    """
+    Index (into store.periods) of the last month with non-zero measure for every entity of
+    a level, in store.labels(level) order: the month after which forecast_store's trimmed
+    series end and their forecasts start. Entities without activity get the last month of
+    the history.
+    """
+    n_history = len(store.periods)
+    if measure not in store.matrices:
+        return np.full(len(store.labels(level)), n_history - 1)
+    _, x = store.matrix(measure, level)
+    active = x.toarray() != 0
+    last = n_history - 1 - np.argmax(active[:, ::-1], axis=1)
+    return np.where(active.any(axis=1), last, n_history - 1)
+
+@traced()
+def cohort_forecast(store, level='district', horizon=6, take_up=None):
+    """
+    Returns the cohort-based MBU forecast as a long table (level, month, cohort_forecast):
+    projected MBUs due scaled by the take-up rate (calibrated on the history when take_up
+    is None). Each entity's horizon starts after its last month of MBU demand, like its
+    statistical forecast (see last_active_month), so blend_forecasts pairs the same months.
+    """
+    columns = [level, 'month', 'cohort_forecast']
+    if len(store.periods) == 0 or not any(m in store.matrices for m, _, _ in COHORT_KERNELS):
+        return pd.DataFrame(columns=columns)
+
+    n_history = len(store.periods)
+    last = last_active_month(store, level)
+    # Project far enough past the history for the entity whose demand stopped earliest
+    extra = horizon + int(n_history - 1 - last.min()) if len(last) else horizon
+    due_store = project_mbu_due(store, extra)
+    if take_up is None:
+        take_up = calibrate_take_up(store, due_store)
+
+    labels, due = due_store.matrix('mbu_due', level)
+    columns_idx = last[:, None] + 1 + np.arange(horizon)
+    future = due.toarray()[np.arange(len(labels))[:, None], columns_idx] * take_up
+    months = due_store.periods.to_period('M').astype(str).to_numpy()[columns_idx]
+    return pd.DataFrame({
+        level: np.repeat(labels, horizon),
+        'month': months.ravel(),
+        'cohort_forecast': future.ravel(),
+    })
+
+def blend_forecasts(df_statistical, df_cohort, level='district', weight=0.5):
+    """
+    Joins the statistical (forecast) and cohort (cohort_forecast) projections on level and
+    month and adds blended_forecast = weight * cohort + (1 - weight) * statistical.
+    Where only one projection exists, it is used as is.
+    """
+    if df_cohort.empty:
+        return df_statistical.assign(cohort_forecast=np.nan, blended_forecast=df_statistical['forecast'])
+    df = df_statistical.merge(df_cohort, on=[level, 'month'], how='outer')
+    blended = weight * df['cohort_forecast'] + (1 - weight) * df['forecast']
+    df['blended_forecast'] = blended.fillna(df['forecast']).fillna(df['cohort_forecast'])
+    return df.sort_values([level, 'month']).reset_index(drop=True)
@@ -2,6 +2,7 @@ import pandas as pd
 import glob
 import os
 import numpy as np
+from src.instrumentation import traced, current_span
 
 def load_and_concat(pattern):
     """
@@ -15,6 +16,23 @@ def load_and_concat(pattern):
     df_list = [pd.read_csv(f) for f in files]
     return pd.concat(df_list, ignore_index=True)
 
+# Raw extracts use different names for the adult age band; map them onto one schema
+COLUMN_ALIASES = {
+    'bio_age_17_': 'bio_age_18_above',
+    'demo_age_17_': 'demo_age_18_above',
+    'age_18_greater': 'age_18_above',
+}
+
+def normalize_columns(df):
+    """
+    Renames known column aliases (e.g. bio_age_17_ -> bio_age_18_above) to the canonical schema.
+    """
+    renames = {k: v for k, v in COLUMN_ALIASES.items() if k in df.columns and v not in df.columns}
+    if renames:
+        df = df.rename(columns=renames)
+    return df
+
+@traced()
 def load_data(base_path):
     """
     Loads biometric, demographic, and enrollment data from the given base path.
@@ -23,8 +41,9 @@ def load_data(base_path):
     df_demo = load_and_concat(os.path.join(base_path, 'demographic/*.csv'))
     df_enrol = load_and_concat(os.path.join(base_path, 'enrollment/*.csv'))
     
-    return df_bio, df_demo, df_enrol
+    return normalize_columns(df_bio), normalize_columns(df_demo), normalize_columns(df_enrol)
 
+@traced()
 def aggregate_time_series(df_bio, df_demo):
     """
     Aggregates data by date to create a master timeline dataframe.
@@ -34,18 +53,23 @@ def aggregate_time_series(df_bio, df_demo):
         df_bio['date'] = pd.to_datetime(df_bio['date'], dayfirst=True, errors='coerce')
     if not df_demo.empty:
         df_demo['date'] = pd.to_datetime(df_demo['date'], dayfirst=True, errors='coerce')
+    # Rows with unparseable dates (NaT) silently fall out of the groupby below
+    current_span().set(rows_dropped=sum(int(df['date'].isna().sum()) for df in (df_bio, df_demo) if not df.empty))
     
     # Aggregate biometric updates by date
     bio_agg = pd.DataFrame()
     if not df_bio.empty:
-        bio_agg = df_bio.groupby('date')[['bio_age_0_4', 'bio_age_5_17', 'bio_age_18_above']].sum().reset_index()
-        bio_agg['total_bio'] = bio_agg['bio_age_0_4'] + bio_agg['bio_age_5_17'] + bio_agg['bio_age_18_above']
+        # Not every extract has the 0-4 band, so only sum the age columns present
+        cols = [c for c in ['bio_age_0_4', 'bio_age_5_17', 'bio_age_18_above'] if c in df_bio.columns]
+        bio_agg = df_bio.groupby('date')[cols].sum().reset_index()
+        bio_agg['total_bio'] = bio_agg[cols].sum(axis=1)
 
     # Aggregate demographic updates by date
     demo_agg = pd.DataFrame()
     if not df_demo.empty:
-        demo_agg = df_demo.groupby('date')[['demo_age_0_4', 'demo_age_5_17', 'demo_age_18_above']].sum().reset_index()
-        demo_agg['total_demo'] = demo_agg['demo_age_0_4'] + demo_agg['demo_age_5_17'] + demo_agg['demo_age_18_above']
+        cols = [c for c in ['demo_age_0_4', 'demo_age_5_17', 'demo_age_18_above'] if c in df_demo.columns]
+        demo_agg = df_demo.groupby('date')[cols].sum().reset_index()
+        demo_agg['total_demo'] = demo_agg[cols].sum(axis=1)
         
     # Merge
     if not bio_agg.empty and not demo_agg.empty:
@@ -67,6 +91,7 @@ def aggregate_time_series(df_bio, df_demo):
     
     return df_weekly
 
+@traced()
 def aggregate_by_pincode(df_bio, df_demo, df_enrol):
     """
     Aggregates data by pincode for risk profiling.
@@ -86,7 +111,7 @@ def aggregate_by_pincode(df_bio, df_demo, df_enrol):
             pincode_demo = df_demo.groupby('pincode')[cols].sum().reset_index()
     
     if not df_enrol.empty:
-        cols = [c for c in ['age_5_17', 'age_18_above'] if c in df_enrol.columns]
+        cols = [c for c in ['age_0_5', 'age_5_17', 'age_18_above'] if c in df_enrol.columns]
         if cols:
             pincode_pop = df_enrol.groupby('pincode')[cols].sum().reset_index()
     
@@ -110,6 +135,92 @@ def aggregate_by_pincode(df_bio, df_demo, df_enrol):
         
     return df_risk
 
+@traced()
+def aggregate_monthly_demand(df_bio):
+    """
+    Aggregates MBU demand (bio_age_5_17) by month and pincode for forecasting.
+    """
+    if df_bio.empty or 'bio_age_5_17' not in df_bio.columns:
+        return pd.DataFrame(columns=['month', 'pincode', 'mbu_demand'])
+
+    dates = pd.to_datetime(df_bio['date'], dayfirst=True, errors='coerce')
+    current_span().set(rows_dropped=int(dates.isna().sum()))
+    df = df_bio.assign(month=dates.dt.to_period('M').astype(str))[dates.notna()]
+    df_monthly = df.groupby(['month', 'pincode'])['bio_age_5_17'].sum().reset_index()
+    return df_monthly.rename(columns={'bio_age_5_17': 'mbu_demand'})
+
+def _monthly_totals(df, measures):
+    """
+    Sums {measure name: source columns} by month and pincode, parsing the dates once.
+    """
+    measures = {name: [c for c in cols if c in df.columns] for name, cols in measures.items()}
+    measures = {name: cols for name, cols in measures.items() if cols}
+    if df.empty or not measures:
+        return pd.DataFrame(columns=['month', 'pincode'])
+    dates = pd.to_datetime(df['date'], dayfirst=True, errors='coerce')
+    totals = {name: df[cols].sum(axis=1) for name, cols in measures.items()}
+    df = df.assign(month=dates.dt.to_period('M').astype(str), **totals)[dates.notna()]
+    return df.groupby(['month', 'pincode'])[list(measures)].sum().reset_index()
+
+@traced()
+def aggregate_monthly_measures(df_bio, df_demo, df_enrol):
+    """
+    Aggregates the monthly measures of the time-series store by month and pincode:
+    MBU demand (bio_age_5_17), biometric and demographic updates (all age bands), 5-17
+    demographic updates, enrolments (all age bands) and the 0-5 and 5-17 enrolment cohorts.
+    """
+    measures = [
+        _monthly_totals(df_bio, {'mbu_demand': ['bio_age_5_17'], 'bio_updates': ['bio_age_5_17', 'bio_age_18_above']}),
+        _monthly_totals(df_demo, {'demo_updates': ['demo_age_5_17', 'demo_age_18_above'],
+                                  # Numerator of demo_rate, for rates over a date window
+                                  'demo_age_5_17': ['demo_age_5_17']}),
+        _monthly_totals(df_enrol, {
+            'enrolments': ['age_0_5', 'age_5_17', 'age_18_above'],
+            # Child cohorts by age band, aged forward by src/cohort_projection.py
+            'enrol_age_0_5': ['age_0_5'],
+            'enrol_age_5_17': ['age_5_17'],
+        }),
+    ]
+    measures = [df for df in measures if not df.empty]
+    if not measures:
+        return pd.DataFrame(columns=['month', 'pincode'])
+    df_measures = measures[0]
+    for df in measures[1:]:
+        df_measures = df_measures.merge(df, on=['month', 'pincode'], how='outer')
+    return df_measures.fillna(0).sort_values(['month', 'pincode']).reset_index(drop=True)
+
+@traced()
+def aggregate_daily_updates(df_bio, df_demo):
+    """
+    Aggregates total biometric + demographic updates (all age bands) by date and pincode,
+    the daily stream scanned for surges by src/surge_detection.py.
+    """
+    parts = []
+    for df, prefix in ((df_bio, 'bio_age_'), (df_demo, 'demo_age_')):
+        cols = [c for c in df.columns if c.startswith(prefix)]
+        if df.empty or not cols:
+            continue
+        dates = pd.to_datetime(df['date'], dayfirst=True, errors='coerce')
+        parts.append(pd.DataFrame({'date': dates, 'pincode': df['pincode'], 'updates': df[cols].sum(axis=1)})[dates.notna()])
+    if not parts:
+        return pd.DataFrame(columns=['date', 'pincode', 'updates'])
+    df_daily = pd.concat(parts, ignore_index=True)
+    return df_daily.groupby(['date', 'pincode'])['updates'].sum().reset_index()
+
+def geography_from_raw(*frames):
+    """
+    Builds a pincode -> state/district lookup from raw extracts that carry those columns,
+    keeping the first labelled occurrence per pincode (rows with blank labels, e.g. ingested
+    blocks without them, are skipped).
+    """
+    parts = [f[['pincode', 'state', 'district']] for f in frames
+             if not f.empty and {'pincode', 'state', 'district'}.issubset(f.columns)]
+    if not parts:
+        return pd.DataFrame(columns=['pincode', 'state', 'district'])
+    df = pd.concat(parts, ignore_index=True).dropna(subset=['state', 'district'])
+    return df.drop_duplicates('pincode').reset_index(drop=True)
+
+@traced()
 def add_geography_from_pincode(df):
     """
     Adds state and district columns based on pincode prefixes.
@@ -1,6 +1,9 @@
 import pandas as pd
+import numpy as np
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from src.instrumentation import traced
 
+@traced()
 def fit_holt_winters(series, seasonal_periods=52):
     """
     Fits a Holt-Winters Exponential Smoothing model to the time series.
@@ -25,3 +28,143 @@ def forecast_demand(fitted_model, steps=12):
     """
     forecast = fitted_model.forecast(steps)
     return forecast
+
+# Prediction interval defaults: quantiles reported, and simulated paths per series
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+DEFAULT_PATHS = 500
+
+# Parameters estimated per additive-trend fit (alpha, beta, initial level and trend)
+HOLT_FITTED_PARAMS = 4
+
+# Cap on simulated values held at once (paths x series x steps); series are processed in chunks
+MAX_SIMULATION_ELEMENTS = 20_000_000
+
+def _fit_trend_model(series):
+    return ExponentialSmoothing(series, trend='add', seasonal=None).fit()
+
+def _fit_and_forecast(series, steps):
+    return forecast_demand(_fit_trend_model(series), steps)
+
+def quantile_column(q):
+    # 0.1 -> 'p10', 0.025 -> 'p2.5'
+    return f"p{100 * q:g}"
+
+def holt_state(fitted):
+    """
+    Final smoothing state of a fitted additive-trend model: (level, trend, alpha, beta,
+    in-sample one-step residuals), the inputs of simulate_intervals.
+    """
+    return (float(fitted.level.iloc[-1]), float(fitted.trend.iloc[-1]), float(fitted.params['smoothing_level']),
+            float(fitted.params['smoothing_trend']), np.asarray(fitted.resid, dtype=float))
+
+@traced()
+def simulate_intervals(states, steps, quantiles=DEFAULT_QUANTILES, n_paths=DEFAULT_PATHS, seed=0,
+                       max_elements=MAX_SIMULATION_ELEMENTS):
+    """
+    Prediction quantiles for many fitted Holt (additive trend) models at once by residual
+    bootstrap: every path draws each step's error from its own series' residuals and
+    carries it through the smoothing state (level += trend + alpha * e, trend += alpha * beta * e),
+    so uncertainty compounds over the horizon.
+
+    states is a list of holt_state() tuples. All series advance together as (paths x series)
+    arrays, in chunks of series bounded by max_elements. Returns an array
+    (len(quantiles), series, steps), floored at 0 since demand cannot be negative.
+    """
+    n = len(states)
+    out = np.zeros((len(quantiles), n, steps))
+    if n == 0 or steps == 0:
+        return out
+    level, trend, alpha, beta = (np.array([s[i] for s in states]) for i in range(4))
+    # Residuals are ragged; pad them into one matrix and sample within each row's count.
+    # In-sample residuals understate forecast errors, so they are inflated for the
+    # HOLT_FITTED_PARAMS estimated parameters (sqrt(n / (n - p)))
+    resid = [s[4][np.isfinite(s[4])] for s in states]
+    resid = [r * np.sqrt(len(r) / (len(r) - HOLT_FITTED_PARAMS)) if len(r) > 2 * HOLT_FITTED_PARAMS else r
+             for r in resid]
+    counts = np.array([max(len(r), 1) for r in resid])
+    padded = np.zeros((n, counts.max()))
+    for i, r in enumerate(resid):
+        padded[i, :len(r)] = r
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, max_elements // (n_paths * steps))
+    for start in range(0, n, chunk):
+        rows = slice(start, min(start + chunk, n))
+        c = rows.stop - rows.start
+        draw = (rng.random((n_paths, c, steps)) * counts[rows, None]).astype(int)
+        errors = padded[rows][np.arange(c)[None, :, None], draw]
+
+        lvl = np.broadcast_to(level[rows], (n_paths, c)).copy()
+        trd = np.broadcast_to(trend[rows], (n_paths, c)).copy()
+        a, ab = alpha[rows], alpha[rows] * beta[rows]
+        paths = np.empty((n_paths, c, steps))
+        for h in range(steps):
+            e = errors[:, :, h]
+            paths[:, :, h] = lvl + trd + e
+            lvl += trd + a * e
+            trd += ab * e
+        out[:, rows] = np.quantile(paths, quantiles, axis=0)
+    return np.maximum(out, 0)
+
+@traced()
+def forecast_store(store, level='district', steps=6, min_points=4, measure='mbu_demand', quantiles=None,
+                   n_paths=DEFAULT_PATHS, seed=0):
+    """
+    Forecasts every series of a SeriesStore level (pincode, district or state) with the
+    additive-trend model from the dashboard view. Each series is a row slice of the
+    store, trimmed to its active span; series shorter than min_points are skipped.
+
+    Returns a long table (level, month, forecast). With quantiles (e.g. (0.1, 0.5, 0.9))
+    the table also gets prediction interval columns p10/p50/p90, simulated for all
+    series in one batch by simulate_intervals.
+    """
+    quantiles = tuple(quantiles or ())
+    columns = [level, 'month', 'forecast'] + [quantile_column(q) for q in quantiles]
+    if measure not in store.matrices:
+        return pd.DataFrame(columns=columns)
+
+    results = []
+    states = []
+    for entity in store.labels(level):
+        series = store.series(measure, entity, level=level)
+        if len(series) < min_points:
+            continue
+        try:
+            fitted = _fit_trend_model(series.asfreq('MS'))
+            forecast = forecast_demand(fitted, steps)
+        except (ValueError, np.linalg.LinAlgError):
+            continue
+        if quantiles:
+            states.append(holt_state(fitted))
+        results.append(pd.DataFrame({
+            level: entity,
+            'month': forecast.index.to_period('M').astype(str),
+            'forecast': forecast.values,
+        }))
+
+    if not results:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(results, ignore_index=True)
+    if quantiles:
+        bands = simulate_intervals(states, steps, quantiles, n_paths=n_paths, seed=seed)
+        for q, band in zip(quantiles, bands):
+            df[quantile_column(q)] = band.ravel()
+    return df
+
+@traced()
+def forecast_by_entity(df_monthly, entity_col='district', steps=6, min_points=4, value_col='mbu_demand'):
+    """
+    Forecasts monthly demand for every entity (district or pincode) in a long-format
+    month/entity/value table by loading it into a SeriesStore (see forecast_store).
+    """
+    from src.series_store import SeriesStore
+
+    if df_monthly.empty or entity_col not in df_monthly.columns:
+        return pd.DataFrame(columns=[entity_col, 'month', 'forecast'])
+
+    store = SeriesStore.from_long(df_monthly, measures=[value_col])
+    df_forecast = forecast_store(store, level=entity_col, steps=steps, min_points=min_points, measure=value_col)
+    if entity_col == 'pincode' and not df_forecast.empty:
+        # Store keys are strings; hand pincodes back in the caller's dtype
+        df_forecast['pincode'] = df_forecast['pincode'].astype(df_monthly['pincode'].dtype)
+    return df_forecast
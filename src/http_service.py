@@ -0,0 +1,89 @@
+import asyncio
+
+REASONS = {200: 'OK', 202: 'Accepted', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+def _content_length(headers):
+    # Body length from the Content-Length header; None when it is not a non-negative integer
+    value = headers.get('content-length') or '0'
+    if not value.isdigit():
+        return None
+    return int(value)
+
+async def respond(writer, status, body, extra_headers, keep_alive):
+    """
+    Writes one JSON response (body already encoded).
+    """
+    headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)),
+               'Connection': 'keep-alive' if keep_alive else 'close', **extra_headers}
+    head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+    head += ''.join(f"{k}: {v}\r\n" for k, v in headers.items()) + '\r\n'
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+async def serve_connection(reader, writer, handler, max_body_bytes, writers):
+    """
+    Minimal HTTP/1.1 keep-alive loop shared by the ingest and query services: parses each
+    request line, headers and Content-Length body, awaits
+    handler(method, target, body, headers) -> (status, encoded body, extra headers) and
+    writes the response. Malformed requests get 400 and oversized bodies 413, and close
+    the connection (the next request's start can no longer be found). Open connections
+    are tracked in writers so close_server can drop idle keep-alive clients.
+    """
+    writers.add(writer)
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                await respond(writer, 400, b'{"error": "malformed request line"}', {}, False)
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            keep_alive = (headers.get('connection', '').lower() != 'close') and version == 'HTTP/1.1'
+            length = _content_length(headers)
+            if length is None:
+                await respond(writer, 400, b'{"error": "invalid Content-Length"}', {}, False)
+                break
+            if length > max_body_bytes:
+                await respond(writer, 413, f'{{"error": "body over {max_body_bytes} bytes"}}'.encode(), {}, False)
+                break
+            body = await reader.readexactly(length) if length else b''
+
+            status, payload, extra = await handler(method, target, body, headers)
+            await respond(writer, status, payload, extra, keep_alive)
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writers.discard(writer)
+        writer.close()
+
+async def start_server(handler, host, port, max_body_bytes, writers):
+    """
+    Starts an asyncio server running serve_connection; returns it.
+    """
+    async def on_connection(reader, writer):
+        await serve_connection(reader, writer, handler, max_body_bytes, writers)
+
+    return await asyncio.start_server(on_connection, host, port)
+
+async def close_server(server, writers):
+    """
+    Stops accepting connections and closes the open ones (idle keep-alive connections
+    would otherwise hold wait_closed() open).
+    """
+    server.close()
+    for writer in list(writers):
+        writer.close()
+    await server.wait_closed()
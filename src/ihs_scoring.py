@@ -1,13 +1,34 @@
 import numpy as np
 import pandas as pd
+from src.instrumentation import traced
 
-def calculate_ihs(mbu_rate, demo_rate):
+# Notebook 03 defaults; dashboard/scripts/process_data.py historically used mbu_weight=150
+DEFAULT_IHS_WEIGHTS = {
+    'base': 600,
+    'mbu_weight': 200,
+    'mbu_cap': 200,
+    'demo_weight': 100,
+    'demo_cap': 100,
+}
+
+DEFAULT_STRATEGY_LABELS = (
+    'Intervention (Mobile Vans/Camps)',
+    'Awareness (SMS Campaigns)',
+    'Maintain (Digital Nudges)',
+)
+
+DEFAULT_CUT_POINTS = (700, 800)
+
+def calculate_ihs(mbu_rate, demo_rate, weights=None):
     """
     Calculates Identity Health Score (IHS) based on update rates.
     Logic from 03_identity_health_score.ipynb
+    Works on scalars or whole arrays/Series; weights overrides DEFAULT_IHS_WEIGHTS keys.
     """
+    w = {**DEFAULT_IHS_WEIGHTS, **(weights or {})}
+
     # Base score
-    base = 600
+    base = w['base']
     
     # Bonus for biometric updates (MBU compliance)
     # Assuming rates are fractions, if they are per 1000 or similar, scaling might need adjustment.
@@ -23,31 +44,53 @@ def calculate_ihs(mbu_rate, demo_rate):
     # So essentially any significant activity maxes out the bonus?
     # I will follow logic exactly as in notebook.
     
-    bio_bonus = np.clip(mbu_rate * 200, 0, 200)
+    bio_bonus = np.clip(mbu_rate * w['mbu_weight'], 0, w['mbu_cap'])
     
     # Bonus for demographic updates
-    demo_bonus = np.clip(demo_rate * 100, 0, 100)
+    demo_bonus = np.clip(demo_rate * w['demo_weight'], 0, w['demo_cap'])
     
     return base + bio_bonus + demo_bonus
 
-def assign_ihs_strategy(score):
+def assign_ihs_strategy(score, cut_points=DEFAULT_CUT_POINTS, labels=DEFAULT_STRATEGY_LABELS, inclusive=False):
     """
     Assigns intervention strategy based on IHS.
+    labels are ordered from lowest to highest band; with inclusive=True a score equal
+    to a cut point falls into the higher band.
+    """
+    low, high = cut_points
+    above = (lambda c: score >= c) if inclusive else (lambda c: score > c)
+    if above(high):
+        return labels[2]
+    elif above(low):
+        return labels[1]
+    else:
+        return labels[0]
+
+def assign_ihs_strategies(scores, cut_points=DEFAULT_CUT_POINTS, labels=DEFAULT_STRATEGY_LABELS, inclusive=False):
+    """
+    Vectorized assign_ihs_strategy over an array/Series of scores.
     """
-    if score > 800:
-        return 'Maintain (Digital Nudges)'
-    elif score > 700:
-        return 'Awareness (SMS Campaigns)'
+    scores = np.asarray(scores, dtype=float)
+    low, high = cut_points
+    if inclusive:
+        conditions = [scores >= high, scores >= low]
     else:
-        return 'Intervention (Mobile Vans/Camps)'
+        conditions = [scores > high, scores > low]
+    return np.select(conditions, [labels[2], labels[1]], default=labels[0])
 
-def calculate_pincode_ihs(df):
+@traced()
+def calculate_pincode_ihs(df, weights=None, cut_points=DEFAULT_CUT_POINTS, labels=DEFAULT_STRATEGY_LABELS,
+                          inclusive=False, round_scores=False):
     """
     Applies IHS calculation to a dataframe.
     """
     if 'mbu_rate' not in df.columns or 'demo_rate' not in df.columns:
         return df
-        
-    df['ihs_score'] = df.apply(lambda x: calculate_ihs(x['mbu_rate'], x['demo_rate']), axis=1)
-    df['strategy'] = df['ihs_score'].apply(assign_ihs_strategy)
+
+    scores = calculate_ihs(df['mbu_rate'].to_numpy(dtype=float), df['demo_rate'].to_numpy(dtype=float), weights)
+    if round_scores:
+        scores = np.round(scores).astype(int)
+
+    df['ihs_score'] = scores
+    df['strategy'] = assign_ihs_strategies(scores, cut_points, labels, inclusive)
     return df
@@ -0,0 +1,302 @@
+import asyncio
+import functools
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from src import http_service
+from src.data_processing import COLUMN_ALIASES
+
+API_PREFIX = '/setu/api/v1/ingest/'
+
+# Endpoint name -> (raw sub-directory, file prefix, count columns of an AggregatedDataBlock record)
+INGEST_KINDS = {
+    'biometric_updates': ('biometric', 'api_data_aadhar_biometric', ('bio_age_5_17', 'bio_age_18_above')),
+    'demographic_updates': ('demographic', 'api_data_aadhar_demographic', ('demo_age_5_17', 'demo_age_18_above')),
+    'enrolments': ('enrollment', 'api_data_aadhar_enrolment', ('age_0_5', 'age_5_17', 'age_18_above')),
+}
+
+# Optional descriptive fields; anything else in a record is rejected, so no stray
+# identifiers can reach the data lake through this endpoint
+LABEL_FIELDS = ('state', 'district')
+
+DEFAULT_MAX_QUEUE_BLOCKS = 1000
+DEFAULT_BATCH_ROWS = 50_000
+DEFAULT_FLUSH_INTERVAL_S = 30.0
+DEFAULT_ENQUEUE_TIMEOUT_S = 1.0
+DEFAULT_MAX_BODY_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_RECORDS = 10_000
+DEFAULT_COMPACT_INTERVAL_S = 3600.0
+
+# Sub-directory of each raw category folder holding flushed batches until compaction
+SPOOL_DIR = '_spool'
+
+class ValidationError(ValueError):
+    pass
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(value):
+    # Raw extracts use dd-mm-yyyy; ISO dates are accepted too. Blocks repeat a handful of
+    # dates, so parses are cached (strptime dominated validation time otherwise)
+    for fmt in ('%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%d-%m-%Y')
+        except ValueError:
+            continue
+    raise ValidationError(f"invalid date {value!r} (expected dd-mm-yyyy or yyyy-mm-dd)")
+
+def _parse_count(name, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value) or value < 0:
+        raise ValidationError(f"{name} must be a non-negative integer, got {value!r}")
+    return int(value)
+
+def validate_block(kind, payload, max_records=DEFAULT_MAX_RECORDS):
+    """
+    Validates an AggregatedDataBlock and returns its rows as tuples in raw column order
+    (date, state, district, pincode, counts...).
+
+    The block is {"records": [...]}, a bare list of records, or a single record. Each record
+    needs a date and a 6-digit pincode plus at least one of the kind's count columns
+    (missing counts are 0; raw-extract aliases such as bio_age_17_ are accepted).
+    """
+    columns = INGEST_KINDS[kind][2]
+    if isinstance(payload, dict) and 'records' in payload:
+        records = payload['records']
+    elif isinstance(payload, list):
+        records = payload
+    else:
+        records = [payload]
+    if not isinstance(records, list) or not records:
+        raise ValidationError("block has no records")
+    if len(records) > max_records:
+        raise ValidationError(f"block has {len(records)} records (limit {max_records})")
+
+    allowed = set(columns) | set(LABEL_FIELDS) | {'date', 'pincode'}
+    aliases = {alias: canonical for alias, canonical in COLUMN_ALIASES.items() if canonical in columns}
+    rows = []
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValidationError(f"record {i} is not an object")
+        if aliases and not aliases.keys().isdisjoint(record):
+            record = {aliases.get(k, k): v for k, v in record.items()}
+        unknown = record.keys() - allowed
+        if unknown:
+            raise ValidationError(f"record {i} has unknown fields {sorted(unknown)}")
+        try:
+            pincode = str(record['pincode'])
+            if not (len(pincode) == 6 and pincode.isdigit() and pincode[0] != '0'):
+                raise ValidationError(f"invalid pincode {record['pincode']!r}")
+            counts = [_parse_count(c, record[c]) if c in record else 0 for c in columns]
+            if not any(c in record for c in columns):
+                raise ValidationError(f"no count columns (expected some of {list(columns)})")
+            # Missing labels stay blank so geography_from_raw falls back to other extracts
+            labels = [str(record[f]) if record.get(f) else None for f in LABEL_FIELDS]
+            rows.append((_parse_date(str(record['date'])), *labels, int(pincode), *counts))
+        except KeyError as e:
+            raise ValidationError(f"record {i} is missing {e.args[0]}") from None
+        except ValidationError as e:
+            raise ValidationError(f"record {i}: {e}") from None
+    return rows
+
+def write_batch(raw_path, kind, rows):
+    """
+    Writes one micro-batch as a CSV in the spool directory raw_path/<category>/_spool/. The
+    spool is outside the raw extract glob (raw_path/*/*.csv), so flushes neither change the
+    pipeline's input fingerprint nor multiply the files it reads until compact_spool folds
+    them in. The file is written under a temporary name and renamed, so compaction never
+    reads a partial batch. Returns the path written.
+    """
+    category, prefix, columns = INGEST_KINDS[kind]
+    out_dir = os.path.join(raw_path, category, SPOOL_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{prefix}_ingest_{time.time_ns()}.csv")
+    pd.DataFrame(rows, columns=['date', *LABEL_FIELDS, 'pincode', *columns]).to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return path
+
+def compact_spool(raw_path, day=None):
+    """
+    Folds the spooled batches into one raw extract per category and ingest day
+    (<prefix>_ingest_<yyyymmdd>.csv, day defaulting to today), summing counts per
+    date/state/district/pincode with what that file already holds. The pipeline's inputs
+    therefore change once per compaction and grow by at most one file per day. The day
+    file is replaced atomically before the folded batches are removed. Returns the
+    number of spooled rows folded in.
+    """
+    day = day or datetime.now().strftime('%Y%m%d')
+    folded = 0
+    for category, prefix, columns in INGEST_KINDS.values():
+        batches = sorted(glob.glob(os.path.join(raw_path, category, SPOOL_DIR, '*.csv')))
+        if not batches:
+            continue
+        frames = [pd.read_csv(f, dtype={f: str for f in LABEL_FIELDS}) for f in batches]
+        folded += sum(len(f) for f in frames)
+        path = os.path.join(raw_path, category, f"{prefix}_ingest_{day}.csv")
+        if os.path.exists(path):
+            frames.insert(0, pd.read_csv(path, dtype={f: str for f in LABEL_FIELDS}))
+        keys = ['date', *LABEL_FIELDS, 'pincode']
+        df = pd.concat(frames, ignore_index=True).groupby(keys, dropna=False, sort=False)[list(columns)].sum()
+        df.reset_index().to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+        for f in batches:
+            os.remove(f)
+    return folded
+
+class IngestService:
+    """
+    Ingestion API from Stage 1 of docs/Project_Setu_Interoperability_Workflow.md: UIDAI
+    systems POST aggregated data blocks to /setu/api/v1/ingest/<kind> and get 202 Accepted
+    once the block is validated and queued.
+
+    A single flusher task micro-batches queued blocks (up to batch_rows rows, or whatever
+    arrived within flush_interval seconds of the batch's first block) and writes each batch
+    as a CSV to the spool (see write_batch). Every compact_interval seconds, and on stop,
+    the spool is folded into the day's raw extract (compact_spool), so the next pipeline
+    run picks the rows up.
+    The queue is bounded: when flushing falls behind, requests wait up to enqueue_timeout
+    for a slot and are then refused with 503 and Retry-After, so memory stays bounded.
+    """
+
+    def __init__(self, raw_path='data/raw', max_queue_blocks=DEFAULT_MAX_QUEUE_BLOCKS,
+                 batch_rows=DEFAULT_BATCH_ROWS, flush_interval=DEFAULT_FLUSH_INTERVAL_S,
+                 enqueue_timeout=DEFAULT_ENQUEUE_TIMEOUT_S, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                 max_records=DEFAULT_MAX_RECORDS, compact_interval=DEFAULT_COMPACT_INTERVAL_S):
+        self.raw_path = raw_path
+        self.max_queue_blocks = max_queue_blocks
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_body_bytes = max_body_bytes
+        self.max_records = max_records
+        self.compact_interval = compact_interval
+        self.stats = {'accepted_blocks': 0, 'accepted_records': 0, 'rejected_blocks': 0,
+                      'throttled_blocks': 0, 'flushed_records': 0, 'batches': 0, 'files': 0,
+                      'compactions': 0, 'compacted_records': 0}
+        self.queue = None
+        self.server = None
+        self._flusher = None
+        self._compactor = None
+        self._stopping = None
+        self._writers = set()
+
+    async def start(self, host='127.0.0.1', port=8040):
+        self.queue = asyncio.Queue(maxsize=self.max_queue_blocks)
+        self._flusher = asyncio.create_task(self._flush_loop())
+        self._stopping = asyncio.Event()
+        self._compactor = asyncio.create_task(self._compact_loop())
+        self.server = await http_service.start_server(self._handle_http, host, port, self.max_body_bytes,
+                                                      self._writers)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """
+        Stops accepting connections, then flushes everything still queued and compacts
+        the spool.
+        """
+        if self.server is not None:
+            await http_service.close_server(self.server, self._writers)
+        if self._flusher is not None:
+            await self.queue.put(None)
+            await self._flusher
+        if self._compactor is not None:
+            self._stopping.set()
+            await self._compactor
+
+    async def _compact_loop(self):
+        # Compaction only touches complete spool files, so it can overlap batch writes; the
+        # final pass runs once the flusher has written everything still queued
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.compact_interval)
+                stopping = True
+            except asyncio.TimeoutError:
+                pass
+            folded = await loop.run_in_executor(None, compact_spool, self.raw_path)
+            if folded:
+                self.stats['compactions'] += 1
+                self.stats['compacted_records'] += folded
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batches = {}
+            n_rows = 0
+            deadline = loop.time() + self.flush_interval
+            while True:
+                kind, rows = item
+                batches.setdefault(kind, []).extend(rows)
+                n_rows += len(rows)
+                if n_rows >= self.batch_rows:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout=max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+
+            # File writes run in a worker thread so acknowledgements keep flowing meanwhile
+            for kind, rows in batches.items():
+                await loop.run_in_executor(None, write_batch, self.raw_path, kind, rows)
+                self.stats['files'] += 1
+            self.stats['batches'] += 1
+            self.stats['flushed_records'] += n_rows
+
+    async def handle_request(self, method, path, body):
+        """
+        Routes one request. Returns (status, JSON-serialisable body, extra headers).
+        """
+        if path.rstrip('/') == API_PREFIX + 'status':
+            if method != 'GET':
+                return 405, {'error': 'use GET'}, {}
+            return 200, {**self.stats, 'queue_depth': self.queue.qsize(), 'queue_limit': self.max_queue_blocks}, {}
+
+        kind = path[len(API_PREFIX):].rstrip('/') if path.startswith(API_PREFIX) else None
+        if kind not in INGEST_KINDS:
+            return 404, {'error': f'unknown endpoint {path}'}, {}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}, {}
+
+        try:
+            rows = validate_block(kind, json.loads(body), self.max_records)
+        except (ValidationError, ValueError) as e:
+            self.stats['rejected_blocks'] += 1
+            return 400, {'error': str(e)}, {}
+
+        try:
+            await asyncio.wait_for(self.queue.put((kind, rows)), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.stats['throttled_blocks'] += 1
+            return 503, {'error': 'ingest queue full, retry later'}, {'Retry-After': '1'}
+
+        self.stats['accepted_blocks'] += 1
+        self.stats['accepted_records'] += len(rows)
+        return 202, {'status': 'accepted', 'records': len(rows)}, {}
+
+    async def _handle_http(self, method, target, body, headers):
+        status, payload, extra = await self.handle_request(method, target.split('?')[0], body)
+        return status, json.dumps(payload).encode(), extra
+
+async def serve(host='127.0.0.1', port=8040, **params):
+    """
+    Runs the ingestion service until cancelled (Ctrl+C), flushing queued blocks on exit.
+    """
+    service = IngestService(**params)
+    host, port = await service.start(host, port)
+    print(f"Ingest service listening on http://{host}:{port}{API_PREFIX}<{'|'.join(INGEST_KINDS)}>")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+        print(f"Ingest service stopped: {service.stats}")
@@ -0,0 +1,261 @@
+import contextvars
+import cProfile
+import functools
+import glob
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+DEFAULT_TRACE_DIR = 'data/traces'
+
+# The run collecting spans in the current context (None: spans are not recorded) and the
+# spans open in it, innermost last. Context variables, not globals: traced calls made from
+# other threads (dashboard sessions, executors) while a run is active neither join it nor
+# push onto or pop its stack
+_current_run = contextvars.ContextVar('instrumentation_run', default=None)
+_span_stack = contextvars.ContextVar('instrumentation_span_stack', default=())
+
+# Seconds between the RSS samples that give each open span its peak
+RSS_SAMPLE_INTERVAL = 0.01
+
+def _rss_mb():
+    """
+    Current resident set size in MB (falls back to the peak on platforms without /proc).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_mb()
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / 1e6 if sys.platform == 'darwin' else peak * 1024 / 1e6
+
+def count_rows(obj):
+    """
+    Number of rows in a DataFrame/Series, or summed over a tuple/list/dict of them; None otherwise.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, (tuple, list)):
+        counts = [count_rows(o) for o in obj]
+        counts = [c for c in counts if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+class Span:
+    """
+    One timed region of a run. Attributes can be added while the span is open,
+    e.g. span.rows_out = len(df) or span.set(rows_dropped=n).
+    """
+
+    def __init__(self, name, parent=None, depth=0, rows_in=None):
+        self.name = name
+        self.parent = parent
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.rows_dropped = None
+        self.attrs = {}
+        self.profile_path = None
+        self._rss_high_mb = 0.0
+
+    def set(self, **attrs):
+        for key, value in attrs.items():
+            if key in ('rows_in', 'rows_out', 'rows_dropped'):
+                setattr(self, key, value)
+            else:
+                self.attrs[key] = value
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'start_offset_s': self.start_offset_s,
+            'wall_s': self.wall_s,
+            'cpu_s': self.cpu_s,
+            'rss_start_mb': self.rss_start_mb,
+            'rss_end_mb': self.rss_end_mb,
+            'peak_rss_delta_mb': self.peak_rss_delta_mb,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_dropped': self.rows_dropped,
+            'profile': self.profile_path,
+            'attrs': self.attrs,
+        }
+
+class Run:
+    """
+    Collects the spans of one pipeline run and writes them as a JSON trace.
+    """
+
+    def __init__(self, name, trace_dir=DEFAULT_TRACE_DIR, profile_stages=()):
+        self.name = name
+        self.trace_dir = trace_dir
+        self.profile_stages = set(profile_stages or ())
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.spans = []
+        # Spans open in any context of this run, for the RSS sampler
+        self.open_spans = set()
+        self._lock = threading.Lock()
+        self.profiling = False
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._sampling = threading.Event()
+
+    def _sample_rss(self):
+        # Background thread: raises the RSS high-water mark of every open span
+        while not self._sampling.wait(RSS_SAMPLE_INTERVAL):
+            rss = _rss_mb()
+            with self._lock:
+                open_spans = list(self.open_spans)
+            for open_span in open_spans:
+                if rss > open_span._rss_high_mb:
+                    open_span._rss_high_mb = rss
+
+    def to_dict(self, status):
+        return {
+            'run_id': self.run_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'status': status,
+            'wall_s': time.perf_counter() - self._start,
+            'cpu_s': time.process_time() - self._cpu_start,
+            'peak_rss_mb': _peak_rss_mb(),
+            'spans': [s.to_dict() for s in self.spans],
+        }
+
+@contextmanager
+def span(name, rows_in=None):
+    """
+    Times a block as a span of the active run, capturing wall time, CPU time, RSS (start,
+    end, and peak_rss_delta_mb: the peak while the span was open minus its start RSS, i.e.
+    the memory the span itself added) and row counts. Stages listed in the run's
+    profile_stages are also run under cProfile, dumped next to the trace.
+    Outside a run this only yields a detached Span.
+    """
+    active_run = _current_run.get()
+    stack = _span_stack.get()
+    current = Span(name, parent=stack[-1].name if stack else None, depth=len(stack), rows_in=rows_in)
+    if active_run is None:
+        yield current
+        return
+
+    # Only one cProfile can be active at a time, so nested profiled spans are folded into the outer one
+    profiler = cProfile.Profile() if name in active_run.profile_stages and not active_run.profiling else None
+    token = _span_stack.set(stack + (current,))
+    current.start_offset_s = time.perf_counter() - active_run._start
+    current.rss_start_mb = current._rss_high_mb = _rss_mb()
+    with active_run._lock:
+        active_run.open_spans.add(current)
+    peak_start = _peak_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler:
+        active_run.profiling = True
+        profiler.enable()
+    try:
+        yield current
+    finally:
+        if profiler:
+            profiler.disable()
+            active_run.profiling = False
+            os.makedirs(active_run.trace_dir, exist_ok=True)
+            current.profile_path = os.path.join(active_run.trace_dir, f"{active_run.run_id}-{name}.prof")
+            profiler.dump_stats(current.profile_path)
+        current.wall_s = time.perf_counter() - wall_start
+        current.cpu_s = time.process_time() - cpu_start
+        current.rss_end_mb = _rss_mb()
+        # The sampler can miss a spike between samples; when the process peak rose while the
+        # span was open, that new peak happened inside it
+        peak_end = _peak_rss_mb()
+        high = max(current._rss_high_mb, current.rss_end_mb, peak_end if peak_end > peak_start else 0.0)
+        current.peak_rss_delta_mb = high - current.rss_start_mb
+        _span_stack.reset(token)
+        with active_run._lock:
+            active_run.open_spans.discard(current)
+            active_run.spans.append(current)
+
+def traced(name=None):
+    """
+    Decorator recording each call as a span named after the function (or name).
+    rows_in is taken from the DataFrame arguments and rows_out from the result,
+    unless the function sets them itself via current_span().
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_run.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name, rows_in=count_rows(list(args) + list(kwargs.values()))) as sp:
+                result = func(*args, **kwargs)
+                if sp.rows_out is None:
+                    sp.rows_out = count_rows(result)
+                return result
+        return wrapper
+    return decorator
+
+def current_span():
+    """
+    Returns the innermost open span of the active run, or a detached Span outside a run,
+    so instrumented code can always call current_span().set(...).
+    """
+    stack = _span_stack.get()
+    if _current_run.get() is not None and stack:
+        return stack[-1]
+    return Span('detached')
+
+@contextmanager
+def run(name, trace_dir=DEFAULT_TRACE_DIR, profile_stages=()):
+    """
+    Activates span collection for a pipeline run in the current context (thread or task)
+    and writes <trace_dir>/<run_id>.json when the block exits (also on failure).
+    """
+    active = Run(name, trace_dir=trace_dir, profile_stages=profile_stages)
+    token = _current_run.set(active)
+    stack_token = _span_stack.set(())
+    sampler = threading.Thread(target=active._sample_rss, daemon=True)
+    sampler.start()
+    status = 'failed'
+    try:
+        yield active
+        status = 'ok'
+    finally:
+        active._sampling.set()
+        sampler.join()
+        _span_stack.reset(stack_token)
+        _current_run.reset(token)
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, f"{active.run_id}.json")
+        with open(path, 'w') as f:
+            json.dump(active.to_dict(status), f, indent=2)
+        active.trace_path = path
+
+def load_traces(trace_dir=DEFAULT_TRACE_DIR, limit=20):
+    """
+    Returns the most recent run traces (newest first).
+    """
+    paths = sorted(glob.glob(os.path.join(trace_dir, '*.json')), key=os.path.getmtime, reverse=True)
+    traces = []
+    for path in paths[:limit]:
+        try:
+            with open(path) as f:
+                traces.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return traces
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.instrumentation import traced
+
+# Shared pincode prefix lengths and the weight of a neighbour whose longest shared prefix
+# has that length: 5 digits (same delivery area), 4, then 3 (same sorting district)
+DEFAULT_PREFIX_WEIGHTS = {5: 1.0, 4: 0.5, 3: 0.25}
+
+# Neighbours per pincode and distance scale (km) for centroid-based adjacency
+DEFAULT_K_NEIGHBOURS = 8
+DEFAULT_DISTANCE_SCALE_KM = 10.0
+
+EARTH_RADIUS_KM = 6371.0
+
+def _same_group(codes, n_groups):
+    # Pairs of rows sharing a group: G @ G.T for the rows x groups membership matrix
+    member = sparse.csr_matrix((np.ones(len(codes)), (np.arange(len(codes)), codes)),
+                               shape=(len(codes), n_groups))
+    return (member @ member.T).tocsr()
+
+@traced()
+def prefix_adjacency(pincodes, prefix_weights=None):
+    """
+    Sparse pincode x pincode adjacency from the pincode prefix hierarchy: two pincodes are
+    neighbours with the weight of the longest prefix they share (see DEFAULT_PREFIX_WEIGHTS).
+    The diagonal is zero.
+    """
+    prefix_weights = prefix_weights or DEFAULT_PREFIX_WEIGHTS
+    pins = pd.Series(np.asarray(pincodes).astype(str)).str.zfill(6)
+    n = len(pins)
+
+    adjacency = sparse.csr_matrix((n, n))
+    previous = 0.0
+    # Nested prefixes: pairs sharing 5 digits also share 4 and 3, so adding the weight
+    # increments from the shortest prefix up leaves each pair with its closest level's weight
+    for length in sorted(prefix_weights):
+        increment = prefix_weights[length] - previous
+        _, codes = np.unique(pins.str[:length].to_numpy(), return_inverse=True)
+        adjacency = adjacency + increment * _same_group(codes, codes.max() + 1 if n else 0)
+        previous = prefix_weights[length]
+
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    return adjacency
+
+def _unit_vectors(latitude, longitude):
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+@traced()
+def centroid_adjacency(pincodes, df_coords, k=DEFAULT_K_NEIGHBOURS, scale_km=DEFAULT_DISTANCE_SCALE_KM):
+    """
+    Sparse adjacency linking each pincode to its k nearest pincodes by centroid, weighted
+    exp(-distance / scale_km). df_coords has pincode, latitude and longitude columns;
+    pincodes without coordinates get no neighbours here.
+    """
+    from scipy.spatial import cKDTree
+
+    pins = np.asarray(pincodes).astype(str)
+    n = len(pins)
+    coords = df_coords.assign(pincode=df_coords['pincode'].astype(str)).drop_duplicates('pincode')
+    coords = coords.set_index('pincode').reindex(pins)[['latitude', 'longitude']]
+    rows = np.flatnonzero(coords.notna().all(axis=1).to_numpy())
+    if len(rows) < 2:
+        return sparse.csr_matrix((n, n))
+
+    points = _unit_vectors(coords['latitude'].to_numpy()[rows], coords['longitude'].to_numpy()[rows])
+    k = min(k, len(rows) - 1)
+    # Chord distance on the unit sphere; the first hit is the point itself
+    chord, idx = cKDTree(points).query(points, k=k + 1)
+    distance_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord[:, 1:] / 2, 0, 1))
+    weights = np.exp(-distance_km / scale_km)
+
+    adjacency = sparse.csr_matrix((weights.ravel(), (np.repeat(rows, k), rows[idx[:, 1:]].ravel())), shape=(n, n))
+    # Make the relation symmetric: a neighbour of mine is my neighbour too
+    return adjacency.maximum(adjacency.T).tocsr()
+
+def build_adjacency(pincodes, df_coords=None, prefix_weights=None, k=DEFAULT_K_NEIGHBOURS,
+                    scale_km=DEFAULT_DISTANCE_SCALE_KM):
+    """
+    Neighbourhood index for a list of pincodes: the prefix adjacency, combined (element-wise
+    maximum) with the centroid k-nearest-neighbour adjacency when coordinates are given.
+    """
+    adjacency = prefix_adjacency(pincodes, prefix_weights)
+    if df_coords is not None and not df_coords.empty:
+        adjacency = adjacency.maximum(centroid_adjacency(pincodes, df_coords, k=k, scale_km=scale_km)).tocsr()
+    return adjacency
+
+def neighbourhood_sum(adjacency, values):
+    """
+    Weighted sum of each pincode's neighbours' values (one sparse matrix-vector product),
+    e.g. the update load at neighbouring centres that may spill over.
+    """
+    return adjacency @ np.asarray(values, dtype=float)
+
+def neighbourhood_mean(adjacency, values):
+    """
+    Weighted mean of each pincode's neighbours' values (NaN for pincodes without neighbours).
+    """
+    totals = np.asarray(adjacency.sum(axis=1)).ravel()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, neighbourhood_sum(adjacency, values) / totals, np.nan)
+
+def smooth_rate(numerator, denominator, adjacency, strength=100.0):
+    """
+    Neighbourhood-smoothed rate numerator / denominator for all pincodes at once.
+
+    Each pincode's raw rate is blended with its neighbourhood's pooled rate
+    (sum of neighbours' numerators / denominators) with credibility
+    denominator / (denominator + strength), so a pincode with few enrolled children
+    borrows most of its rate from its neighbours while large pincodes keep their own.
+    """
+    num = np.asarray(numerator, dtype=float)
+    den = np.asarray(denominator, dtype=float)
+    pooled_num = neighbourhood_sum(adjacency, num) + num
+    pooled_den = neighbourhood_sum(adjacency, den) + den
+    with np.errstate(invalid='ignore', divide='ignore'):
+        raw = np.where(den > 0, num / den, 0.0)
+        pooled = np.where(pooled_den > 0, pooled_num / pooled_den, raw)
+    credibility = den / (den + strength) if strength > 0 else np.ones_like(den)
+    return credibility * raw + (1 - credibility) * pooled
@@ -0,0 +1,163 @@
+import glob
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src import data_processing
+from src.instrumentation import traced, current_span
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+# Raw category folders, as read by data_processing.load_data
+CATEGORY_DIRS = ('biometric', 'demographic', 'enrollment')
+
+# In-memory size of a parsed CSV relative to its size on disk (object columns such as
+# state/district dominate), plus headroom for the groupby state of one partition
+MEMORY_EXPANSION = 4.0
+
+def plan_partitions(raw_path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, workers=None):
+    """
+    Sizes the spill for a memory budget shared by the worker processes.
+
+    Returns (n_partitions, workers, chunk_rows): enough pincode partitions that one
+    partition of every category fits in a worker's share of the budget, and a
+    read chunk size that keeps the spilling readers within the same share.
+    """
+    files = glob.glob(os.path.join(raw_path, '*', '*.csv'))
+    raw_bytes = sum(os.path.getsize(f) for f in files)
+    workers = max(1, workers or os.cpu_count() or 1)
+    worker_budget = memory_budget_mb * 1e6 / workers
+
+    n_partitions = max(1, math.ceil(raw_bytes * MEMORY_EXPANSION / worker_budget))
+
+    # Average raw row width from the first file, used to turn bytes into rows
+    row_bytes = 100
+    if files:
+        with open(files[0], 'rb') as f:
+            sample = f.read(1 << 20)
+        if sample.count(b'\n') > 1:
+            row_bytes = len(sample) / sample.count(b'\n')
+    chunk_rows = max(10_000, int(worker_budget / (row_bytes * MEMORY_EXPANSION)))
+    return n_partitions, workers, chunk_rows
+
+def _partition_dir(spill_dir, part):
+    return os.path.join(spill_dir, f'p{part:04d}')
+
+def _spill_file(task):
+    """
+    Splits one raw extract into per-partition spill files, hashing rows by pincode.
+    Each task writes its own files, so spilling needs no locking. Returns rows spilled
+    (rows with a valid pincode).
+    """
+    path, file_id, category, spill_dir, n_partitions, chunk_rows = task
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        chunk = data_processing.normalize_columns(chunk)
+        # Hash the integer pincode: the parsed dtype varies between files and chunks (int, or
+        # float/str where a chunk has blanks), and the same pincode must land in one partition.
+        # Rows without a valid pincode are dropped, as the groupby aggregations would drop them
+        pincode = pd.to_numeric(chunk['pincode'], errors='coerce')
+        valid = pincode.notna() & (pincode == pincode.round())
+        chunk = chunk[valid].assign(pincode=pincode[valid].astype('int64'))
+        rows += len(chunk)
+        parts = pd.util.hash_pandas_object(chunk['pincode'], index=False).to_numpy() % n_partitions
+        for part, group in chunk.groupby(parts):
+            out = os.path.join(_partition_dir(spill_dir, part), f'{category}-{file_id:05d}.csv')
+            group.to_csv(out, mode='a', header=not os.path.exists(out), index=False)
+    return rows
+
+def _read_partition(part_dir, category):
+    files = sorted(glob.glob(os.path.join(part_dir, f'{category}-*.csv')))
+    if not files:
+        return pd.DataFrame()
+    return pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+
+def _aggregate_partition(task):
+    """
+    Runs the in-memory data_processing aggregations on one pincode partition.
+    Partitions hold disjoint pincodes, so the results only need concatenating.
+    """
+    part_dir, timeline = task
+    df_bio, df_demo, df_enrol = (_read_partition(part_dir, c) for c in CATEGORY_DIRS)
+    result = {
+        'pincode': data_processing.aggregate_by_pincode(df_bio, df_demo, df_enrol),
+        'monthly': data_processing.aggregate_monthly_demand(df_bio),
+        'measures': data_processing.aggregate_monthly_measures(df_bio, df_demo, df_enrol),
+        'daily': data_processing.aggregate_daily_updates(df_bio, df_demo),
+        'geography': data_processing.geography_from_raw(df_bio, df_demo, df_enrol),
+    }
+    if timeline:
+        # Weekly bins are fixed calendar weeks, so partial timelines add up exactly
+        result['weekly'] = data_processing.aggregate_time_series(df_bio, df_demo)
+    return result
+
+def _combine(results, timeline):
+    def concat(key):
+        frames = [r[key] for r in results if not r[key].empty]
+        return pd.concat(frames, ignore_index=True) if frames else results[0][key]
+
+    # A partition without e.g. enrolment rows lacks those columns; they count as 0 as in the merge
+    df_risk = concat('pincode').fillna(0)
+    df_monthly = concat('monthly').sort_values(['month', 'pincode']).reset_index(drop=True)
+    df_measures = concat('measures').fillna(0).sort_values(['month', 'pincode']).reset_index(drop=True)
+    df_daily = concat('daily').sort_values(['date', 'pincode']).reset_index(drop=True)
+    combined = {'pincode': df_risk, 'monthly': df_monthly, 'measures': df_measures, 'daily': df_daily,
+                'geography': concat('geography')}
+
+    if timeline:
+        weekly = [r['weekly'] for r in results if not r['weekly'].empty]
+        if weekly:
+            df_weekly = pd.concat(weekly).fillna(0).groupby(level=0).sum().sort_index()
+            combined['weekly'] = df_weekly.asfreq('W', fill_value=0)
+        else:
+            combined['weekly'] = pd.DataFrame()
+    return combined
+
+@traced()
+def aggregate_out_of_core(raw_path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, workers=None,
+                          spill_dir=None, timeline=False):
+    """
+    Out-of-core variant of the data_processing aggregations for extracts larger than RAM.
+
+    Rows are hash-partitioned by pincode into spill files (one partition per pincode
+    set, sized from memory_budget_mb), each partition is aggregated independently in
+    a process pool, and the results are concatenated. Returns a dict with 'pincode'
+    (aggregate_by_pincode), 'monthly' (aggregate_monthly_demand), 'measures'
+    (aggregate_monthly_measures), 'daily' (aggregate_daily_updates) and 'geography'
+    (geography_from_raw), plus 'weekly' (aggregate_time_series) when timeline=True.
+
+    Spill files go to a temporary folder under spill_dir (system temp by default)
+    and are removed afterwards.
+    """
+    n_partitions, workers, chunk_rows = plan_partitions(raw_path, memory_budget_mb, workers)
+    current_span().set(partitions=n_partitions, workers=workers, chunk_rows=chunk_rows)
+
+    if spill_dir:
+        os.makedirs(spill_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='spill-', dir=spill_dir)
+    try:
+        for part in range(n_partitions):
+            os.makedirs(_partition_dir(work_dir, part))
+
+        spill_tasks = []
+        for category in CATEGORY_DIRS:
+            for path in sorted(glob.glob(os.path.join(raw_path, category, '*.csv'))):
+                spill_tasks.append((path, len(spill_tasks), category, work_dir, n_partitions, chunk_rows))
+        agg_tasks = [(_partition_dir(work_dir, part), timeline) for part in range(n_partitions)]
+
+        if workers == 1:
+            rows = sum(_spill_file(t) for t in spill_tasks)
+            results = [_aggregate_partition(t) for t in agg_tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rows = sum(pool.map(_spill_file, spill_tasks))
+                results = list(pool.map(_aggregate_partition, agg_tasks))
+        current_span().set(rows_in=rows)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return _combine(results, timeline)
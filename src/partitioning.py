@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from collections import Counter
+
+import pandas as pd
+
+MANIFEST_FILE = '_manifest.json'
+# Each write goes to a fresh <root>/_v<ns timestamp> directory; the manifest names its files
+VERSION_PREFIX = '_v'
+
+# Hex characters of the value digest appended to slugs that collide
+DIRNAME_HASH_CHARS = 8
+
+def partition_dirname(col, value, hashed=False):
+    """
+    Returns a filesystem-safe directory name for one partition value, e.g. state=Tamil_Nadu.
+    With hashed=True a short digest of the exact value is appended (state=A_B-1f2e3d4c),
+    which keeps values that slugify alike apart.
+    """
+    slug = re.sub(r'[^0-9A-Za-z\-]+', '_', str(value)).strip('_') or 'Unknown'
+    if hashed:
+        digest = hashlib.blake2b(str(value).encode(), digest_size=DIRNAME_HASH_CHARS // 2).hexdigest()
+        slug = f"{slug}-{digest}"
+    return f"{col}={slug}"
+
+def partition_dirnames(col, values):
+    """
+    Maps each distinct value of a partition column to its directory name. Values whose
+    slugs collide (compared case-insensitively, for case-insensitive filesystems) all get
+    the hashed name, so the mapping does not depend on which values are present first.
+    """
+    values = sorted(set(values))
+    plain = {v: partition_dirname(col, v) for v in values}
+    counts = Counter(name.lower() for name in plain.values())
+    dirs = {v: partition_dirname(col, v, hashed=True) if counts[name.lower()] > 1 else name
+            for v, name in plain.items()}
+    if len({name.lower() for name in dirs.values()}) != len(dirs):
+        raise ValueError(f"Could not derive distinct partition directories for column {col!r}")
+    return dirs
+
+def _column_stats(df):
+    stats = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            if series.notna().any():
+                stats[col] = {'min': float(series.min()), 'max': float(series.max())}
+                if col != 'pincode':
+                    stats[col]['sum'] = float(series.sum())
+        elif col == 'month':
+            values = series.dropna().astype(str)
+            if not values.empty:
+                stats[col] = {'min': values.min(), 'max': values.max()}
+    return stats
+
+def _top_dirs(manifest):
+    # Top-level entries of root that a manifest's partition files live under
+    return {p['path'].replace(os.sep, '/').split('/')[0] for p in manifest['partitions']} if manifest else set()
+
+def write_partitioned(df, root, partition_cols=('state',), fmt='csv'):
+    """
+    Writes a DataFrame as one file per combination of partition_cols under root,
+    plus a _manifest.json with row counts and column statistics for each partition and
+    the exact value -> directory name mapping of each partition column ('dirs'; see
+    partition_dirnames).
+
+    The files go to a fresh version directory under root and the manifest is swapped in
+    last (os.replace), so readers of the live dataset see either the previous complete
+    version or the new one. The previous version's files are kept for readers still
+    holding its manifest; older ones are deleted.
+
+    Returns the manifest dictionary.
+    """
+    partition_cols = list(partition_cols)
+    missing = [c for c in partition_cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"Partition columns not found in DataFrame: {missing}")
+    if fmt not in ('csv', 'json'):
+        raise ValueError(f"Unsupported partition format: {fmt}")
+
+    os.makedirs(root, exist_ok=True)
+    previous = read_manifest(root)
+    version = f"{VERSION_PREFIX}{time.time_ns()}"
+
+    keys = df[partition_cols].fillna('Unknown').astype(str)
+    dirs = {c: partition_dirnames(c, keys[c].unique()) for c in partition_cols}
+    partitions = []
+    for values, part in df.groupby([keys[c] for c in partition_cols], sort=True):
+        if not isinstance(values, tuple):
+            values = (values,)
+        rel_dir = os.path.join(version, *[dirs[c][v] for c, v in zip(partition_cols, values)])
+        rel_path = os.path.join(rel_dir, f'part.{fmt}')
+        os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+
+        out_path = os.path.join(root, rel_path)
+        if fmt == 'csv':
+            part.to_csv(out_path, index=False)
+        else:
+            part.to_json(out_path, orient='records')
+
+        partitions.append({
+            'values': dict(zip(partition_cols, values)),
+            'path': rel_path,
+            'rows': int(len(part)),
+            'stats': _column_stats(part),
+        })
+
+    manifest = {
+        'format': fmt,
+        'partition_cols': partition_cols,
+        'columns': list(df.columns),
+        'total_rows': int(len(df)),
+        'dirs': dirs,
+        'partitions': partitions,
+    }
+    tmp_path = os.path.join(root, f'{MANIFEST_FILE}.{version}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(root, MANIFEST_FILE))
+
+    # Everything but the new and previous versions (including files of the older flat layout
+    # that no manifest references any more, and temp files of interrupted writes) goes
+    keep = {MANIFEST_FILE, version} | _top_dirs(previous)
+    for entry in os.listdir(root):
+        if entry not in keep:
+            path = os.path.join(root, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    return manifest
+
+def read_manifest(root):
+    """
+    Returns the manifest of a partitioned dataset, or None if root has not been written.
+    """
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def partition_values(manifest, col):
+    """
+    Returns the sorted distinct values of a partition column, read from the manifest only.
+    """
+    return sorted({p['values'][col] for p in manifest['partitions'] if col in p['values']})
+
+def select_partitions(manifest, **filters):
+    """
+    Prunes partitions using the manifest. Each filter is a partition column mapped to a
+    single value or a list of values; None or 'All' leaves that column unfiltered.
+    Filters on 'month' that are not partition columns are checked against the month
+    min/max statistics, so month-range queries still skip partitions that cannot match.
+    """
+    selected = []
+    for part in manifest['partitions']:
+        keep = True
+        for col, wanted in filters.items():
+            if wanted is None or wanted == 'All':
+                continue
+            wanted = [str(w) for w in wanted] if isinstance(wanted, (list, tuple, set)) else [str(wanted)]
+            if col in part['values']:
+                keep = part['values'][col] in wanted
+            elif col in part['stats'] and 'min' in part['stats'][col]:
+                lo, hi = part['stats'][col]['min'], part['stats'][col]['max']
+                keep = any(lo <= w <= hi for w in wanted) if col == 'month' else True
+            if not keep:
+                break
+        if keep:
+            selected.append(part)
+    return selected
+
+def load_partitions(root, **filters):
+    """
+    Loads only the partitions of a dataset that match the given filters (see select_partitions).
+    Returns None if the dataset does not exist and an empty DataFrame if nothing matches.
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        return None
+
+    parts = select_partitions(manifest, **filters)
+    if not parts:
+        return pd.DataFrame(columns=manifest['columns'])
+
+    frames = []
+    for part in parts:
+        path = os.path.join(root, part['path'])
+        if manifest['format'] == 'csv':
+            frames.append(pd.read_csv(path))
+        else:
+            frames.append(pd.read_json(path, orient='records'))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
@@ -0,0 +1,506 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from src import data_processing, risk_profiling, ihs_scoring, partitioning, instrumentation
+from src.series_store import SeriesStore
+
+# Bump when a stage's logic changes so previously cached outputs are not reused
+PIPELINE_VERSION = 15
+
+# Cached outputs kept per stage (older ones are deleted)
+CACHE_ENTRIES_PER_STAGE = 4
+
+DEFAULT_CONFIG = {
+    'raw_path': 'data/raw',
+    'output_path': 'data/processed',
+    'cache_dir': '.pipeline_cache',
+    'synthetic_fallback': True,
+    'synthetic_seed': 42,
+    # Out-of-core aggregation: spill raw rows to pincode partitions instead of loading them
+    # (for histories larger than RAM); spill_dir defaults to the system temp folder
+    'out_of_core': False,
+    'memory_budget_mb': 1024,
+    'workers': None,
+    'spill_dir': None,
+    # Rates & risk
+    'rate_denominator': 'age_5_17',
+    # Neighbourhood smoothing of rates: None or 'prefix'; centroids_path optionally adds
+    # k-nearest-centroid neighbours (CSV with pincode, latitude, longitude)
+    'rate_smoothing': None,
+    'smoothing_strength': 100.0,
+    'centroids_path': None,
+    # Empirical-Bayes rate shrinkage toward district/state priors (src/rate_shrinkage.py):
+    # None or 'poisson_gamma' (see PIPELINE_SHRINKAGE_METHODS); an alternative to rate_smoothing
+    'rate_shrinkage': None,
+    'shrinkage_levels': ('district', 'state'),
+    'shrinkage_min_pincodes': 5,
+    'risk_method': 'quantile_bands',
+    'risk_quantiles': (0.25, 0.75),
+    'high_load_quantile': 0.95,
+    # Surge detection over daily pincode updates ('ewma' or 'median' baseline); a None
+    # threshold uses the method's calibrated default (surge_detection.DEFAULT_THRESHOLDS)
+    'surge_method': 'ewma',
+    'surge_window': 28,
+    'surge_threshold': None,
+    'surge_min_count': 10,
+    'surge_recent_days': 7,
+    # IHS scoring
+    'ihs_weights': dict(ihs_scoring.DEFAULT_IHS_WEIGHTS),
+    'strategy_cut_points': ihs_scoring.DEFAULT_CUT_POINTS,
+    'strategy_labels': ihs_scoring.DEFAULT_STRATEGY_LABELS,
+    'strategy_inclusive': False,
+    'round_scores': False,
+    # 'pincode_prefix' maps pincodes with add_geography_from_pincode; 'raw' uses the state/district columns of the extracts
+    'geography': 'pincode_prefix',
+    # Forecasting (set forecast_level to None to skip)
+    'forecast_level': 'district',
+    'forecast_horizon': 6,
+    # Prediction interval quantiles (p10/p50/p90 columns; empty to skip) and bootstrap paths per series
+    'forecast_quantiles': (0.1, 0.5, 0.9),
+    'forecast_paths': 500,
+    # Weight of the enrolment cohort projection in blended_forecast (None: statistical forecast only)
+    'cohort_blend_weight': 0.5,
+    # Van/camp allocation over the forecast horizon (vans_per_district may be a {district: vans} dict)
+    'vans_per_district': 2,
+    'camp_days': 20,
+    'daily_capacity': 150,
+    # Export
+    'export_format': 'csv',
+    'metrics_name': 'ihs_features_population',
+    'demand_name': 'biometric_mbu_aggregated',
+    'forecast_name': 'demand_forecast',
+    'series_name': 'series_store',
+    'schedule_name': 'van_schedule',
+    'allocation_summary_name': 'allocation_summary',
+    'metrics_columns': None,
+    'demand_partition_cols': ['state'],
+    # Run traces (not part of any stage key); profile_stages lists stages to run under cProfile
+    'run_name': 'generate_processed_data',
+    'trace_dir': instrumentation.DEFAULT_TRACE_DIR,
+    'profile_stages': (),
+}
+
+# Settings reproducing the outputs of dashboard/scripts/process_data.py
+PROCESS_DATA_CONFIG = {
+    'run_name': 'process_data',
+    'synthetic_fallback': False,
+    'rate_denominator': 'total_enrollment',
+    'risk_method': 'load_threshold',
+    'ihs_weights': {**ihs_scoring.DEFAULT_IHS_WEIGHTS, 'mbu_weight': 150},
+    'strategy_labels': (
+        'Critical: Mobile Van & Camp Deployment',
+        'Warning: Targeted SMS Campaigns',
+        'Healthy: Routine Digital Nudges',
+    ),
+    'strategy_inclusive': True,
+    'round_scores': True,
+    'geography': 'raw',
+    'export_format': 'json',
+    'metrics_name': 'dashboard_metrics',
+    'demand_name': 'monthly_demand',
+    'metrics_columns': [
+        'pincode', 'state', 'district',
+        'biometric_updates', 'demographic_updates', 'total_update_load',
+        # Rates are kept so the dashboard's what-if analysis can rescore pincodes
+        'mbu_rate', 'demo_rate',
+        'ihs_score', 'risk_category', 'strategy',
+        'surge_flag', 'surge_days', 'surge_score',
+    ],
+}
+
+Stage = namedtuple('Stage', ['name', 'deps', 'params', 'func'])
+
+def _fingerprint_inputs(raw_path):
+    """
+    Identifies the raw extracts by relative path, size and modification time.
+    """
+    files = sorted(glob.glob(os.path.join(raw_path, '*', '*.csv')))
+    return [(os.path.relpath(f, raw_path), os.path.getsize(f), os.path.getmtime(f)) for f in files]
+
+# --- Stages ---
+# Each stage receives the run config plus its dependencies' outputs, in order.
+
+def _stage_load(config):
+    if config['out_of_core'] and _fingerprint_inputs(config['raw_path']):
+        # The extracts are streamed by the aggregate stage; only their location is passed on
+        return {'raw_path': config['raw_path']}
+
+    df_bio, df_demo, df_enrol = data_processing.load_data(config['raw_path'])
+    if df_bio.empty and df_demo.empty and df_enrol.empty and config['synthetic_fallback']:
+        print("No raw data found. Generating synthetic data for demonstration.")
+        from src import synthetic
+        df_bio, df_demo, df_enrol = synthetic.generate_synthetic_frames(seed=config['synthetic_seed'])
+    return {'bio': df_bio, 'demo': df_demo, 'enrol': df_enrol}
+
+def _stage_aggregate(config, raw):
+    if 'raw_path' in raw:
+        from src import out_of_core
+        return out_of_core.aggregate_out_of_core(raw['raw_path'], memory_budget_mb=config['memory_budget_mb'],
+                                                 workers=config['workers'], spill_dir=config['spill_dir'])
+
+    df_risk = data_processing.aggregate_by_pincode(raw['bio'], raw['demo'], raw['enrol'])
+    df_monthly = data_processing.aggregate_monthly_demand(raw['bio'])
+    df_measures = data_processing.aggregate_monthly_measures(raw['bio'], raw['demo'], raw['enrol'])
+    df_daily = data_processing.aggregate_daily_updates(raw['bio'], raw['demo'])
+    return {'pincode': df_risk, 'monthly': df_monthly, 'measures': df_measures, 'daily': df_daily}
+
+def _stage_rates(config, agg, df_geo=None):
+    df = risk_profiling.calculate_update_load(agg['pincode'])
+    df = risk_profiling.calculate_update_rates(df, denominator=config['rate_denominator'])
+    if config['rate_shrinkage'] and not df.empty:
+        # Priors are grouped by the geography stage's district/state (pincode prefix where unknown)
+        geo = df_geo.drop_duplicates('pincode') if not df_geo.empty else df_geo
+        df = df.drop(columns=[c for c in ['state', 'district'] if c in df.columns])
+        df_groups = df[['pincode']].merge(geo, on='pincode', how='left') if not geo.empty else df[['pincode']]
+        df = risk_profiling.shrink_update_rates(
+            df.assign(**{c: df_groups[c].to_numpy() for c in ['state', 'district'] if c in df_groups.columns}),
+            denominator=config['rate_denominator'], method=config['rate_shrinkage'],
+            prior_levels=tuple(config['shrinkage_levels']), min_pincodes=config['shrinkage_min_pincodes'],
+        ).drop(columns=['state', 'district'], errors='ignore')
+    if config['rate_smoothing'] and not df.empty:
+        from src import neighbourhood
+        df_coords = pd.read_csv(config['centroids_path']) if config['centroids_path'] else None
+        adjacency = neighbourhood.build_adjacency(df['pincode'], df_coords=df_coords)
+        df = risk_profiling.smooth_update_rates(df, denominator=config['rate_denominator'],
+                                                adjacency=adjacency, strength=config['smoothing_strength'])
+    return df
+
+def _stage_surges(config, agg):
+    from src import surge_detection
+    return surge_detection.scan_surges(agg['daily'], method=config['surge_method'], window=config['surge_window'],
+                                       threshold=config['surge_threshold'], min_count=config['surge_min_count'],
+                                       recent_days=config['surge_recent_days'])
+
+def _stage_risk(config, df_rates, df_surges):
+    if config['risk_method'] == 'load_threshold':
+        df = risk_profiling.flag_high_load(df_rates, quantile=config['high_load_quantile'])
+    else:
+        df = risk_profiling.categorize_risk(df_rates, quantiles=tuple(config['risk_quantiles']))
+    return risk_profiling.add_surge_flags(df, df_surges)
+
+def _stage_ihs(config, df_risk):
+    return ihs_scoring.calculate_pincode_ihs(
+        df_risk.copy(),
+        weights=config['ihs_weights'],
+        cut_points=tuple(config['strategy_cut_points']),
+        labels=tuple(config['strategy_labels']),
+        inclusive=config['strategy_inclusive'],
+        round_scores=config['round_scores'],
+    )
+
+def _stage_geography(config, raw, agg):
+    if config['geography'] == 'raw':
+        if 'geography' in agg:
+            return agg['geography']
+        return data_processing.geography_from_raw(raw['bio'], raw['demo'], raw['enrol'])
+
+    pincodes = [df['pincode'] for df in (agg['pincode'], agg['monthly']) if not df.empty]
+    if not pincodes:
+        return pd.DataFrame(columns=['pincode', 'state', 'district'])
+    df_geo = pd.DataFrame({'pincode': pd.concat(pincodes).drop_duplicates().to_numpy()})
+    return data_processing.add_geography_from_pincode(df_geo)
+
+def _with_geography(df, df_geo):
+    df = df.drop(columns=[c for c in ['state', 'district'] if c in df.columns])
+    if df.empty or df_geo.empty:
+        return df.assign(state='Unknown', district='Unknown')
+    df = df.merge(df_geo, on='pincode', how='left')
+    df[['state', 'district']] = df[['state', 'district']].fillna('Unknown')
+    return df
+
+def _stage_series(config, agg, df_geo):
+    return SeriesStore.from_long(agg['measures'], df_geo=df_geo)
+
+def _stage_forecast(config, store):
+    level = config['forecast_level']
+    if not level or 'mbu_demand' not in store.matrices or store.matrices['mbu_demand'].nnz == 0:
+        return pd.DataFrame()
+
+    # Imported here: statsmodels is only needed when this stage actually runs
+    from src import forecasting
+
+    df_forecast = forecasting.forecast_store(store, level=level, steps=config['forecast_horizon'],
+                                             quantiles=config['forecast_quantiles'], n_paths=config['forecast_paths'])
+    if config['cohort_blend_weight'] is not None:
+        from src import cohort_projection
+        df_cohort = cohort_projection.cohort_forecast(store, level=level, horizon=config['forecast_horizon'])
+        df_forecast = cohort_projection.blend_forecasts(df_forecast, df_cohort, level=level,
+                                                        weight=config['cohort_blend_weight'])
+    return df_forecast
+
+def _stage_allocation(config, store, df_ihs, df_forecast):
+    if len(store.pincodes) == 0 or 'mbu_demand' not in store.matrices:
+        return {'schedule': pd.DataFrame(), 'summary': pd.DataFrame(), 'stats': {}}
+
+    from src import allocation
+    level = config['forecast_level']
+    result = allocation.plan_allocation(
+        store, df_ihs, df_forecast=df_forecast if level else None, level=level or 'district',
+        horizon=config['forecast_horizon'], vans_per_district=config['vans_per_district'],
+        camp_days=config['camp_days'], daily_capacity=config['daily_capacity'],
+        strategy_labels=tuple(config['strategy_labels']))
+    stats = result['stats']
+    print(f"Allocated camps for {stats['pincodes']} pincodes x {stats['months']} months in {stats['solve_s']:.2f}s: "
+          f"{stats['unmet']:,.0f} of {stats['demand']:,.0f} MBUs unmet ({stats['unmet_pct']:.1f}%)")
+    return result
+
+def _write_table(df, path, fmt):
+    if fmt == 'json':
+        with open(path, 'w') as f:
+            f.write(df.to_json(orient='records'))
+    else:
+        df.to_csv(path, index=False)
+
+# Sidecar next to an exported table recording the settings it was produced with, so the
+# dashboard rescores it (what-if, date ranges) under the same settings
+RUN_CONFIG_SUFFIX = '.config.json'
+
+def run_config_path(table_path):
+    """
+    Returns the run-config sidecar of an exported table (a file or a partitioned dataset
+    directory): <name>.config.json next to it.
+    """
+    return os.path.splitext(os.path.normpath(table_path))[0] + RUN_CONFIG_SUFFIX
+
+def read_run_config(table_path):
+    """
+    Returns the stage parameters an exported table was produced with, or None for tables
+    exported before they were recorded.
+    """
+    path = run_config_path(table_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _stage_export(config, df_ihs, df_geo, agg, store, df_forecast, plan):
+    out = config['output_path']
+    fmt = config['export_format']
+    os.makedirs(out, exist_ok=True)
+    written = []
+
+    df_metrics = _with_geography(df_ihs, df_geo)
+    if config['metrics_columns']:
+        df_metrics = df_metrics[[c for c in config['metrics_columns'] if c in df_metrics.columns]]
+    path = os.path.join(out, f"{config['metrics_name']}.{fmt}")
+    _write_table(df_metrics, path, fmt)
+    partitioning.write_partitioned(df_metrics, os.path.join(out, config['metrics_name']),
+                                   partition_cols=['state'], fmt=fmt)
+    written += [path, os.path.join(out, config['metrics_name'], partitioning.MANIFEST_FILE)]
+    print(f"Exported metrics for {len(df_metrics)} pincodes to {path}")
+
+    if not agg['monthly'].empty:
+        df_demand = _with_geography(agg['monthly'], df_geo)
+        path = os.path.join(out, f"{config['demand_name']}.{fmt}")
+        _write_table(df_demand, path, fmt)
+        partitioning.write_partitioned(df_demand, os.path.join(out, config['demand_name']),
+                                       partition_cols=config['demand_partition_cols'], fmt=fmt)
+        written += [path, os.path.join(out, config['demand_name'], partitioning.MANIFEST_FILE)]
+        print(f"Exported monthly demand ({len(df_demand)} rows) to {path}")
+    else:
+        print("No biometric data available for demand forecasting.")
+
+    path = os.path.join(out, f"{config['series_name']}.npz")
+    store.save(path)
+    written.append(path)
+    print(f"Exported series store ({len(store.pincodes)} pincodes x {len(store.periods)} months) to {path}")
+
+    if not df_forecast.empty:
+        path = os.path.join(out, f"{config['forecast_name']}.{fmt}")
+        _write_table(df_forecast, path, fmt)
+        written.append(path)
+        print(f"Exported {config['forecast_horizon']}-month forecast to {path}")
+
+    if not plan['schedule'].empty:
+        for key, name in (('schedule', 'schedule_name'), ('summary', 'allocation_summary_name')):
+            path = os.path.join(out, f"{config[name]}.{fmt}")
+            _write_table(plan[key], path, fmt)
+            written.append(path)
+        print(f"Exported van schedule ({len(plan['schedule'])} visits) to {written[-2]}")
+
+    # Written last, so a reader that sees it also sees the tables it describes
+    path = run_config_path(os.path.join(out, config['metrics_name']))
+    with open(path, 'w') as f:
+        json.dump({p: config[p] for stage in STAGES for p in stage.params}, f, indent=2, default=str)
+    written.append(path)
+
+    # Fingerprints let a later run tell whether another config has overwritten the files since
+    return {path: _file_fingerprint(path) for path in written}
+
+STAGES = [
+    Stage('load', (), ('raw_path', 'synthetic_fallback', 'synthetic_seed', 'out_of_core'), _stage_load),
+    Stage('aggregate', ('load',), (), _stage_aggregate),
+    Stage('geography', ('load', 'aggregate'), ('geography',), _stage_geography),
+    Stage('rates', ('aggregate', 'geography'), ('rate_denominator', 'rate_smoothing', 'smoothing_strength',
+                                                'centroids_path', 'rate_shrinkage', 'shrinkage_levels',
+                                                'shrinkage_min_pincodes'), _stage_rates),
+    Stage('surges', ('aggregate',), ('surge_method', 'surge_window', 'surge_threshold', 'surge_min_count',
+                                     'surge_recent_days'), _stage_surges),
+    Stage('risk', ('rates', 'surges'), ('risk_method', 'risk_quantiles', 'high_load_quantile'), _stage_risk),
+    Stage('ihs', ('risk',), ('ihs_weights', 'strategy_cut_points', 'strategy_labels',
+                             'strategy_inclusive', 'round_scores'), _stage_ihs),
+    Stage('series', ('aggregate', 'geography'), (), _stage_series),
+    Stage('forecast', ('series',), ('forecast_level', 'forecast_horizon', 'forecast_quantiles', 'forecast_paths',
+                                     'cohort_blend_weight'), _stage_forecast),
+    Stage('allocation', ('series', 'ihs', 'forecast'), ('vans_per_district', 'camp_days', 'daily_capacity',
+                                                        'strategy_labels'), _stage_allocation),
+    Stage('export', ('ihs', 'geography', 'aggregate', 'series', 'forecast', 'allocation'),
+          ('output_path', 'export_format', 'metrics_name', 'demand_name', 'forecast_name',
+           'series_name', 'schedule_name', 'allocation_summary_name', 'metrics_columns',
+           'demand_partition_cols'), _stage_export),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+# Dependencies a stage only reads when a config key is set: (stage, dependency) -> key.
+# Without the key the dependency is neither run nor part of the stage's cache key, and the
+# stage receives None in its place
+CONDITIONAL_DEPS = {
+    # Only shrinkage groups pincodes by district/state, so a geography change must not
+    # invalidate raw or smoothed rates
+    ('rates', 'geography'): 'rate_shrinkage',
+}
+
+def stage_deps(stage, config):
+    """
+    Returns the dependencies a stage reads under a config (see CONDITIONAL_DEPS).
+    """
+    return tuple(dep for dep in stage.deps
+                 if (stage.name, dep) not in CONDITIONAL_DEPS or config[CONDITIONAL_DEPS[(stage.name, dep)]])
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def stage_keys(config):
+    """
+    Returns {stage name: cache key}. A key hashes the stage's own parameters and its
+    dependencies' keys (and, for 'load', the raw file fingerprints), so a parameter
+    change invalidates that stage and everything downstream of it only.
+    """
+    keys = {}
+    for stage in STAGES:
+        payload = {
+            'version': PIPELINE_VERSION,
+            'stage': stage.name,
+            'params': {p: config[p] for p in stage.params},
+            'deps': [keys[d] for d in stage_deps(stage, config)],
+        }
+        if stage.name == 'load':
+            payload['inputs'] = _fingerprint_inputs(config['raw_path'])
+        keys[stage.name] = _digest(payload)
+    return keys
+
+def _cache_path(cache_dir, stage_name, key):
+    return os.path.join(cache_dir, f'{stage_name}-{key}.pkl')
+
+def _prune_cache(cache_dir, stage_name):
+    entries = sorted(glob.glob(os.path.join(cache_dir, f'{stage_name}-*.pkl')), key=os.path.getmtime, reverse=True)
+    for path in entries[CACHE_ENTRIES_PER_STAGE:]:
+        os.remove(path)
+
+def _file_fingerprint(path):
+    # (mtime, size) of a written file; None when it is missing
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _is_valid(stage_name, output):
+    # An export is only reusable while the files it wrote are still the ones it wrote:
+    # another config exporting to the same output_path overwrites them
+    if stage_name == 'export':
+        return isinstance(output, dict) and all(
+            fingerprint is not None and _file_fingerprint(path) == fingerprint
+            for path, fingerprint in output.items())
+    return True
+
+def clear_cache(cache_dir=DEFAULT_CONFIG['cache_dir']):
+    """
+    Deletes all memoized stage outputs.
+    """
+    for path in glob.glob(os.path.join(cache_dir, '*.pkl')):
+        os.remove(path)
+
+# Update rates are counts per enrolled child and routinely exceed 1, so the pipeline only
+# offers the Poisson-gamma estimator; beta_binomial needs proportions (numerator <= denominator)
+PIPELINE_SHRINKAGE_METHODS = ('poisson_gamma',)
+
+def validate_config(config):
+    """
+    Rejects option combinations the stages cannot run, before any stage does.
+    """
+    if config['rate_smoothing'] and config['rate_shrinkage']:
+        raise ValueError("rate_smoothing and rate_shrinkage are alternatives; set only one of them")
+    if config['rate_shrinkage'] not in (None,) + PIPELINE_SHRINKAGE_METHODS:
+        raise ValueError(f"rate_shrinkage={config['rate_shrinkage']!r} is not supported by the pipeline; "
+                         f"expected None or one of {PIPELINE_SHRINKAGE_METHODS} (beta_binomial only applies "
+                         f"to proportions, and update rates can exceed 1)")
+
+def run_pipeline(config=None, targets=('export',), force=False):
+    """
+    Runs the processing DAG (load -> aggregate -> geography -> rates/surges -> risk -> ihs ->
+    series -> forecast -> allocation -> export) and returns ({stage name: output}, report).
+
+    Each stage's output is memoized on disk under a hash of its inputs and parameters;
+    only stages whose key changed (or that are needed to compute one) are executed.
+    force=True ignores the cache. report lists (stage, 'cached' | 'ran', seconds).
+    Every run also writes a JSON trace of stage and function spans to config['trace_dir'].
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    validate_config(config)
+    cache_dir = config['cache_dir']
+    os.makedirs(cache_dir, exist_ok=True)
+    keys = stage_keys(config)
+
+    results = {}
+    report = []
+
+    def get(name):
+        if name in results:
+            return results[name]
+        stage = STAGES_BY_NAME[name]
+        path = _cache_path(cache_dir, name, keys[name])
+
+        if not force and os.path.exists(path):
+            start = time.perf_counter()
+            with instrumentation.span(name) as sp:
+                with open(path, 'rb') as f:
+                    output = pickle.load(f)
+                sp.set(cached=True, cache_key=keys[name], rows_out=instrumentation.count_rows(output))
+            if _is_valid(name, output):
+                results[name] = output
+                report.append((name, 'cached', time.perf_counter() - start))
+                return output
+
+        active = stage_deps(stage, config)
+        inputs = [get(dep) if dep in active else None for dep in stage.deps]
+        start = time.perf_counter()
+        with instrumentation.span(name, rows_in=instrumentation.count_rows(inputs)) as sp:
+            output = stage.func(config, *inputs)
+            sp.set(cached=False, cache_key=keys[name], rows_out=instrumentation.count_rows(output))
+        with open(path, 'wb') as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        _prune_cache(cache_dir, name)
+
+        results[name] = output
+        report.append((name, 'ran', time.perf_counter() - start))
+        return output
+
+    with instrumentation.run(config['run_name'], trace_dir=config['trace_dir'],
+                             profile_stages=config['profile_stages']) as trace:
+        for target in targets:
+            get(target)
+
+    print(f"Run trace written to {trace.trace_path}")
+    return results, report
+
+def print_report(report):
+    print("Pipeline stages:")
+    for name, status, seconds in report:
+        print(f"  {name:<10} {status:<7} {seconds:8.2f}s")
@@ -0,0 +1,432 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from src import http_service, partitioning
+
+API_PREFIX = '/setu/api/v1/query/'
+
+# Pipeline outputs served (partitioned metrics first, as in dashboard/data_store.py)
+METRICS_SOURCES = ('data/processed/ihs_features_population', 'data/processed/ihs_features_population.csv')
+FORECAST_SOURCES = ('data/processed/demand_forecast.csv',)
+
+# Low-cardinality text columns, held as integer codes into a sorted label list
+CODED_COLUMNS = ('state', 'district', 'risk_category', 'strategy')
+# Numeric columns served per pincode; each is also a top-K ranking key
+VALUE_COLUMNS = ('ihs_score', 'mbu_rate', 'demo_rate', 'total_update_load', 'biometric_updates',
+                 'demographic_updates', 'total_enrollment', 'surge_score')
+# Count columns also summed in district summaries
+SUMMED_COLUMNS = ('total_update_load', 'biometric_updates', 'demographic_updates', 'total_enrollment')
+FORECAST_COLUMNS = ('forecast', 'p10', 'p50', 'p90', 'blended_forecast')
+
+DEFAULT_CACHE_ENTRIES = 10_000
+DEFAULT_RELOAD_INTERVAL_S = 5.0
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 1000
+MAX_BATCH_PINCODES = 1000
+MAX_BODY_BYTES = 1024 * 1024
+
+class QueryError(ValueError):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _resolve(sources):
+    for path in sources:
+        if os.path.isdir(path):
+            if partitioning.read_manifest(path) is not None:
+                return path
+        elif os.path.exists(path):
+            return path
+    return None
+
+def sources_version(*paths):
+    """
+    Short version tag of the served files (size and modification time, manifest for a
+    partitioned source). Responses' ETags embed it, so regenerated outputs invalidate them.
+    """
+    parts = []
+    for path in paths:
+        if path is None:
+            continue
+        stat_path = os.path.join(path, partitioning.MANIFEST_FILE) if os.path.isdir(path) else path
+        stat = os.stat(stat_path)
+        parts.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+    return hashlib.blake2b('|'.join(parts).encode(), digest_size=6).hexdigest()
+
+def _read(path):
+    if path is None:
+        return None
+    if os.path.isdir(path):
+        return partitioning.load_partitions(path)
+    return pd.read_csv(path)
+
+def _number(value):
+    # JSON-safe float (NaN -> null)
+    value = float(value)
+    return None if value != value else value
+
+class QueryIndex:
+    """
+    Read-only in-memory index over the pipeline outputs. Pincodes are int64 keys sorted
+    once (lookups are a binary search), text columns are int32 codes into label lists,
+    numeric columns are plain float arrays, and the rows of each district are a
+    contiguous slice of a district-ordered permutation. Forecasts are dense
+    entity x horizon arrays.
+    """
+
+    def __init__(self, df_metrics, df_forecast=None, version=None):
+        self.version = version
+        df = df_metrics.drop_duplicates('pincode')
+        keys = pd.to_numeric(df['pincode'], errors='coerce')
+        df = df[keys.notna()]
+        keys = keys[keys.notna()].to_numpy(dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+
+        self.codes, self.labels, self._label_codes = {}, {}, {}
+        for col in CODED_COLUMNS:
+            if col in df.columns:
+                codes, labels = pd.factorize(df[col].astype(str).to_numpy()[order], sort=True)
+                self.codes[col] = codes.astype(np.int32)
+                self.labels[col] = labels.tolist()
+                self._label_codes[col] = {label: i for i, label in enumerate(self.labels[col])}
+        self.values = {col: df[col].to_numpy(dtype=float)[order] for col in VALUE_COLUMNS if col in df.columns}
+
+        # District -> rows: a permutation grouping rows by district code, and group offsets
+        if 'district' in self.codes:
+            self._district_rows = np.argsort(self.codes['district'], kind='stable')
+            self._district_starts = np.searchsorted(self.codes['district'][self._district_rows],
+                                                    np.arange(len(self.labels['district']) + 1))
+
+        self.forecast_entity = None
+        if df_forecast is not None and not df_forecast.empty:
+            self.forecast_entity = 'district' if 'district' in df_forecast.columns else df_forecast.columns[0]
+            entities, entity_codes = np.unique(df_forecast[self.forecast_entity].astype(str), return_inverse=True)
+            months = pd.to_datetime(df_forecast['month'])
+            first = months.groupby(entity_codes).transform('min')
+            steps = ((months.dt.year - first.dt.year) * 12 + months.dt.month - first.dt.month).to_numpy()
+            self._forecast_codes = {e: i for i, e in enumerate(entities)}
+            self.forecast_start = first.groupby(entity_codes).first().dt.strftime('%Y-%m').to_numpy()
+            self.forecast = {}
+            for col in FORECAST_COLUMNS:
+                if col in df_forecast.columns:
+                    grid = np.full((len(entities), steps.max() + 1), np.nan)
+                    grid[entity_codes, steps] = df_forecast[col].to_numpy(dtype=float)
+                    self.forecast[col] = grid
+
+    @property
+    def nbytes(self):
+        arrays = [self.keys, *self.codes.values(), *self.values.values()]
+        if self.forecast_entity is not None:
+            arrays += list(self.forecast.values())
+        return sum(a.nbytes for a in arrays)
+
+    def _rows(self, pincodes):
+        keys = np.array([int(p) for p in pincodes], dtype=np.int64)
+        idx = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[idx] == keys, idx, -1) if len(self.keys) else np.full(len(keys), -1)
+
+    def record(self, row):
+        out = {'pincode': str(self.keys[row])}
+        for col, codes in self.codes.items():
+            out[col] = self.labels[col][codes[row]]
+        for col, values in self.values.items():
+            out[col] = _number(values[row])
+        return out
+
+    def pincode(self, pincode):
+        """
+        Record of one pincode; raises QueryError(404) when it is unknown.
+        """
+        try:
+            row = self._rows([pincode])[0]
+        except (TypeError, ValueError, OverflowError):
+            raise QueryError(400, f"invalid pincode {pincode!r}")
+        if row < 0:
+            raise QueryError(404, f"unknown pincode {pincode}")
+        return self.record(row)
+
+    def pincodes(self, pincodes):
+        """
+        Batch lookup: {pincode: record or None} for up to MAX_BATCH_PINCODES pincodes.
+        """
+        if not isinstance(pincodes, list) or len(pincodes) > MAX_BATCH_PINCODES:
+            raise QueryError(400, f"'pincodes' must be a list of at most {MAX_BATCH_PINCODES} pincodes")
+        try:
+            rows = self._rows(pincodes)
+        except (TypeError, ValueError, OverflowError):
+            raise QueryError(400, "pincodes must be integers or digit strings")
+        return {str(p): (self.record(r) if r >= 0 else None) for p, r in zip(pincodes, rows)}
+
+    def _code(self, col, label):
+        if col not in self._label_codes:
+            raise QueryError(404, f"no {col} column in the served outputs")
+        if label not in self._label_codes[col]:
+            raise QueryError(404, f"unknown {col} {label!r}")
+        return self._label_codes[col][label]
+
+    def district_rows(self, district):
+        code = self._code('district', district)
+        return self._district_rows[self._district_starts[code]:self._district_starts[code + 1]]
+
+    def district(self, district):
+        """
+        District summary: pincode count, value totals and means, and pincodes per risk band
+        and strategy.
+        """
+        rows = self.district_rows(district)
+        out = {'district': district, 'pincodes': int(len(rows))}
+        if 'state' in self.codes and len(rows):
+            out['state'] = self.labels['state'][self.codes['state'][rows[0]]]
+        for col, values in self.values.items():
+            out[f'mean_{col}'] = _number(np.nanmean(values[rows])) if len(rows) else None
+        for col in SUMMED_COLUMNS:
+            if col in self.values:
+                out[f'sum_{col}'] = _number(np.nansum(self.values[col][rows]))
+        for col in ('risk_category', 'strategy'):
+            if col in self.codes:
+                counts = np.bincount(self.codes[col][rows], minlength=len(self.labels[col]))
+                out[col] = {label: int(n) for label, n in zip(self.labels[col], counts) if n}
+        return out
+
+    def top(self, by='total_update_load', k=DEFAULT_TOP_K, state=None, district=None, ascending=False):
+        """
+        The k pincodes with the highest (or lowest) value of a column, optionally within a
+        state and/or district. Uses argpartition, so cost is linear in the candidate rows.
+        """
+        if by not in self.values:
+            raise QueryError(400, f"'by' must be one of {sorted(self.values)}")
+        if not 1 <= k <= MAX_TOP_K:
+            raise QueryError(400, f"'k' must be between 1 and {MAX_TOP_K}")
+        rows = self.district_rows(district) if district else np.arange(len(self.keys))
+        if state:
+            rows = rows[self.codes['state'][rows] == self._code('state', state)] if 'state' in self.codes else rows
+        values = self.values[by][rows]
+        keep = ~np.isnan(values)
+        rows, values = rows[keep], values[keep]
+        sign = 1 if ascending else -1
+        if len(rows) > k:
+            part = np.argpartition(sign * values, k - 1)[:k]
+            rows, values = rows[part], values[part]
+        ranked = rows[np.argsort(sign * values, kind='stable')]
+        return [self.record(r) for r in ranked]
+
+    def forecast_for(self, entity, horizon=None):
+        """
+        Forecast rows (month, forecast and interval columns) of a district (or pincode) for
+        the first horizon months.
+        """
+        if self.forecast_entity is None:
+            raise QueryError(404, "no forecast has been generated")
+        if entity not in self._forecast_codes:
+            raise QueryError(404, f"no forecast for {self.forecast_entity} {entity!r}")
+        code = self._forecast_codes[entity]
+        grids = self.forecast
+        n_steps = next(iter(grids.values())).shape[1]
+        horizon = n_steps if horizon is None else horizon
+        if horizon < 1:
+            raise QueryError(400, "'horizon' must be at least 1")
+        months = pd.period_range(self.forecast_start[code], periods=min(horizon, n_steps), freq='M')
+        rows = []
+        for step, month in enumerate(months):
+            row = {'month': str(month), **{col: _number(grid[code, step]) for col, grid in grids.items()}}
+            if row.get('forecast') is not None or row.get('blended_forecast') is not None:
+                rows.append(row)
+        return {self.forecast_entity: entity, 'horizon': len(rows), 'forecast': rows}
+
+def load_index(metrics_path=None, forecast_path=None):
+    """
+    Builds a QueryIndex from the pipeline outputs (default locations when paths are None).
+    """
+    metrics_path = metrics_path or _resolve(METRICS_SOURCES)
+    forecast_path = forecast_path or _resolve(FORECAST_SOURCES)
+    if metrics_path is None:
+        raise FileNotFoundError("No pincode metrics found. Run 'scripts/generate_data.py' first.")
+    version = sources_version(metrics_path, forecast_path)
+    return QueryIndex(_read(metrics_path), _read(forecast_path), version)
+
+class QueryService:
+    """
+    Read-only HTTP query API over the pipeline outputs for downstream systems (SMS
+    campaigns, field planning). GET endpoints under /setu/api/v1/query/:
+
+        pincode/<pincode>                      one pincode's IHS, rates, risk band, strategy
+        district/<district>                    district summary
+        top?by=<column>&k=&state=&district=&order=asc|desc
+        forecast/<district>?horizon=<months>
+        status
+    and POST pincode/batch with {"pincodes": [...]}.
+
+    Encoded responses are kept in an LRU cache keyed on the request, and every response
+    carries an ETag built from the data version and the body, so clients revalidating with
+    If-None-Match get 304 without a body. Source files are re-checked every
+    reload_interval seconds; a new version rebuilds the index in a worker thread (requests
+    keep being served from the old one meanwhile) and drops the cache.
+    """
+
+    def __init__(self, metrics_path=None, forecast_path=None, cache_entries=DEFAULT_CACHE_ENTRIES,
+                 reload_interval=DEFAULT_RELOAD_INTERVAL_S):
+        self.metrics_path = metrics_path
+        self.forecast_path = forecast_path
+        self.cache_entries = cache_entries
+        self.reload_interval = reload_interval
+        self.index = None
+        self.cache = OrderedDict()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'not_modified': 0, 'errors': 0, 'reloads': 0}
+        self.server = None
+        self._checked = 0.0
+        self._reloading = None
+        self._writers = set()
+
+    def _paths(self):
+        return (self.metrics_path or _resolve(METRICS_SOURCES), self.forecast_path or _resolve(FORECAST_SOURCES))
+
+    def load(self):
+        self.index = load_index(*self._paths())
+        self.cache.clear()
+        self._checked = time.monotonic()
+
+    def _maybe_reload(self):
+        # Starts a background rebuild when the sources changed; the triggering request (and
+        # all others until the rebuild finishes) is answered from the current index
+        now = time.monotonic()
+        if self._reloading is not None or now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        try:
+            version = sources_version(*self._paths())
+        except OSError:
+            return
+        if version != self.index.version:
+            self._reloading = asyncio.get_running_loop().create_task(self._reload())
+
+    async def _reload(self):
+        loop = asyncio.get_running_loop()
+        try:
+            index = await loop.run_in_executor(None, load_index, *self._paths())
+            self.index = index
+            self.cache.clear()
+            self.stats['reloads'] += 1
+        except (OSError, ValueError, KeyError) as e:
+            # Outputs mid-rewrite; keep serving the current index and retry on the next check
+            print(f"Query index reload failed: {e}")
+        finally:
+            self._reloading = None
+
+    def _route(self, method, path, query, body):
+        index = self.index
+        name = path[len(API_PREFIX):].strip('/') if path.startswith(API_PREFIX) else None
+        if name is None:
+            raise QueryError(404, f"unknown endpoint {path}")
+        head, _, arg = name.partition('/')
+        arg = unquote(arg)
+
+        if name == 'pincode/batch':
+            if method != 'POST':
+                raise QueryError(405, "use POST")
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise QueryError(400, "body must be JSON")
+            return {'pincodes': index.pincodes(payload.get('pincodes') if isinstance(payload, dict) else payload)}
+        if method != 'GET':
+            raise QueryError(405, "use GET")
+
+        params = {k: v[-1] for k, v in parse_qs(query).items()}
+        if head == 'pincode' and arg:
+            return index.pincode(arg)
+        if head == 'district' and arg:
+            return index.district(arg)
+        if name == 'top':
+            try:
+                k = int(params.get('k', DEFAULT_TOP_K))
+            except ValueError:
+                raise QueryError(400, "'k' must be an integer")
+            rows = index.top(params.get('by', 'total_update_load'), k, params.get('state'), params.get('district'),
+                             params.get('order', 'desc') == 'asc')
+            return {'by': params.get('by', 'total_update_load'), 'k': k, 'pincodes': rows}
+        if head == 'forecast' and arg:
+            try:
+                horizon = int(params['horizon']) if 'horizon' in params else None
+            except ValueError:
+                raise QueryError(400, "'horizon' must be an integer")
+            return index.forecast_for(arg, horizon)
+        if name == 'status':
+            return {'version': index.version, 'pincodes': int(len(index.keys)), 'index_bytes': index.nbytes,
+                    'cache_entries': len(self.cache), **self.stats}
+        raise QueryError(404, f"unknown endpoint {path}")
+
+    async def handle_request(self, method, target, body=b'', if_none_match=None):
+        """
+        Answers one request. Returns (status, encoded body, headers).
+        """
+        self.stats['requests'] += 1
+        if self.index is None:
+            return 503, b'{"error": "index not loaded"}', {'Retry-After': '1'}
+        self._maybe_reload()
+        index = self.index
+
+        parts = urlsplit(target)
+        # Batch bodies rarely repeat, so only GETs are kept (they would evict the hot entries)
+        key = target
+        cacheable = method == 'GET' and not parts.path.rstrip('/').endswith('/status')
+        cached = self.cache.get(key) if cacheable else None
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            status, payload, etag = cached
+        else:
+            try:
+                status, payload = 200, json.dumps(self._route(method, parts.path, parts.query, body)).encode()
+            except QueryError as e:
+                self.stats['errors'] += 1
+                status, payload = e.status, json.dumps({'error': str(e)}).encode()
+            etag = f'"{index.version}-{hashlib.blake2b(payload, digest_size=8).hexdigest()}"'
+            if cacheable and status in (200, 404):
+                self.cache[key] = (status, payload, etag)
+                if len(self.cache) > self.cache_entries:
+                    self.cache.popitem(last=False)
+
+        headers = {'ETag': etag, 'X-Data-Version': index.version, 'Cache-Control': 'no-cache'}
+        if status == 200 and if_none_match is not None and etag in [t.strip() for t in if_none_match.split(',')]:
+            self.stats['not_modified'] += 1
+            return 304, b'', headers
+        return status, payload, headers
+
+    async def start(self, host='127.0.0.1', port=8041):
+        if self.index is None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.load)
+        self.server = await http_service.start_server(self._handle_http, host, port, MAX_BODY_BYTES, self._writers)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self.server is not None:
+            await http_service.close_server(self.server, self._writers)
+        if self._reloading is not None:
+            await self._reloading
+
+    async def _handle_http(self, method, target, body, headers):
+        return await self.handle_request(method, target, body, headers.get('if-none-match'))
+
+async def serve(host='127.0.0.1', port=8041, **params):
+    """
+    Runs the query service until cancelled (Ctrl+C).
+    """
+    service = QueryService(**params)
+    host, port = await service.start(host, port)
+    print(f"Query service listening on http://{host}:{port}{API_PREFIX} "
+          f"({len(service.index.keys):,} pincodes, data version {service.index.version})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+        print(f"Query service stopped: {service.stats}")
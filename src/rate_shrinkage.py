@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import traced
+
+# Empirical-Bayes estimators: Poisson-gamma for rates (updates per enrolled child can
+# exceed 1), beta-binomial for proportions (numerator never above the denominator)
+SHRINKAGE_METHODS = ('poisson_gamma', 'beta_binomial')
+
+# Prior levels from finest to coarsest; each pincode uses the finest level whose group
+# has enough pincodes to estimate a prior, and the national prior otherwise
+DEFAULT_PRIOR_LEVELS = ('district', 'state')
+DEFAULT_MIN_GROUP_PINCODES = 5
+
+# Pincode prefix standing in for a level where the geography is missing
+# (3 digits: sorting district, 2 digits: postal circle, roughly a state)
+PREFIX_LEVELS = {'district': 3, 'state': 2}
+
+def group_codes(df, levels=DEFAULT_PRIOR_LEVELS):
+    """
+    Integer group codes (one array per prior level) for the rows of a pincode table: the
+    level's column where present, the pincode prefix of PREFIX_LEVELS for rows (or
+    tables) without it.
+    """
+    try:
+        pins = df['pincode'].astype(np.int64).to_numpy()
+    except (TypeError, ValueError):
+        # Malformed pincodes fall into one prefix group (0) instead of failing the refresh
+        pins = pd.to_numeric(df['pincode'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    codes = []
+    for level in levels:
+        # Integer division gives the prefix without string operations
+        _, prefix_codes = np.unique(pins // 10 ** (6 - PREFIX_LEVELS.get(level, 3)), return_inverse=True)
+        if level in df.columns:
+            level_codes, labels = pd.factorize(df[level].to_numpy())
+            codes.append(np.where(level_codes >= 0, level_codes, len(labels) + prefix_codes))
+        else:
+            codes.append(prefix_codes)
+    return codes
+
+def group_moments(numerator, denominator, codes, method='poisson_gamma'):
+    """
+    Method-of-moments prior for every group in one pass (a few bincounts): the pooled rate
+    m = sum(y) / sum(n), the variance of the true rates between pincodes
+    A = max(sum(n * (y/n - m)^2) / sum(n) - sampling variance at the mean denominator, 0),
+    and the number of pincodes with a positive denominator.
+    """
+    y = np.nan_to_num(np.asarray(numerator, dtype=float))
+    n = np.nan_to_num(np.asarray(denominator, dtype=float))
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+    has_n = n > 0
+
+    sum_n = np.bincount(codes, weights=n, minlength=n_groups)
+    sum_y = np.bincount(codes, weights=y, minlength=n_groups)
+    n_pincodes = np.bincount(codes, weights=has_n, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m = np.where(sum_n > 0, sum_y / sum_n, np.nan)
+        r = np.where(has_n, y / n, 0.0)
+        deviation = np.where(has_n, n * (r - m[codes]) ** 2, 0.0)
+        s2 = np.bincount(codes, weights=deviation, minlength=n_groups) / sum_n
+        mean_n = sum_n / n_pincodes
+        sampling = m / mean_n if method == 'poisson_gamma' else m * (1 - m) / mean_n
+    return m, np.maximum(s2 - sampling, 0.0), n_pincodes
+
+def _prior_strength(m, a, method):
+    # Pseudo-denominator of the prior (gamma rate beta = m / A; beta-binomial a + b = m(1-m)/A - 1);
+    # no between-pincode variance means full pooling (infinite strength)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == 'poisson_gamma':
+            strength = np.where(a > 0, m / a, np.inf)
+        else:
+            strength = np.where(a > 0, np.maximum(m * (1 - m) / a - 1, 0.0), np.inf)
+    return strength
+
+@traced()
+def shrinkage_prior(numerator, denominator, codes_by_level, method='poisson_gamma',
+                    min_pincodes=DEFAULT_MIN_GROUP_PINCODES):
+    """
+    Per-pincode prior (mean, strength) from the finest level in codes_by_level (finest
+    first) whose group has at least min_pincodes pincodes, falling back to the national prior.
+    """
+    if method not in SHRINKAGE_METHODS:
+        raise ValueError(f"Unknown shrinkage method {method!r}; expected one of {SHRINKAGE_METHODS}")
+    y = np.nan_to_num(np.asarray(numerator, dtype=float))
+    n = np.nan_to_num(np.asarray(denominator, dtype=float))
+    if method == 'beta_binomial' and np.any(y > n):
+        raise ValueError("beta_binomial shrinkage needs numerator <= denominator; use poisson_gamma for rates")
+
+    national = np.zeros(len(y), dtype=np.int64)
+    m, a, _ = group_moments(y, n, national, method)
+    mean = np.full(len(y), m[0] if len(m) else np.nan)
+    strength = np.full(len(y), _prior_strength(m, a, method)[0] if len(m) else np.inf)
+    # Coarsest level first, so finer levels overwrite it where their groups qualify
+    for codes in reversed(list(codes_by_level)):
+        m, a, n_pincodes = group_moments(y, n, codes, method)
+        ok = (n_pincodes >= min_pincodes) & np.isfinite(m)
+        use = ok[codes]
+        mean[use] = m[codes][use]
+        strength[use] = _prior_strength(m, a, method)[codes][use]
+    return mean, strength
+
+def shrink_rate(numerator, denominator, codes_by_level, method='poisson_gamma',
+                min_pincodes=DEFAULT_MIN_GROUP_PINCODES):
+    """
+    Empirical-Bayes (posterior mean) rate numerator / denominator for all pincodes at once:
+    (y + strength * prior) / (n + strength), i.e. the raw rate blended with the group prior
+    with credibility n / (n + strength). Pincodes with a handful of enrolled children move
+    most of the way to their district/state rate; large ones keep their own; pincodes
+    with no denominator get the prior.
+    """
+    y = np.nan_to_num(np.asarray(numerator, dtype=float))
+    n = np.nan_to_num(np.asarray(denominator, dtype=float))
+    prior, strength = shrinkage_prior(y, n, codes_by_level, method, min_pincodes)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        credibility = np.where(np.isinf(strength) | (n + strength <= 0), 0.0, n / (n + strength))
+        raw = np.where(n > 0, y / n, 0.0)
+    return np.where(np.isnan(prior), raw, credibility * raw + (1 - credibility) * np.nan_to_num(prior))
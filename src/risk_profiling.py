@@ -1,42 +1,162 @@
 import pandas as pd
 import numpy as np
+from src.instrumentation import traced
 
-def calculate_update_rates(df_risk):
+@traced()
+def calculate_update_load(df_risk):
+    """
+    Adds total biometric, demographic and combined update load per pincode,
+    plus total enrolment where the enrolment age bands are available.
+    """
+    df = df_risk.copy()
+
+    bio_cols = [c for c in ['bio_age_5_17', 'bio_age_18_above'] if c in df.columns]
+    demo_cols = [c for c in ['demo_age_5_17', 'demo_age_18_above'] if c in df.columns]
+    enrol_cols = [c for c in ['age_0_5', 'age_5_17', 'age_18_above'] if c in df.columns]
+
+    df['biometric_updates'] = df[bio_cols].sum(axis=1) if bio_cols else 0
+    df['demographic_updates'] = df[demo_cols].sum(axis=1) if demo_cols else 0
+    df['total_update_load'] = df['biometric_updates'] + df['demographic_updates']
+    if enrol_cols:
+        df['total_enrollment'] = df[enrol_cols].sum(axis=1)
+
+    return df
+
+@traced()
+def calculate_update_rates(df_risk, denominator='age_5_17'):
     """
     Calculates update rates based on biometric/demographic updates and population.
+
+    denominator='age_5_17' gives child MBU/demographic rates (notebook logic);
+    denominator='total_enrollment' divides total bio/demo updates by all enrolments
+    (dashboard/scripts/process_data.py logic).
     """
     df = df_risk.copy()
-    
+
+    if denominator == 'total_enrollment':
+        if 'total_enrollment' not in df.columns or 'biometric_updates' not in df.columns:
+            df = calculate_update_load(df)
+        if 'total_enrollment' in df.columns:
+            df['mbu_rate'] = (df['biometric_updates'] / df['total_enrollment']).replace([np.inf, -np.inf], 0).fillna(0)
+            df['demo_rate'] = (df['demographic_updates'] / df['total_enrollment']).replace([np.inf, -np.inf], 0).fillna(0)
+        return df
+
     # Calculate rates (Updates per 1000 enrolled children)
     if 'bio_age_5_17' in df.columns and 'age_5_17' in df.columns:
         df['mbu_rate'] = (df['bio_age_5_17'] / df['age_5_17']).replace([np.inf, -np.inf], 0).fillna(0)
-    
+
     if 'demo_age_5_17' in df.columns and 'age_5_17' in df.columns:
         df['demo_rate'] = (df['demo_age_5_17'] / df['age_5_17']).replace([np.inf, -np.inf], 0).fillna(0)
-        
+
+    return df
+
+# Numerator/denominator columns behind each rate, per calculate_update_rates denominator
+RATE_COLUMNS = {
+    'age_5_17': {'mbu_rate': ('bio_age_5_17', 'age_5_17'), 'demo_rate': ('demo_age_5_17', 'age_5_17')},
+    'total_enrollment': {'mbu_rate': ('biometric_updates', 'total_enrollment'),
+                         'demo_rate': ('demographic_updates', 'total_enrollment')},
+}
+
+@traced()
+def smooth_update_rates(df_risk, denominator='age_5_17', adjacency=None, strength=100.0):
+    """
+    Replaces mbu_rate/demo_rate with neighbourhood-smoothed rates (src/neighbourhood.py),
+    keeping the originals as mbu_rate_raw/demo_rate_raw, and adds neighbour_load: the
+    weighted update load of neighbouring pincodes that may spill over.
+    The adjacency is built from the pincode prefix hierarchy unless one is given
+    (rows in the order of df_risk).
+    """
+    from src import neighbourhood
+
+    df = df_risk.copy()
+    if adjacency is None:
+        adjacency = neighbourhood.prefix_adjacency(df['pincode'])
+
+    for rate, (num, den) in RATE_COLUMNS[denominator].items():
+        if rate in df.columns and num in df.columns and den in df.columns:
+            df[f'{rate}_raw'] = df[rate]
+            df[rate] = neighbourhood.smooth_rate(df[num], df[den], adjacency, strength=strength)
+
+    if 'total_update_load' in df.columns:
+        df['neighbour_load'] = neighbourhood.neighbourhood_sum(adjacency, df['total_update_load'])
+
     return df
 
-def categorize_risk(df_risk):
+@traced()
+def shrink_update_rates(df_risk, denominator='age_5_17', method='poisson_gamma', prior_levels=None,
+                        min_pincodes=None):
+    """
+    Replaces mbu_rate/demo_rate with empirical-Bayes rates (src/rate_shrinkage.py) shrunk
+    toward the district prior, or the state/national one for districts with too few
+    pincodes, keeping the originals as mbu_rate_raw/demo_rate_raw. Rows without
+    district/state columns are grouped by pincode prefix instead.
+    """
+    from src import rate_shrinkage
+
+    df = df_risk.copy()
+    if prior_levels is None:
+        prior_levels = rate_shrinkage.DEFAULT_PRIOR_LEVELS
+    if min_pincodes is None:
+        min_pincodes = rate_shrinkage.DEFAULT_MIN_GROUP_PINCODES
+    codes = rate_shrinkage.group_codes(df, prior_levels)
+
+    for rate, (num, den) in RATE_COLUMNS[denominator].items():
+        if rate in df.columns and num in df.columns and den in df.columns:
+            df[f'{rate}_raw'] = df[rate]
+            df[rate] = rate_shrinkage.shrink_rate(df[num], df[den], codes, method=method, min_pincodes=min_pincodes)
+
+    return df
+
+@traced()
+def add_surge_flags(df_risk, df_surges):
+    """
+    Adds the per-pincode surge columns from surge_detection.surge_summary (surge_flag,
+    surge_days, surge_score, last_surge_date); pincodes without daily data are not flagged.
+    """
+    df = df_risk.drop(columns=[c for c in df_surges.columns if c != 'pincode' and c in df_risk.columns])
+    if df_surges.empty:
+        return df.assign(surge_flag=False, surge_days=0, surge_score=np.nan, last_surge_date=None)
+
+    surges = df_surges.set_index(df_surges['pincode'].astype(str)).drop(columns='pincode')
+    surges = surges.reindex(df['pincode'].astype(str))
+    for col in surges.columns:
+        df[col] = surges[col].to_numpy()
+    df['surge_flag'] = df['surge_flag'].eq(True).to_numpy()
+    df['surge_days'] = df['surge_days'].fillna(0).astype(int)
+    return df
+
+@traced()
+def categorize_risk(df_risk, quantiles=(0.25, 0.75)):
     """
     Categorizes pincodes into High, Medium, and Low load/risk based on MBU rates.
-    Uses quantile-based thresholds: Top 25% High, Bottom 25% Low.
+    Uses quantile-based thresholds: by default Top 25% High, Bottom 25% Low.
     """
     df = df_risk.copy()
-    
+
     if 'mbu_rate' not in df.columns:
         return df
-        
-    q75 = df['mbu_rate'].quantile(0.75)
-    q25 = df['mbu_rate'].quantile(0.25)
-    
-    def get_risk_label(rate):
-        if rate >= q75:
-            return 'High Load'
-        elif rate >= q25:
-            return 'Medium Load'
-        else:
-            return 'Low Load'
-            
-    df['risk_category'] = df['mbu_rate'].apply(get_risk_label)
-    
+
+    low_q, high_q = quantiles
+    q75 = df['mbu_rate'].quantile(high_q)
+    q25 = df['mbu_rate'].quantile(low_q)
+
+    rate = df['mbu_rate'].to_numpy()
+    df['risk_category'] = np.select([rate >= q75, rate >= q25], ['High Load', 'Medium Load'], default='Low Load')
+
+    return df
+
+@traced()
+def flag_high_load(df_risk, quantile=0.95):
+    """
+    Flags pincodes whose total update load is at or above the given quantile as 'High Risk'
+    and all others as 'Normal' (dashboard/scripts/process_data.py logic).
+    """
+    df = df_risk.copy()
+
+    if 'total_update_load' not in df.columns:
+        df = calculate_update_load(df)
+
+    threshold = df['total_update_load'].quantile(quantile)
+    df['risk_category'] = np.where(df['total_update_load'] >= threshold, 'High Risk', 'Normal')
+
     return df
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Monthly measures produced by data_processing.aggregate_monthly_measures
+MEASURES = ('mbu_demand', 'bio_updates', 'demo_updates', 'demo_age_5_17', 'enrolments', 'enrol_age_0_5',
+            'enrol_age_5_17')
+
+# Geography levels that pincode series roll up to
+ROLLUP_LEVELS = ('district', 'state')
+
+class SeriesStore:
+    """
+    Canonical monthly time-series store: one sparse pincode x month matrix per measure,
+    with integer-coded pincode and period axes and the district/state of every pincode.
+
+    District and state series are roll-ups computed as membership-matrix products
+    (groups x pincodes @ pincodes x months), so reading any series is a row slice.
+    Pincode keys are strings; periods are month-start timestamps.
+    """
+
+    def __init__(self, pincodes, periods, matrices, geography=None):
+        self.pincodes = np.asarray(pincodes).astype(str)
+        self.periods = pd.DatetimeIndex(periods)
+        self.matrices = {m: sparse.csr_matrix(x, dtype=float) for m, x in matrices.items()}
+        self.geography = {level: np.asarray(labels).astype(str) for level, labels in (geography or {}).items()}
+        self._pincode_index = {p: i for i, p in enumerate(self.pincodes)}
+        self._memberships = {}
+        self._rollups = {}
+
+    @property
+    def measures(self):
+        return list(self.matrices)
+
+    @property
+    def nbytes(self):
+        total = self.pincodes.nbytes + sum(labels.nbytes for labels in self.geography.values())
+        for x in self.matrices.values():
+            total += x.data.nbytes + x.indices.nbytes + x.indptr.nbytes
+        return total
+
+    @classmethod
+    def from_long(cls, df, measures=None, df_geo=None, series_col='pincode', period_col='month'):
+        """
+        Builds the store from a long month/pincode table (e.g. biometric_mbu_aggregated).
+        Geography comes from df_geo (pincode, state, district) or from the table's own
+        state/district columns; pincodes without one are labelled 'Unknown'.
+        """
+        measures = [m for m in (measures or MEASURES) if m in df.columns]
+        if df.empty:
+            return cls([], pd.DatetimeIndex([]), {m: sparse.csr_matrix((0, 0)) for m in measures})
+
+        pincodes, rows = np.unique(df[series_col].astype(str).to_numpy(), return_inverse=True)
+        dates = df[period_col]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates.astype(str))
+        # Integer month codes (months since year 0) give the period axis directly
+        month_no = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+        first = int(month_no.min())
+        cols = month_no - first
+        periods = pd.date_range(pd.Timestamp(year=first // 12, month=first % 12 + 1, day=1),
+                                periods=int(month_no.max()) - first + 1, freq='MS')
+
+        shape = (len(pincodes), len(periods))
+        matrices = {}
+        for m in measures:
+            values = df[m].fillna(0).to_numpy(dtype=float)
+            # Duplicate (pincode, month) entries are summed by the COO -> CSR conversion
+            matrices[m] = sparse.coo_matrix((values, (rows, cols)), shape=shape).tocsr()
+
+        if df_geo is None:
+            df_geo = df
+        geography = {}
+        if not df_geo.empty and series_col in df_geo.columns:
+            lookup = df_geo.assign(key=df_geo[series_col].astype(str)).drop_duplicates('key').set_index('key')
+            for level in ROLLUP_LEVELS:
+                if level in lookup.columns:
+                    labels = lookup[level].reindex(pincodes).astype(object).fillna('Unknown')
+                    geography[level] = labels.to_numpy()
+
+        return cls(pincodes, periods, matrices, geography)
+
+    def membership(self, level):
+        """
+        Returns (group labels, sparse groups x pincodes 0/1 membership matrix) for a level.
+        """
+        if level not in self._memberships:
+            if level not in self.geography:
+                raise KeyError(f"No '{level}' labels in this store")
+            labels, codes = np.unique(self.geography[level], return_inverse=True)
+            n = len(self.pincodes)
+            member = sparse.csr_matrix((np.ones(n), (codes, np.arange(n))), shape=(len(labels), n))
+            self._memberships[level] = (labels, member)
+        return self._memberships[level]
+
+    def matrix(self, measure, level='pincode'):
+        """
+        Returns (row labels, sparse rows x periods matrix) for pincodes or a roll-up level.
+        Roll-ups are computed once and cached.
+        """
+        if level == 'pincode':
+            return self.pincodes, self.matrices[measure]
+        if (measure, level) not in self._rollups:
+            labels, member = self.membership(level)
+            self._rollups[(measure, level)] = (labels, (member @ self.matrices[measure]).tocsr())
+        return self._rollups[(measure, level)]
+
+    def labels(self, level='pincode'):
+        if level == 'pincode':
+            return self.pincodes
+        return self.membership(level)[0]
+
+    def pincodes_in(self, level, value):
+        """
+        Returns the pincodes whose district/state equals value.
+        """
+        return self.pincodes[self.geography[level] == str(value)]
+
+    def row(self, measure, key, level='pincode'):
+        """
+        Returns the dense values of one series as a numpy array over self.periods
+        (zeros when the key is unknown).
+        """
+        labels, x = self.matrix(measure, level)
+        if level == 'pincode':
+            i = self._pincode_index.get(str(key))
+        else:
+            i = np.searchsorted(labels, str(key))
+            i = i if i < len(labels) and labels[i] == str(key) else None
+        if i is None:
+            return np.zeros(len(self.periods))
+        values = np.zeros(len(self.periods))
+        start, end = x.indptr[i], x.indptr[i + 1]
+        values[x.indices[start:end]] = x.data[start:end]
+        return values
+
+    def series(self, measure, key, level='pincode', trim=True):
+        """
+        Returns one series as a pd.Series indexed by month. trim=True drops the months
+        before the first and after the last non-zero value, so a series covers only the
+        span in which it has activity.
+        """
+        values = self.row(measure, key, level)
+        series = pd.Series(values, index=self.periods, name=measure)
+        if trim:
+            nonzero = np.flatnonzero(values)
+            if len(nonzero) == 0:
+                return series.iloc[:0]
+            series = series.iloc[nonzero[0]:nonzero[-1] + 1]
+        return series
+
+    def subset(self, level, value):
+        """
+        Returns a store restricted to the pincodes of one district/state ('All' returns self).
+        """
+        if value in (None, 'All'):
+            return self
+        keep = np.flatnonzero(self.geography[level] == str(value))
+        return SeriesStore(
+            self.pincodes[keep], self.periods,
+            {m: x[keep] for m, x in self.matrices.items()},
+            {lvl: labels[keep] for lvl, labels in self.geography.items()},
+        )
+
+    def save(self, path):
+        """
+        Writes the store to a single .npz file (CSR arrays per measure plus the axes).
+        """
+        arrays = {
+            'pincodes': self.pincodes,
+            'periods': self.periods.strftime('%Y-%m').to_numpy().astype(str),
+            'measures': np.array(self.measures, dtype=str),
+            'levels': np.array(list(self.geography), dtype=str),
+        }
+        for level, labels in self.geography.items():
+            arrays[f'geo_{level}'] = labels
+        for m, x in self.matrices.items():
+            arrays[f'{m}_data'] = x.data
+            arrays[f'{m}_indices'] = x.indices
+            arrays[f'{m}_indptr'] = x.indptr
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            pincodes = f['pincodes']
+            periods = pd.to_datetime(f['periods'], format='%Y-%m')
+            shape = (len(pincodes), len(periods))
+            matrices = {
+                m: sparse.csr_matrix((f[f'{m}_data'], f[f'{m}_indices'], f[f'{m}_indptr']), shape=shape)
+                for m in f['measures'].tolist()
+            }
+            geography = {level: f[f'geo_{level}'] for level in f['levels'].tolist()}
+        return cls(pincodes, periods, matrices, geography)
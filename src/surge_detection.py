@@ -0,0 +1,310 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+from src.instrumentation import traced, current_span
+
+DEFAULT_METHOD = 'ewma'
+# Days of history in the baseline (median window, or EWMA span)
+DEFAULT_WINDOW = 28
+# z-score above which a day is flagged as a surge, per method; calibrated on synthetic
+# extracts without surges (whose daily counts are overdispersed, several updates per row)
+# to flag well under 1% of pincodes per week
+DEFAULT_THRESHOLDS = {'ewma': 7.0, 'median': 8.0}
+# Days with fewer updates than this are never flagged (tiny counts are noise)
+DEFAULT_MIN_COUNT = 10
+
+# MAD -> standard deviation for normally distributed noise
+MAD_SCALE = 1.4826
+
+# Largest pincodes x days matrix scored in one pass (about 160 MB per float64 array; the
+# dense path holds several). Longer histories stream day by day through SurgeDetector
+MAX_DENSE_CELLS = 20_000_000
+
+def _daily_axes(df_daily, series_col='pincode', date_col='date'):
+    # (pincodes, days, row index, day index) of a long daily table, as in daily_matrix
+    pincodes, rows = np.unique(df_daily[series_col].astype(str).to_numpy(), return_inverse=True)
+    dates = pd.to_datetime(df_daily[date_col])
+    cols = ((dates - dates.min()) // pd.Timedelta(days=1)).to_numpy()
+    return pincodes, pd.date_range(dates.min(), dates.max(), freq='D'), rows, cols
+
+def daily_matrix(df_daily, value_col='updates', series_col='pincode', date_col='date'):
+    """
+    Pivots a long (date, pincode, value) table into (pincodes, dates, pincodes x days array)
+    over a continuous daily axis; days without rows are 0 (detect_surges treats days that
+    are 0 everywhere as gaps). Pincode keys are strings.
+    """
+    if df_daily.empty:
+        return np.array([], dtype=str), pd.DatetimeIndex([]), np.zeros((0, 0))
+    pincodes, days, rows, cols = _daily_axes(df_daily, series_col, date_col)
+    matrix = np.zeros((len(pincodes), len(days)))
+    np.add.at(matrix, (rows, cols), df_daily[value_col].to_numpy(dtype=float))
+    return pincodes, days, matrix
+
+def _poisson_floor(scale, level):
+    # Counts are roughly Poisson, so never trust a spread below sqrt(mean level) (and 1);
+    # this matters for intermittent series, whose median and MAD are often 0
+    return np.maximum(scale, np.sqrt(np.maximum(level, 1.0)))
+
+def _rolling_std(x, window, mean):
+    # Standard deviation of the previous window days, given their _rolling_mean
+    return np.sqrt(np.maximum(_rolling_mean(x ** 2, window) - mean ** 2, 0))
+
+def _rolling_mean(x, window):
+    # Mean of the previous window days for every column (from a running sum)
+    totals = np.zeros((x.shape[0], x.shape[1] + 1))
+    np.cumsum(x, axis=1, out=totals[:, 1:])
+    t = np.arange(x.shape[1])
+    return (totals[:, t] - totals[:, np.maximum(t - window, 0)]) / np.maximum(np.minimum(t, window), 1)
+
+def ewma_baseline(x, window=DEFAULT_WINDOW):
+    """
+    Exponentially weighted mean and standard deviation (span = window) of every row of x,
+    as of the previous day: column t only uses days before t. Computed with linear filters
+    along the day axis, so all series are processed at once.
+    """
+    alpha = 2.0 / (window + 1)
+    first = x[:, :1]
+    # mean_t = (1 - alpha) * mean_{t-1} + alpha * x_t, started at the first day
+    mean, _ = lfilter([alpha], [1, alpha - 1], x, axis=1, zi=(1 - alpha) * first)
+    prev_mean = np.concatenate([first, mean[:, :-1]], axis=1)
+    # var_t = (1 - alpha) * (var_{t-1} + alpha * (x_t - mean_{t-1})^2)
+    dev = (x - prev_mean) ** 2
+    var, _ = lfilter([alpha * (1 - alpha)], [1, alpha - 1], dev, axis=1, zi=np.zeros_like(first))
+    prev_var = np.concatenate([np.zeros_like(first), var[:, :-1]], axis=1)
+    return prev_mean, np.sqrt(prev_var)
+
+def _window_median(windows):
+    # np.median over the last axis via one partial sort (about 1.5x faster than np.median)
+    k = windows.shape[-1] // 2
+    if windows.shape[-1] % 2:
+        return np.partition(windows, k, axis=-1)[..., k]
+    part = np.partition(windows, [k - 1, k], axis=-1)
+    return (part[..., k - 1] + part[..., k]) / 2
+
+def median_baseline(x, window=DEFAULT_WINDOW, chunk_elements=20_000_000):
+    """
+    Rolling median and MAD-based standard deviation of every row of x over the previous
+    window days (NaN until window days of history exist). Rows are processed in blocks
+    to bound the temporary window array at chunk_elements values.
+    """
+    n, days = x.shape
+    median = np.full((n, days), np.nan)
+    scale = np.full((n, days), np.nan)
+    if days <= window:
+        return median, scale
+    block = max(1, chunk_elements // (days * window))
+    for start in range(0, n, block):
+        # windows[:, t] covers days t .. t + window - 1 and is the baseline for day t + window
+        windows = sliding_window_view(x[start:start + block].astype(np.float32), window, axis=1)[:, :-1]
+        med = _window_median(windows)
+        mad = _window_median(np.abs(windows - med[:, :, None]))
+        median[start:start + block, window:] = med
+        scale[start:start + block, window:] = MAD_SCALE * mad
+    return median, scale
+
+def _score(x, method, window, threshold, min_count):
+    # detect_surges over days that all have data
+    if method == 'median':
+        baseline, scale = median_baseline(x, window)
+        level = _rolling_mean(x, window)
+        # The MAD is 0 for intermittent series, and the Poisson floor alone is far too tight
+        # for bursty counts, so the spread is also floored at the window's standard deviation
+        scale = np.fmax(scale, _rolling_std(x, window, level))
+    elif method == 'ewma':
+        baseline, scale = ewma_baseline(x, window)
+        level = baseline
+    else:
+        raise ValueError(f"Unknown surge method: {method}")
+
+    z = (x - baseline) / _poisson_floor(scale, level)
+    z[:, :window] = np.nan
+    flags = (z > (DEFAULT_THRESHOLDS[method] if threshold is None else threshold)) & (x >= min_count)
+    return z, flags
+
+@traced()
+def detect_surges(x, method=DEFAULT_METHOD, window=DEFAULT_WINDOW, threshold=None,
+                  min_count=DEFAULT_MIN_COUNT):
+    """
+    Scores every series x day cell of x against its rolling baseline and flags surges.
+
+    Returns (z, flags): z = (x - baseline) / spread with the spread floored at the Poisson
+    noise of the recent mean, and flags = z > threshold (by default the method's
+    DEFAULT_THRESHOLDS entry) on days with at least min_count updates, after a warm-up of
+    window days. Days on which no series has any update are
+    gaps in the extract, not zero-update days: they get no score and are left out of the
+    baselines (window counts days with data). 'median' suits series with activity on most
+    days; for intermittent series its baseline is 0 and 'ewma' (the default) is steadier.
+    """
+    observed = x.any(axis=0) if x.size else np.ones(x.shape[1], dtype=bool)
+    if observed.all():
+        return _score(x, method, window, threshold, min_count)
+    z = np.full(x.shape, np.nan)
+    flags = np.zeros(x.shape, dtype=bool)
+    z[:, observed], flags[:, observed] = _score(x[:, observed], method, window, threshold, min_count)
+    return z, flags
+
+def surge_summary(pincodes, days, z, flags, recent_days=7):
+    """
+    Per-pincode surge columns for the risk output: surge_days (flagged days among the last
+    recent_days), surge_flag (any), surge_score (highest z in that period) and
+    last_surge_date (most recent flagged day in the whole history).
+    """
+    recent = slice(max(len(days) - recent_days, 0), len(days))
+    surge_days = flags[:, recent].sum(axis=1)
+    surge_score = np.full(len(pincodes), np.nan)
+    last_date = np.full(len(pincodes), None, dtype=object)
+    if flags.size:
+        recent_z = z[:, recent]
+        has_z = ~np.isnan(recent_z).all(axis=1)
+        surge_score[has_z] = np.nanmax(recent_z[has_z], axis=1)
+        flagged = flags.any(axis=1)
+        last_index = flags.shape[1] - 1 - np.argmax(flags[:, ::-1], axis=1)
+        last_date[flagged] = np.asarray(days.strftime('%Y-%m-%d'))[last_index[flagged]]
+
+    return pd.DataFrame({
+        'pincode': pincodes,
+        'surge_flag': surge_days > 0,
+        'surge_days': surge_days.astype(int),
+        'surge_score': surge_score,
+        'last_surge_date': last_date,
+    })
+
+class SurgeDetector:
+    """
+    Incremental surge detector for a fixed set of pincodes: keeps the rolling state
+    (EWMA mean/variance or the last window days for the median method) so each new day
+    costs one vectorized update over all pincodes instead of a recomputation.
+
+        detector = SurgeDetector.from_history(pincodes, days, matrix)
+        z, flags = detector.update(day_values, day)
+    """
+
+    def __init__(self, pincodes, method=DEFAULT_METHOD, window=DEFAULT_WINDOW, threshold=None,
+                 min_count=DEFAULT_MIN_COUNT):
+        if method not in ('ewma', 'median'):
+            raise ValueError(f"Unknown surge method: {method}")
+        self.pincodes = np.asarray(pincodes).astype(str)
+        self.method = method
+        self.window = window
+        self.threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+        self.min_count = min_count
+        self.alpha = 2.0 / (window + 1)
+        self.mean = None
+        self.var = np.zeros(len(self.pincodes))
+        self.buffer = np.zeros((len(self.pincodes), window))
+        self.days_seen = 0
+        self.last_day = None
+        self._index = {p: i for i, p in enumerate(self.pincodes)}
+
+    @classmethod
+    def from_history(cls, pincodes, days, matrix, **params):
+        detector = cls(pincodes, **params)
+        for t, day in enumerate(days):
+            detector.update(matrix[:, t], day)
+        return detector
+
+    def _baseline(self):
+        # (baseline, spread, mean level for the Poisson floor)
+        if self.method == 'ewma':
+            return self.mean, np.sqrt(self.var), self.mean
+        med = np.median(self.buffer, axis=1)
+        mad = np.median(np.abs(self.buffer - med[:, None]), axis=1)
+        return med, np.maximum(MAD_SCALE * mad, self.buffer.std(axis=1)), self.buffer.mean(axis=1)
+
+    def update(self, values, day=None):
+        """
+        Scores one new day (values aligned with self.pincodes) against the current baseline,
+        then folds it into the state. Returns (z, flags) for that day. A day with no updates
+        at any pincode is a gap in the data: it is not scored and leaves the state unchanged.
+        """
+        values = np.asarray(values, dtype=float)
+        self.last_day = day
+        if not values.any():
+            return np.full(len(values), np.nan), np.zeros(len(values), dtype=bool)
+        if self.mean is None:
+            self.mean = values.copy()
+
+        if self.days_seen >= self.window:
+            baseline, scale, level = self._baseline()
+            z = (values - baseline) / _poisson_floor(scale, level)
+        else:
+            z = np.full(len(values), np.nan)
+        flags = (z > self.threshold) & (values >= self.min_count)
+
+        # Same recurrences as ewma_baseline, one day at a time
+        deviation = values - self.mean
+        self.var = (1 - self.alpha) * (self.var + self.alpha * deviation ** 2)
+        self.mean = self.mean + self.alpha * deviation
+        self.buffer[:, self.days_seen % self.window] = values
+        self.days_seen += 1
+        return z, flags
+
+    def update_frame(self, df_day, value_col='updates', series_col='pincode'):
+        """
+        Scores one day given as rows of (pincode, value); pincodes outside the detector
+        are ignored and missing ones count as 0 (an empty day is a gap, see update). Returns a DataFrame of the flagged pincodes.
+        """
+        values = np.zeros(len(self.pincodes))
+        idx = df_day[series_col].astype(str).map(self._index)
+        known = idx.notna().to_numpy()
+        np.add.at(values, idx[known].astype(int).to_numpy(), df_day[value_col].to_numpy(dtype=float)[known])
+        day = pd.to_datetime(df_day['date']).max() if 'date' in df_day.columns and len(df_day) else None
+        z, flags = self.update(values, day)
+        return pd.DataFrame({'pincode': self.pincodes[flags], 'updates': values[flags], 'z': z[flags]})
+
+def stream_surges(df_daily, method=DEFAULT_METHOD, window=DEFAULT_WINDOW, threshold=None,
+                  min_count=DEFAULT_MIN_COUNT, recent_days=7, value_col='updates'):
+    """
+    surge_summary of a long (date, pincode, value) table without the dense pincodes x days
+    matrix: days are fed one at a time through a SurgeDetector, so memory is
+    O(pincodes x window) whatever the history length. Same scores as detect_surges.
+    """
+    pincodes, days, rows, cols = _daily_axes(df_daily)
+    values = df_daily[value_col].to_numpy(dtype=float)
+    order = np.argsort(cols, kind='stable')
+    bounds = np.searchsorted(cols[order], np.arange(len(days) + 1))
+
+    detector = SurgeDetector(pincodes, method=method, window=window, threshold=threshold, min_count=min_count)
+    first_recent = max(len(days) - recent_days, 0)
+    surge_days = np.zeros(len(pincodes), dtype=int)
+    surge_score = np.full(len(pincodes), np.nan)
+    last_index = np.full(len(pincodes), -1)
+    for t, day in enumerate(days):
+        day_rows = order[bounds[t]:bounds[t + 1]]
+        z, flags = detector.update(np.bincount(rows[day_rows], weights=values[day_rows], minlength=len(pincodes)),
+                                   day)
+        last_index[flags] = t
+        if t >= first_recent:
+            surge_days += flags
+            surge_score = np.fmax(surge_score, z)
+
+    last_date = np.full(len(pincodes), None, dtype=object)
+    flagged = last_index >= 0
+    last_date[flagged] = np.asarray(days.strftime('%Y-%m-%d'))[last_index[flagged]]
+    return pd.DataFrame({
+        'pincode': pincodes,
+        'surge_flag': surge_days > 0,
+        'surge_days': surge_days,
+        'surge_score': surge_score,
+        'last_surge_date': last_date,
+    })
+
+@traced()
+def scan_surges(df_daily, method=DEFAULT_METHOD, window=DEFAULT_WINDOW, threshold=None,
+                min_count=DEFAULT_MIN_COUNT, recent_days=7, max_dense_cells=MAX_DENSE_CELLS):
+    """
+    Per-pincode surge summary of a long daily table: one vectorized detect_surges pass over
+    the dense matrix while it has at most max_dense_cells cells, the day-by-day
+    stream_surges otherwise (multi-year national histories).
+    """
+    if not df_daily.empty:
+        dates = pd.to_datetime(df_daily['date'])
+        cells = df_daily['pincode'].astype(str).nunique() * ((dates.max() - dates.min()).days + 1)
+        if cells > max_dense_cells:
+            current_span().set(mode='stream', cells=cells)
+            return stream_surges(df_daily, method, window, threshold, min_count, recent_days)
+    pincodes, days, matrix = daily_matrix(df_daily)
+    z, flags = detect_surges(matrix, method=method, window=window, threshold=threshold, min_count=min_count)
+    return surge_summary(pincodes, days, z, flags, recent_days=recent_days)
@@ -0,0 +1,211 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src import data_processing
+
+# Approximate share of pincodes per 2-digit prefix (postal circle), used when no
+# raw extracts are available to derive the distribution from.
+PIN2_WEIGHTS = {
+    11: 1.0, 12: 1.2, 13: 1.3, 14: 1.3, 15: 1.0, 16: 0.6, 17: 1.0, 18: 0.8, 19: 0.6,
+    **{p: 2.0 for p in range(20, 29)},
+    **{p: 2.0 for p in range(30, 35)},
+    **{p: 1.8 for p in range(36, 40)},
+    **{p: 2.2 for p in range(40, 45)},
+    **{p: 1.8 for p in range(45, 49)},
+    49: 1.5,
+    **{p: 2.0 for p in range(50, 54)},
+    **{p: 1.8 for p in range(56, 60)},
+    **{p: 2.0 for p in range(60, 65)},
+    **{p: 1.6 for p in range(67, 70)},
+    **{p: 1.8 for p in range(70, 75)},
+    **{p: 1.6 for p in range(75, 78)},
+    78: 1.5, 79: 0.8,
+    **{p: 1.9 for p in range(80, 86)},
+}
+
+# Month-of-year factor for child updates/enrolments (school admissions, as in
+# data/simulated_signals/school_enrolment_cycles.csv)
+SCHOOL_CYCLE = np.array([1.0, 1.0, 1.2, 1.5, 1.5, 1.2, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+
+# Raw extract layout: directory, file prefix, count columns and mean counts per row
+CATEGORIES = {
+    'biometric': {
+        'dir': 'biometric',
+        'prefix': 'api_data_aadhar_biometric',
+        'columns': {'bio_age_5_17': 9.0, 'bio_age_17_': 12.0},
+    },
+    'demographic': {
+        'dir': 'demographic',
+        'prefix': 'api_data_aadhar_demographic',
+        'columns': {'demo_age_5_17': 2.0, 'demo_age_17_': 14.0},
+    },
+    'enrollment': {
+        'dir': 'enrollment',
+        'prefix': 'api_data_aadhar_enrolment',
+        'columns': {'age_0_5': 3.5, 'age_5_17': 1.8, 'age_18_greater': 0.3},
+    },
+}
+
+# Pincode draws: suffixes 001-999 per 3-digit prefix, and rounds of weighted draws before
+# the remainder is filled uniformly from the free codes
+MAX_PINCODES_PER_PREFIX = 999
+MAX_DRAW_ROUNDS = 50
+
+# Columns whose volume follows the school admission cycle
+SCHOOL_CYCLE_COLUMNS = {'bio_age_5_17', 'demo_age_5_17', 'age_0_5', 'age_5_17'}
+
+def prefix_weights_from_raw(raw_path):
+    """
+    Returns {3-digit prefix: share of pincodes} observed in existing raw extracts,
+    or None if there are none.
+    """
+    files = glob.glob(os.path.join(raw_path, '*', '*.csv'))
+    if not files:
+        return None
+    pincodes = pd.concat([pd.read_csv(f, usecols=['pincode'])['pincode'] for f in files]).drop_duplicates()
+    prefixes = (pincodes // 1000).astype(int)
+    counts = prefixes.value_counts(normalize=True)
+    return counts.to_dict()
+
+def make_pincodes(n_pincodes, seed=42, prefix_weights=None):
+    """
+    Draws a universe of unique 6-digit pincodes with state/district labels and a
+    relative activity weight per pincode.
+
+    prefix_weights maps 3-digit prefixes to their share (see prefix_weights_from_raw);
+    by default PIN2_WEIGHTS is used with a uniform third digit.
+    """
+    rng = np.random.default_rng(seed)
+
+    if prefix_weights:
+        prefixes = np.array(list(prefix_weights.keys()), dtype=np.int64)
+        probs = np.array(list(prefix_weights.values()), dtype=float)
+    else:
+        pin2 = np.array(list(PIN2_WEIGHTS.keys()), dtype=np.int64)
+        prefixes = (pin2[:, None] * 10 + np.arange(10)).ravel()
+        probs = np.repeat(np.array(list(PIN2_WEIGHTS.values()), dtype=float), 10)
+    probs = probs / probs.sum()
+    # Each prefix holds at most 999 pincodes (suffixes 001-999)
+    capacity = int(np.count_nonzero(probs > 0)) * MAX_PINCODES_PER_PREFIX
+    if n_pincodes > capacity:
+        raise ValueError(f"Cannot draw {n_pincodes:,} unique pincodes from {capacity // MAX_PINCODES_PER_PREFIX} "
+                         f"prefixes (at most {capacity:,})")
+
+    pincodes = np.empty(0, dtype=np.int64)
+    for _ in range(MAX_DRAW_ROUNDS):
+        if len(pincodes) >= n_pincodes:
+            break
+        draw = 2 * (n_pincodes - len(pincodes)) + 16
+        pin3 = rng.choice(prefixes, size=draw, p=probs)
+        # Delivery office suffixes are small numbers, most below ~300
+        suffix = np.minimum(rng.geometric(1 / 120, size=draw), 999)
+        pincodes = np.unique(np.concatenate([pincodes, pin3 * 1000 + suffix]))
+    if len(pincodes) < n_pincodes:
+        # Near capacity the geometric suffixes rarely hit the free codes: take the rest
+        # uniformly from the unused codes of the weighted prefixes
+        free = np.setdiff1d((prefixes[probs > 0][:, None] * 1000 + np.arange(1, 1000)).ravel(), pincodes)
+        pincodes = np.concatenate([pincodes, rng.choice(free, size=n_pincodes - len(pincodes), replace=False)])
+    pincodes = rng.permutation(pincodes)[:n_pincodes]
+
+    df = pd.DataFrame({'pincode': np.sort(pincodes)})
+    df = data_processing.add_geography_from_pincode(df)
+    # Heavy-tailed activity: a few urban pincodes carry most of the volume
+    df['weight'] = rng.lognormal(mean=0.0, sigma=1.0, size=len(df))
+    return df
+
+def make_calendar(start='2024-01-01', months=12):
+    """
+    Returns (day strings in raw dd-mm-yyyy format, month-of-year index, day weights).
+    Day weights apply a mild seasonal swing and drop weekend volume.
+    """
+    end = pd.Timestamp(start) + pd.DateOffset(months=months) - pd.Timedelta(days=1)
+    days = pd.date_range(start=start, end=end, freq='D')
+    month_idx = days.month.to_numpy() - 1
+    season = 1.0 + 0.15 * np.sin(2 * np.pi * (days.dayofyear.to_numpy() - 60) / 365.25)
+    weekday = np.where(days.dayofweek.to_numpy() >= 5, 0.4, 1.0)
+    weights = season * weekday
+    return days.strftime('%d-%m-%Y').to_numpy(), month_idx, weights / weights.sum()
+
+def generate_shard(category, n_rows, universe, calendar, seed):
+    """
+    Generates one raw-format shard of n_rows rows for a category, fully vectorized.
+    Rows are (date, pincode) observations sorted by date, as in the UIDAI extracts.
+    """
+    spec = CATEGORIES[category]
+    day_str, month_idx, day_weights = calendar
+    rng = np.random.default_rng(seed)
+
+    pin_probs = universe['weight'].to_numpy() / universe['weight'].sum()
+    pin_idx = rng.choice(len(universe), size=n_rows, p=pin_probs)
+    day_idx = np.sort(rng.choice(len(day_str), size=n_rows, p=day_weights))
+
+    data = {
+        'date': day_str[day_idx],
+        'state': universe['state'].to_numpy()[pin_idx],
+        'district': universe['district'].to_numpy()[pin_idx],
+        'pincode': universe['pincode'].to_numpy()[pin_idx],
+    }
+    activity = np.sqrt(universe['weight'].to_numpy()[pin_idx])
+    school = SCHOOL_CYCLE[month_idx[day_idx]]
+    for col, mean in spec['columns'].items():
+        lam = mean * activity * (school if col in SCHOOL_CYCLE_COLUMNS else 1.0)
+        data[col] = rng.poisson(lam).astype(np.int32)
+
+    return pd.DataFrame(data)
+
+def _write_shard(task):
+    category, start_row, n_rows, universe, calendar, seed, output_dir = task
+    spec = CATEGORIES[category]
+    df = generate_shard(category, n_rows, universe, calendar, seed)
+    path = os.path.join(output_dir, spec['dir'], f"{spec['prefix']}_{start_row}_{start_row + n_rows - 1}.csv")
+    df.to_csv(path, index=False)
+    return path
+
+def generate_synthetic_raw(output_dir, rows_per_category, n_pincodes=19000, start='2024-01-01', months=12,
+                           shard_rows=1_000_000, workers=None, seed=42, categories=None, prefix_weights=None):
+    """
+    Writes seeded synthetic api_data_aadhar_* shards for each category under output_dir,
+    using a pool of worker processes (one shard per task). Returns the written paths.
+
+    rows_per_category may be an int or a {category: rows} dict, so category volumes can
+    mirror production (e.g. far fewer enrolment rows than update rows).
+    """
+    categories = categories or list(CATEGORIES)
+    if not isinstance(rows_per_category, dict):
+        rows_per_category = {c: rows_per_category for c in categories}
+
+    universe = make_pincodes(n_pincodes, seed=seed, prefix_weights=prefix_weights)
+    universe = universe[['pincode', 'state', 'district', 'weight']]
+    calendar = make_calendar(start, months)
+
+    tasks = []
+    seeds = np.random.SeedSequence(seed).spawn(len(categories))
+    for category, cat_seed in zip(categories, seeds):
+        os.makedirs(os.path.join(output_dir, CATEGORIES[category]['dir']), exist_ok=True)
+        total = rows_per_category.get(category, 0)
+        n_shards = -(-total // shard_rows)
+        for shard, shard_seed in enumerate(cat_seed.spawn(n_shards)):
+            start_row = shard * shard_rows
+            n_rows = min(shard_rows, total - start_row)
+            tasks.append((category, start_row, n_rows, universe, calendar, shard_seed, output_dir))
+
+    if workers == 1:
+        return [_write_shard(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_write_shard, tasks))
+
+def generate_synthetic_frames(rows_per_category=20_000, n_pincodes=50, start='2024-01-01', months=12, seed=42):
+    """
+    In-memory variant for small demo datasets: returns (df_bio, df_demo, df_enrol)
+    normalized to the canonical column names, without touching disk.
+    """
+    universe = make_pincodes(n_pincodes, seed=seed)
+    calendar = make_calendar(start, months)
+    seeds = np.random.SeedSequence(seed).spawn(3)
+    frames = [generate_shard(category, rows_per_category, universe, calendar, s)
+              for category, s in zip(['biometric', 'demographic', 'enrollment'], seeds)]
+    return tuple(data_processing.normalize_columns(df) for df in frames)
@@ -0,0 +1,231 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Event tokens are 64-bit keyed digests written as 16 hex characters. 64 bits keep the
+# chance of a random token colliding with a stored one below 1e-10 even at 1e9 tokens.
+TOKEN_BYTES = 8
+TOKEN_HEX = 2 * TOKEN_BYTES
+
+# Target false-positive rate of the Bloom filter in front of the sorted digest array
+DEFAULT_FP_RATE = 0.01
+
+# Risk categories (categorize_risk / flag_high_load) whose pincodes get event tokens
+HIGH_RISK_CATEGORIES = ('High Load', 'High Risk')
+
+def event_token(pincode, year, month, key):
+    """
+    Non-reversible event token for a (pincode, birth year, birth month) combination, as in
+    Stage 2 of the interoperability workflow: a keyed BLAKE2b digest, so tokens cannot be
+    enumerated from the small pincode x month space without the current rotation key.
+    """
+    message = f"{int(pincode)}|{int(year)}|{int(month):02d}".encode()
+    key = key.encode() if isinstance(key, str) else key
+    return hashlib.blake2b(message, key=key, digest_size=TOKEN_BYTES).hexdigest()
+
+def risk_event_tokens(df_risk, key, birth_months, categories=HIGH_RISK_CATEGORIES):
+    """
+    Tokens for every high-risk pincode x birth month: the set Setu answers YES for.
+    birth_months is an iterable of month-like values (e.g. a pd.period_range of the
+    cohorts becoming due for an MBU).
+    """
+    pincodes = df_risk.loc[df_risk['risk_category'].isin(categories), 'pincode'].unique()
+    months = pd.PeriodIndex(list(birth_months), freq='M')
+    return [event_token(p, m.year, m.month, key) for p in pincodes for m in months]
+
+def to_digests(tokens):
+    """
+    Converts tokens (16-hex-character strings, or an integer array of digests) into a
+    uint64 array. Raises ValueError on malformed tokens.
+    """
+    if isinstance(tokens, np.ndarray) and tokens.dtype.kind in 'iu':
+        return tokens.astype(np.uint64)
+    tokens = [tokens] if isinstance(tokens, str) else list(tokens)
+    # One hex decode for the whole batch, valid only when every token has TOKEN_HEX characters
+    # and the buffer holds TOKEN_BYTES per token (bytes.fromhex skips whitespace, so a token
+    # with a space decodes short); fall back to per-token checks for the error message
+    if all(isinstance(t, str) and len(t) == TOKEN_HEX for t in tokens):
+        try:
+            raw = bytes.fromhex(''.join(tokens))
+        except ValueError:
+            raw = b''
+        if len(raw) == TOKEN_BYTES * len(tokens):
+            return np.frombuffer(raw, dtype='>u8').astype(np.uint64)
+    for t in tokens:
+        if not isinstance(t, str) or len(t) != TOKEN_HEX or any(c not in '0123456789abcdefABCDEF' for c in t):
+            raise ValueError(f"Malformed token {t!r}: expected {TOKEN_HEX} hex characters")
+    raise ValueError("Malformed token batch")
+
+# Multiplier (2^64 / golden ratio) used to remix a digest into fresh bits for the Bloom mask
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+def _bloom_probe(digests, n_words, n_hashes):
+    """
+    Register-blocked Bloom filter probe: each digest maps to one 64-bit word (low 32 bits)
+    and sets n_hashes bits inside it (6-bit fields of the remixed digest). One memory
+    access per query instead of n_hashes, for a slightly higher false-positive rate at
+    the same size, which from_tokens compensates for.
+    """
+    words = (digests & np.uint64(0xFFFFFFFF)) % np.uint64(n_words)
+    mixed = digests * _MIX
+    masks = np.zeros(len(digests), dtype=np.uint64)
+    for i in range(n_hashes):
+        masks |= np.left_shift(np.uint64(1), (mixed >> np.uint64(6 * i)) & np.uint64(63))
+    return words, masks
+
+# Extra bits per token for the blocked layout to reach the standard filter's false-positive rate
+BLOCKED_OVERHEAD = 1.3
+MAX_BLOOM_HASHES = 10
+
+class TokenSet:
+    """
+    Compact membership structure for one generation of event tokens: the digests as a
+    sorted uint64 array (8 bytes per token, binary search for exact answers) behind a
+    Bloom filter (about 1.6 bytes per token at 1% false positives) that answers most
+    NO queries without touching the array.
+    """
+
+    def __init__(self, digests, bloom, n_hashes, label=None):
+        self.digests = digests
+        self.bloom = bloom
+        self.n_hashes = n_hashes
+        self.label = label
+
+    @property
+    def nbytes(self):
+        return self.digests.nbytes + self.bloom.nbytes
+
+    def __len__(self):
+        return len(self.digests)
+
+    @classmethod
+    def from_tokens(cls, tokens, fp_rate=DEFAULT_FP_RATE, label=None):
+        """
+        Bulk-loads a token set: digests are deduplicated and sorted once, and the Bloom
+        filter is sized for fp_rate and filled in one vectorized pass.
+        """
+        # Sort + adjacent-duplicate mask (np.unique is several times slower on large uint64 arrays)
+        digests = np.sort(to_digests(tokens))
+        digests = digests[np.r_[True, digests[1:] != digests[:-1]]] if len(digests) else digests
+        bits_per_token = -np.log(fp_rate) / np.log(2) ** 2 * BLOCKED_OVERHEAD
+        n_words = max(1, int(np.ceil(len(digests) * bits_per_token / 64)))
+        n_hashes = int(np.clip(round(bits_per_token / BLOCKED_OVERHEAD * np.log(2)), 1, MAX_BLOOM_HASHES))
+
+        bloom = np.zeros(n_words, dtype=np.uint64)
+        words, masks = _bloom_probe(digests, n_words, n_hashes)
+        # OR together the masks landing in the same word (grouped by a sort, one reduceat),
+        # then set each touched word once; much faster than np.bitwise_or.at
+        order = np.argsort(words)
+        words, masks = words[order], masks[order]
+        starts = np.flatnonzero(np.r_[True, words[1:] != words[:-1]]) if len(words) else np.array([], dtype=int)
+        if len(starts):
+            bloom[words[starts]] |= np.bitwise_or.reduceat(masks, starts)
+        return cls(digests, bloom, n_hashes, label)
+
+    def contains_digests(self, digests):
+        """
+        Batched membership test for a uint64 digest array: one Bloom word check per query,
+        then a binary search of the sorted digests for the queries that pass it.
+        """
+        result = np.zeros(len(digests), dtype=bool)
+        if len(self.digests) == 0 or len(digests) == 0:
+            return result
+        words, masks = _bloom_probe(digests, len(self.bloom), self.n_hashes)
+        candidates = np.flatnonzero((self.bloom[words] & masks) == masks)
+        query = digests[candidates]
+        idx = np.minimum(np.searchsorted(self.digests, query), len(self.digests) - 1)
+        result[candidates] = self.digests[idx] == query
+        return result
+
+    def contains_one(self, digest):
+        """
+        Scalar membership test (plain integer arithmetic, no array temporaries), for single
+        lookups where the vectorized path's per-call overhead dominates.
+        """
+        if len(self.digests) == 0:
+            return False
+        digest = int(digest)
+        mixed = (digest * int(_MIX)) & 0xFFFFFFFFFFFFFFFF
+        mask = 0
+        for i in range(self.n_hashes):
+            mask |= 1 << ((mixed >> (6 * i)) & 63)
+        if int(self.bloom[(digest & 0xFFFFFFFF) % len(self.bloom)]) & mask != mask:
+            return False
+        i = int(np.searchsorted(self.digests, np.uint64(digest)))
+        return i < len(self.digests) and int(self.digests[i]) == digest
+
+    def bloom_pass_rate(self, digests):
+        """
+        Share of the given digests passing the Bloom filter (for non-members: its
+        empirical false-positive rate).
+        """
+        words, masks = _bloom_probe(np.asarray(digests, dtype=np.uint64), len(self.bloom), self.n_hashes)
+        return float(((self.bloom[words] & masks) == masks).mean()) if len(words) else 0.0
+
+    def save(self, path):
+        np.savez(path, digests=self.digests, bloom=self.bloom, n_hashes=self.n_hashes,
+                 label=np.array(self.label or '', dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f['digests'], f['bloom'], int(f['n_hashes']), str(f['label']) or None)
+
+class TokenVerifier:
+    """
+    Zero-linkage verifier: answers only YES/NO for event tokens against the current token
+    generation and, during a rotation overlap, the previous one.
+
+        verifier = TokenVerifier()
+        verifier.load(tokens, label='2026-10')
+        verifier.verify(batch)                 # bool array
+        verifier.rotate(new_tokens, '2026-11') # previous generation kept for overlap
+    """
+
+    def __init__(self, fp_rate=DEFAULT_FP_RATE, keep_previous=True):
+        self.fp_rate = fp_rate
+        self.keep_previous = keep_previous
+        self.generations = []
+
+    def load(self, tokens, label=None):
+        """
+        Replaces all generations with one built from tokens.
+        """
+        self.generations = [TokenSet.from_tokens(tokens, self.fp_rate, label)]
+        return self
+
+    def rotate(self, tokens, label=None):
+        """
+        Installs a new generation built from tokens (e.g. issued under a new key); the
+        previous current generation stays queryable when keep_previous is set.
+        """
+        new = TokenSet.from_tokens(tokens, self.fp_rate, label)
+        self.generations = [new] + self.generations[:1 if self.keep_previous else 0]
+        return self
+
+    def expire_previous(self):
+        self.generations = self.generations[:1]
+
+    def verify(self, tokens):
+        """
+        Batched verification: a bool array, True where the token is in any live generation.
+        """
+        digests = to_digests(tokens)
+        result = np.zeros(len(digests), dtype=bool)
+        for generation in self.generations:
+            pending = np.flatnonzero(~result)
+            result[pending] = generation.contains_digests(digests[pending])
+        return result
+
+    def verify_one(self, token):
+        digest = int(to_digests([token])[0]) if isinstance(token, str) else int(token)
+        return any(g.contains_one(digest) for g in self.generations)
+
+    @property
+    def nbytes(self):
+        return sum(g.nbytes for g in self.generations)
+
+    def stats(self):
+        return [{'label': g.label, 'tokens': len(g), 'bytes': g.nbytes, 'bloom_hashes': g.n_hashes}
+                for g in self.generations]
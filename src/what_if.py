@@ -0,0 +1,278 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import ihs_scoring, rate_shrinkage, risk_profiling
+
+# Scenario parameters use the pipeline config keys, so a scenario can be passed to
+# run_pipeline unchanged to regenerate the outputs with it
+SCENARIO_KEYS = ('ihs_weights', 'strategy_cut_points', 'strategy_labels', 'strategy_inclusive', 'round_scores',
+                 'risk_method', 'risk_quantiles', 'high_load_quantile', 'rate_shrinkage')
+
+# Which scenario keys each recomputed stage reads
+STAGE_PARAMS = {
+    'rates': ('rate_shrinkage',),
+    'risk': ('rate_shrinkage', 'risk_method', 'risk_quantiles', 'high_load_quantile'),
+    'ihs': ('rate_shrinkage', 'ihs_weights', 'round_scores'),
+    'strategy': ('rate_shrinkage', 'ihs_weights', 'round_scores', 'strategy_cut_points', 'strategy_inclusive'),
+}
+
+RISK_LABELS = {
+    'quantile_bands': ('Low Load', 'Medium Load', 'High Load'),
+    'load_threshold': ('Normal', 'High Risk'),
+}
+
+# Memoized results kept per stage (scenarios flip back and forth between a few values)
+CACHE_ENTRIES_PER_STAGE = 8
+
+def source_config(df, run_config=None):
+    """
+    Returns the pipeline config that produced a metrics table: the pipeline defaults updated
+    with run_config, the settings recorded at export (pipeline.read_run_config). Tables
+    exported before those were recorded get the process_data settings when they carry its
+    strategy labels, and the pipeline defaults otherwise.
+    """
+    from src.pipeline import DEFAULT_CONFIG, PROCESS_DATA_CONFIG
+
+    config = dict(DEFAULT_CONFIG)
+    if run_config is not None:
+        config.update(run_config)
+    elif 'strategy' in df.columns:
+        labels = set(df['strategy'].dropna().astype(str).unique())
+        if labels and labels <= set(PROCESS_DATA_CONFIG['strategy_labels']):
+            config.update(PROCESS_DATA_CONFIG)
+    return config
+
+def baseline_config(df, run_config=None):
+    """
+    Returns the scenario parameters that produced a metrics table (see source_config).
+    """
+    config = source_config(df, run_config)
+    return {key: config[key] for key in SCENARIO_KEYS}
+
+def _freeze(value):
+    # Hashable form of a parameter value (weights are dicts, cut points lists or tuples)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _sorted_quantile(sorted_values, q):
+    # Linear-interpolated quantile of a pre-sorted array (same as pandas Series.quantile)
+    if len(sorted_values) == 0:
+        return np.nan
+    pos = q * (len(sorted_values) - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+class WhatIfEngine:
+    """
+    Rescores all pincodes of a metrics table under scenario parameters (IHS weights, strategy
+    cut points, risk quantiles, rate shrinkage) from its cached mbu_rate / demo_rate /
+    total_update_load columns, without re-running the pipeline. The baseline is the run
+    config recorded with the table (run_config; see source_config). Rate estimators other
+    than the table's own are recomputed from the rates' count columns, when the table has them.
+
+    Each derived stage (risk bands, IHS scores, strategies) is memoized on the parameters it
+    reads (STAGE_PARAMS), so moving one slider only recomputes the stages downstream of it.
+    Rate quantiles come from arrays sorted once up front. Strategies and risk bands are kept
+    as small integer codes and only turned into labels for the summaries.
+    """
+
+    def __init__(self, df, baseline=None, run_config=None):
+        missing = [c for c in ('mbu_rate', 'demo_rate') if c not in df.columns]
+        if missing:
+            raise ValueError(f"What-if analysis needs the cached rate columns {missing}")
+
+        self.pincodes = df['pincode'].astype(str).to_numpy()
+        self.geography = {col: df[col].astype(str).to_numpy() for col in ('state', 'district') if col in df.columns}
+        self.mbu_rate = df['mbu_rate'].to_numpy(dtype=float)
+        self.demo_rate = df['demo_rate'].to_numpy(dtype=float)
+        self.load = df['total_update_load'].to_numpy(dtype=float) if 'total_update_load' in df.columns else None
+        # Series.quantile skips NaN, so the sorted copies do too
+        self._sorted = {}
+        if self.load is not None:
+            self._sorted['load'] = np.sort(self.load[~np.isnan(self.load)])
+
+        config = source_config(df, run_config)
+        self.baseline_recorded = run_config is not None
+        self.baseline = {**{key: config[key] for key in SCENARIO_KEYS}, **(baseline or {})}
+        # Count columns behind each rate, and prior group codes, for recomputing rate estimators
+        self._counts = {}
+        for rate, (num, den) in risk_profiling.RATE_COLUMNS[config['rate_denominator']].items():
+            if num in df.columns and den in df.columns:
+                self._counts[rate] = (df[num].to_numpy(dtype=float), df[den].to_numpy(dtype=float))
+        self._groups = rate_shrinkage.group_codes(df, tuple(config['shrinkage_levels'])) if self._counts else None
+        self._min_pincodes = config['shrinkage_min_pincodes']
+        # beta_binomial only applies when every rate is a proportion
+        self._proportions = all(np.all(np.nan_to_num(num) <= np.nan_to_num(den))
+                                for num, den in self._counts.values())
+        self._cache = {stage: {} for stage in STAGE_PARAMS}
+        self._lock = threading.Lock()
+        self.baseline_result = self.evaluate(self.baseline)
+
+    def mask(self, state=None, district=None):
+        """
+        Boolean row mask for a state/district selection ('All' or None selects everything).
+        """
+        mask = np.ones(len(self.pincodes), dtype=bool)
+        for level, value in (('state', state), ('district', district)):
+            if value not in (None, 'All') and level in self.geography:
+                mask &= self.geography[level] == str(value)
+        return mask
+
+    def _memoized(self, stage, params, compute, recomputed):
+        key = tuple(_freeze(params[k]) for k in STAGE_PARAMS[stage])
+        cache = self._cache[stage]
+        # The engine is shared by all dashboard sessions: cache reads and writes hold the lock,
+        # the computation does not (two sessions may compute the same entry; both are equal),
+        # and the computed value is returned directly since another thread may evict it
+        with self._lock:
+            value = cache.get(key)
+        if value is None:
+            value = compute()
+            recomputed.append(stage)
+            with self._lock:
+                cache[key] = value
+                while len(cache) > CACHE_ENTRIES_PER_STAGE:
+                    cache.pop(next(iter(cache)))
+        return value
+
+    @property
+    def rate_estimators(self):
+        """
+        Values rate_shrinkage can take for this table: the table's own estimator, plus raw
+        rates and the shrinkage methods when the rate count columns are available.
+        """
+        if not self._counts:
+            return [self.baseline['rate_shrinkage']]
+        return [None] + [m for m in rate_shrinkage.SHRINKAGE_METHODS if m != 'beta_binomial' or self._proportions]
+
+    def _rates(self, params):
+        method = params['rate_shrinkage']
+        if method == self.baseline['rate_shrinkage'] or not self._counts:
+            mbu, demo = self.mbu_rate, self.demo_rate
+        else:
+            rates = {}
+            for rate, (num, den) in self._counts.items():
+                if method is None:
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        rates[rate] = np.where(den > 0, num / den, 0.0)
+                else:
+                    rates[rate] = rate_shrinkage.shrink_rate(num, den, self._groups, method=method,
+                                                             min_pincodes=self._min_pincodes)
+            mbu, demo = rates.get('mbu_rate', self.mbu_rate), rates.get('demo_rate', self.demo_rate)
+        return {'mbu_rate': mbu, 'demo_rate': demo, 'sorted_mbu_rate': np.sort(mbu[~np.isnan(mbu)])}
+
+    def _risk(self, params, rates):
+        if params['risk_method'] == 'load_threshold':
+            if self.load is None:
+                raise ValueError("The load_threshold risk method needs total_update_load")
+            threshold = _sorted_quantile(self._sorted['load'], params['high_load_quantile'])
+            return (self.load >= threshold).astype(np.int8)
+        low_q, high_q = params['risk_quantiles']
+        low = _sorted_quantile(rates['sorted_mbu_rate'], low_q)
+        high = _sorted_quantile(rates['sorted_mbu_rate'], high_q)
+        mbu = rates['mbu_rate']
+        return np.where(mbu >= high, 2, np.where(mbu >= low, 1, 0)).astype(np.int8)
+
+    def _scores(self, params, rates):
+        scores = ihs_scoring.calculate_ihs(rates['mbu_rate'], rates['demo_rate'], params['ihs_weights'])
+        return np.round(scores) if params['round_scores'] else scores
+
+    def _strategy(self, params, scores):
+        low, high = params['strategy_cut_points']
+        if params['strategy_inclusive']:
+            return ((scores >= low).astype(np.int8) + (scores >= high))
+        return ((scores > low).astype(np.int8) + (scores > high))
+
+    def evaluate(self, params=None):
+        """
+        Returns {'ihs_score', 'strategy_code' (0 = lowest band), 'risk_code', 'risk_labels',
+        'recomputed' (stages not served from the memo), 'elapsed_ms'} for a scenario;
+        parameters not given keep their baseline values.
+        """
+        start = time.perf_counter()
+        params = {**self.baseline, **(params or {})}
+        recomputed = []
+        rates = self._memoized('rates', params, lambda: self._rates(params), recomputed)
+        risk = self._memoized('risk', params, lambda: self._risk(params, rates), recomputed)
+        scores = self._memoized('ihs', params, lambda: self._scores(params, rates), recomputed)
+        strategy = self._memoized('strategy', params, lambda: self._strategy(params, scores), recomputed)
+        return {
+            'params': params,
+            'mbu_rate': rates['mbu_rate'],
+            'ihs_score': scores,
+            'strategy_code': strategy,
+            'risk_code': risk,
+            'risk_labels': RISK_LABELS[params['risk_method']],
+            'recomputed': recomputed,
+            'elapsed_ms': 1000 * (time.perf_counter() - start),
+        }
+
+    def compare(self, params=None, mask=None):
+        """
+        Scores a scenario and summarises it against the baseline over the masked rows:
+        strategy and risk counts (baseline, scenario, change), the baseline -> scenario
+        strategy transition table, and how many pincodes changed strategy.
+        """
+        start = time.perf_counter()
+        result = self.evaluate(params)
+        base = self.baseline_result
+        mask = np.ones(len(self.pincodes), dtype=bool) if mask is None else mask
+        labels = list(result['params']['strategy_labels'])
+        n_bands = len(labels)
+
+        base_codes, new_codes = base['strategy_code'][mask], result['strategy_code'][mask]
+        strategy_counts = pd.DataFrame({
+            'strategy': labels,
+            'baseline': np.bincount(base_codes, minlength=n_bands),
+            'scenario': np.bincount(new_codes, minlength=n_bands),
+        })
+        strategy_counts['change'] = strategy_counts['scenario'] - strategy_counts['baseline']
+
+        transitions = np.bincount(base_codes.astype(int) * n_bands + new_codes, minlength=n_bands ** 2)
+        transitions = pd.DataFrame(transitions.reshape(n_bands, n_bands),
+                                   index=pd.Index(labels, name='baseline'), columns=pd.Index(labels, name='scenario'))
+
+        base_risk = pd.Series(np.bincount(base['risk_code'][mask], minlength=len(base['risk_labels'])),
+                              index=base['risk_labels'], name='baseline')
+        new_risk = pd.Series(np.bincount(result['risk_code'][mask], minlength=len(result['risk_labels'])),
+                             index=result['risk_labels'], name='scenario')
+        risk_counts = pd.concat([base_risk, new_risk], axis=1).fillna(0).astype(int).rename_axis('risk_category')
+        risk_counts['change'] = risk_counts['scenario'] - risk_counts['baseline']
+
+        return {
+            'strategy_counts': strategy_counts,
+            'transitions': transitions,
+            'risk_counts': risk_counts.reset_index(),
+            'changed': int((base_codes != new_codes).sum()),
+            'pincodes': int(mask.sum()),
+            'recomputed': result['recomputed'],
+            'elapsed_ms': 1000 * (time.perf_counter() - start),
+            'result': result,
+        }
+
+    def changed_pincodes(self, comparison, mask=None, limit=200):
+        """
+        Pincodes whose strategy differs from the baseline in a compare() result, largest
+        score change first.
+        """
+        result = comparison['result']
+        labels = np.asarray(result['params']['strategy_labels'], dtype=object)
+        mask = np.ones(len(self.pincodes), dtype=bool) if mask is None else mask
+        rows = np.flatnonzero(mask & (self.baseline_result['strategy_code'] != result['strategy_code']))
+        df = pd.DataFrame({
+            'pincode': self.pincodes[rows],
+            **{level: labels_[rows] for level, labels_ in self.geography.items()},
+            'baseline_ihs': self.baseline_result['ihs_score'][rows],
+            'scenario_ihs': result['ihs_score'][rows],
+            'baseline_strategy': labels[self.baseline_result['strategy_code'][rows]],
+            'scenario_strategy': labels[result['strategy_code'][rows]],
+        })
+        change = (df['scenario_ihs'] - df['baseline_ihs']).abs()
+        return df.loc[change.sort_values(ascending=False).index].head(limit).reset_index(drop=True)
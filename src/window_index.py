@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from src import ihs_scoring, risk_profiling
+
+# Measures indexed by default: update and enrolment flows behind the dashboard KPIs and rates
+WINDOW_MEASURES = ('mbu_demand', 'bio_updates', 'demo_updates', 'demo_age_5_17', 'enrolments', 'enrol_age_5_17')
+
+# Store measure behind each pincode metrics column (see risk_profiling.calculate_update_load)
+METRIC_MEASURES = {
+    'bio_age_5_17': 'mbu_demand',
+    'biometric_updates': 'bio_updates',
+    'demographic_updates': 'demo_updates',
+    'demo_age_5_17': 'demo_age_5_17',
+    'age_5_17': 'enrol_age_5_17',
+    'total_enrollment': 'enrolments',
+}
+
+class WindowIndex:
+    """
+    Prefix-sum (cumulative) arrays over the month axis of a SeriesStore, per pincode and per
+    district/state roll-up. prefix[:, j] is the total of the first j months, so the total
+    of any [start, end] window is prefix[:, end + 1] - prefix[:, start]: one subtraction per
+    entity whatever the window length, instead of re-filtering and re-grouping rows.
+    """
+
+    def __init__(self, store, measures=WINDOW_MEASURES, levels=('pincode', 'district')):
+        self.store = store
+        self.periods = store.periods
+        self.levels = tuple(level for level in levels if level == 'pincode' or level in store.geography)
+        self._prefix = {}
+        for measure in measures:
+            if measure not in store.matrices:
+                continue
+            for level in self.levels:
+                _, x = store.matrix(measure, level)
+                prefix = np.zeros((x.shape[0], len(self.periods) + 1))
+                np.cumsum(x.toarray(), axis=1, out=prefix[:, 1:])
+                self._prefix[(measure, level)] = prefix
+
+    @property
+    def measures(self):
+        return sorted({measure for measure, _ in self._prefix})
+
+    @property
+    def nbytes(self):
+        return sum(prefix.nbytes for prefix in self._prefix.values())
+
+    def labels(self, level='pincode'):
+        return self.store.labels(level)
+
+    def bounds(self, start=None, end=None):
+        """
+        Column bounds [i, j) of the months from start to end inclusive (month-like values;
+        None means the first/last month of the history).
+        """
+        i = 0 if start is None else int(self.periods.searchsorted(pd.Timestamp(start).to_period('M').start_time))
+        j = len(self.periods) if end is None else int(
+            self.periods.searchsorted(pd.Timestamp(end).to_period('M').start_time, side='right'))
+        return i, max(i, j)
+
+    def total(self, measure, start=None, end=None, level='pincode'):
+        """
+        Total of a measure over [start, end] for every entity of a level.
+        """
+        i, j = self.bounds(start, end)
+        prefix = self._prefix[(measure, level)]
+        return prefix[:, j] - prefix[:, i]
+
+    def mean(self, measure, start=None, end=None, level='pincode'):
+        """
+        Monthly mean of a measure over [start, end] for every entity of a level.
+        """
+        i, j = self.bounds(start, end)
+        return self.total(measure, start, end, level) / max(j - i, 1)
+
+    def growth(self, measure, start=None, end=None, level='pincode'):
+        """
+        Growth of the window total over the preceding window of the same length
+        (total / previous total - 1); NaN where that window is not fully covered by the
+        history or its total is 0.
+        """
+        i, j = self.bounds(start, end)
+        prefix = self._prefix[(measure, level)]
+        if i - (j - i) < 0 or j == i:
+            return np.full(prefix.shape[0], np.nan)
+        current = prefix[:, j] - prefix[:, i]
+        previous = prefix[:, i] - prefix[:, 2 * i - j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(previous > 0, current / previous - 1, np.nan)
+
+    def window_frame(self, start=None, end=None, level='pincode', measures=None):
+        """
+        Window totals of several measures as a DataFrame indexed by the level's labels.
+        """
+        measures = [m for m in (measures or self.measures) if (m, level) in self._prefix]
+        return pd.DataFrame({m: self.total(m, start, end, level) for m in measures},
+                            index=pd.Index(self.labels(level), name=level))
+
+def window_metrics(index, start=None, end=None, config=None):
+    """
+    Per-pincode metrics over [start, end] from a WindowIndex: the update load columns of
+    calculate_update_load, mbu_rate/demo_rate for the config's rate_denominator (demo_rate
+    only where its numerator is indexed; shrunk when the config sets rate_shrinkage),
+    ihs_score and strategy from those rates, and risk_category recomputed with the config's
+    risk method over all indexed pincodes, as the pipeline's ihs and risk stages do.
+    """
+    from src.pipeline import DEFAULT_CONFIG
+    config = {**DEFAULT_CONFIG, **(config or {})}
+
+    totals = index.window_frame(start, end, 'pincode')
+    df = pd.DataFrame(index=totals.index)
+    for column, measure in METRIC_MEASURES.items():
+        if measure in totals.columns:
+            df[column] = totals[measure]
+    if 'biometric_updates' in df.columns and 'demographic_updates' in df.columns:
+        df['total_update_load'] = df['biometric_updates'] + df['demographic_updates']
+
+    rates = risk_profiling.RATE_COLUMNS[config['rate_denominator']]
+    for rate, (numerator, denominator) in rates.items():
+        if numerator in df.columns and denominator in df.columns:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value = df[numerator] / df[denominator]
+            df[rate] = value.replace([np.inf, -np.inf], 0).fillna(0)
+    if config['rate_shrinkage']:
+        # Prior groups from the store's pincode geography, as in the pipeline's rates stage
+        geography = {level: labels for level, labels in index.store.geography.items()}
+        df = risk_profiling.shrink_update_rates(
+            df.reset_index().assign(**geography), config['rate_denominator'], method=config['rate_shrinkage'],
+            prior_levels=tuple(config['shrinkage_levels']), min_pincodes=config['shrinkage_min_pincodes'],
+        ).drop(columns=[*geography, 'mbu_rate_raw', 'demo_rate_raw'], errors='ignore').set_index('pincode')
+
+    # IHS and strategy from the window's rates, with the config's weights and bands (the
+    # pipeline's ihs stage); without both rates the stored full-history values stay
+    df = ihs_scoring.calculate_pincode_ihs(
+        df.reset_index(), weights=config['ihs_weights'], cut_points=tuple(config['strategy_cut_points']),
+        labels=tuple(config['strategy_labels']), inclusive=config['strategy_inclusive'],
+        round_scores=config['round_scores'])
+    if config['risk_method'] == 'load_threshold' and 'total_update_load' in df.columns:
+        df = risk_profiling.flag_high_load(df, quantile=config['high_load_quantile'])
+    elif 'mbu_rate' in df.columns:
+        df = risk_profiling.categorize_risk(df, quantiles=tuple(config['risk_quantiles']))
+    return df.set_index('pincode')
+
+def apply_window(df, df_window):
+    """
+    Returns a copy of a pincode metrics table with the columns present in df_window
+    (from window_metrics) replaced by their window values; pincodes without activity in
+    the window get 0 loads and keep their other columns.
+    """
+    window = df_window.reindex(df['pincode'].astype(str))
+    columns = [c for c in window.columns if c in df.columns]
+    out = df.copy()
+    for col in columns:
+        values = window[col].to_numpy()
+        if col in ('risk_category', 'strategy'):
+            labels = pd.Series(values, index=out.index, dtype=object).fillna(out[col].astype(object))
+            out[col] = labels.astype('category') if isinstance(out[col].dtype, pd.CategoricalDtype) else labels
+        else:
+            out[col] = np.nan_to_num(values.astype(float))
+    return out